@@ -44,6 +44,13 @@ database_url = os.getenv(
 # Remove +asyncpg for Alembic (it uses sync driver for migrations)
 sync_database_url = database_url.replace("+asyncpg", "")
 
+# Migrate another database (e.g. a shard) with: alembic -x db_url=... upgrade head
+db_url = context.get_x_argument(as_dictionary=True).get("db_url")
+
+# Only the default database holds the global tables (user directory, jobs, FX
+# rates); migrations check this flag and skip them on the other shards
+config.attributes["default_database"] = not db_url or db_url == database_url
+
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -63,7 +70,7 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url", sync_database_url)
+    url = db_url or config.get_main_option("sqlalchemy.url", sync_database_url)
     print(config)
     context.configure(
         url=url,
@@ -89,8 +96,12 @@ async def run_async_migrations() -> None:
 
     """
 
+    section = config.get_section(config.config_ini_section, {})
+    if db_url:
+        section["sqlalchemy.url"] = db_url
+
     connectable = async_engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        section,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
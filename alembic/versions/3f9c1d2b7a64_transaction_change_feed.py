@@ -0,0 +1,54 @@
+"""Add per-user transaction change feed
+
+Revision ID: 3f9c1d2b7a64
+Revises: 62dea0fbe78a
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d2b7a64'
+down_revision: Union[str, Sequence[str], None] = '62dea0fbe78a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_table('transaction_changes',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('transaction_id', sa.BigInteger(), nullable=False),
+    sa.Column('operation', sa.Enum('INSERT', 'UPDATE', 'DELETE', name='changeoperation'), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'seq', name='uix_transaction_change_user_seq')
+    )
+
+    # Seed the feed with an insert per existing transaction so that a client
+    # syncing from since=0 receives the full history.
+    op.execute("""
+        INSERT INTO transaction_changes (user_id, seq, transaction_id, operation)
+        SELECT user_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id), id, 'INSERT'
+        FROM transactions
+    """)
+    op.execute("""
+        UPDATE users SET change_seq = counts.total
+        FROM (SELECT user_id, COUNT(*) AS total FROM transactions GROUP BY user_id) AS counts
+        WHERE users.id = counts.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_changes')
+    op.execute("DROP TYPE IF EXISTS changeoperation")
+    op.drop_column('users', 'change_seq')
@@ -0,0 +1,105 @@
+"""Add duplicate-detection fingerprint to transactions
+
+Revision ID: 62dea0fbe78a
+Revises: ac9a4308be5e
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '62dea0fbe78a'
+down_revision: Union[str, Sequence[str], None] = 'ac9a4308be5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+# Frozen copy of the fingerprint as defined at this revision, so the backfill
+# does not change when the application's fingerprint logic does
+def normalize_description(description: Optional[str]) -> str:
+    if not description:
+        return ""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", description.lower()).split())
+
+
+def compute_fingerprint(
+    user_id: int, transaction_date: datetime, amount: float, type: str, description: Optional[str]
+) -> str:
+    if transaction_date.tzinfo is not None:
+        transaction_date = transaction_date.astimezone(timezone.utc)
+    parts = [
+        str(user_id),
+        transaction_date.date().isoformat(),
+        type,
+        f"{amount:.2f}",
+        normalize_description(description),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    op.add_column('transactions', sa.Column('is_duplicate', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    # Backfill fingerprints in batches; the normalization lives in Python so it
+    # cannot be expressed as a single UPDATE.
+    bind = op.get_bind()
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('amount', sa.Float),
+        sa.column('type', sa.String),
+        sa.column('transaction_date', sa.DateTime(timezone=True)),
+        sa.column('description', sa.String),
+        sa.column('fingerprint', sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                transactions.c.id, transactions.c.user_id, transactions.c.amount,
+                transactions.c.type, transactions.c.transaction_date, transactions.c.description,
+            )
+            .where(transactions.c.id > last_id)
+            .order_by(transactions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            transactions.update()
+            .where(transactions.c.id == sa.bindparam('row_id'))
+            .values(fingerprint=sa.bindparam('row_fingerprint')),
+            [
+                {
+                    'row_id': row.id,
+                    'row_fingerprint': compute_fingerprint(
+                        row.user_id, row.transaction_date, row.amount, row.type.lower(), row.description
+                    ),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.alter_column('transactions', 'fingerprint', nullable=False)
+    op.create_index('ix_transactions_user_id_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_id_fingerprint', table_name='transactions')
+    op.drop_column('transactions', 'is_duplicate')
+    op.drop_column('transactions', 'fingerprint')
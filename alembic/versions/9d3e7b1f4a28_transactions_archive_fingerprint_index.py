@@ -0,0 +1,28 @@
+"""Index archived transactions by user and fingerprint
+
+Revision ID: 9d3e7b1f4a28
+Revises: f3b8a5d27c61
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e7b1f4a28'
+down_revision: Union[str, Sequence[str], None] = 'f3b8a5d27c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicate detection looks imported transactions up in the archive as well
+    op.create_index('ix_transactions_archive_user_id_fingerprint', 'transactions_archive', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_archive_user_id_fingerprint', table_name='transactions_archive')
@@ -0,0 +1,65 @@
+"""Add the user directory for sharding
+
+Revision ID: a8d4f6b2c193
+Revises: e6a2d9f13c48
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4f6b2c193'
+down_revision: Union[str, Sequence[str], None] = 'e6a2d9f13c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def on_default_database() -> bool:
+    """Whether the default database is being migrated: only it holds the global tables (see env.py)."""
+    return context.config.attributes.get("default_database", True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The directory lists the users of every shard, so it only exists once
+    if not on_default_database():
+        return
+    op.create_table('user_directory',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('shard', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_directory_email'), 'user_directory', ['email'], unique=True)
+    op.create_index(op.f('ix_user_directory_username'), 'user_directory', ['username'], unique=True)
+
+    # Existing users all live in this database (shard 0); new IDs continue after them
+    op.execute(
+        "INSERT INTO user_directory (id, username, email, shard, created_at, updated_at) "
+        "SELECT id, username, email, 0, created_at, updated_at FROM users"
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('user_directory', 'id'), "
+        "(SELECT COALESCE(MAX(id), 0) + 1 FROM user_directory), false)"
+    )
+
+    op.drop_constraint('jobs_user_id_fkey', 'jobs', type_='foreignkey')
+    op.create_foreign_key('jobs_user_id_fkey', 'jobs', 'user_directory', ['user_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not on_default_database():
+        return
+    op.drop_constraint('jobs_user_id_fkey', 'jobs', type_='foreignkey')
+    op.create_foreign_key('jobs_user_id_fkey', 'jobs', 'users', ['user_id'], ['id'])
+    op.drop_index(op.f('ix_user_directory_username'), table_name='user_directory')
+    op.drop_index(op.f('ix_user_directory_email'), table_name='user_directory')
+    op.drop_table('user_directory')
@@ -0,0 +1,67 @@
+"""Add the transactions archive and its manifest
+
+Revision ID: b7e3c1d94a52
+Revises: a8d4f6b2c193
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3c1d94a52'
+down_revision: Union[str, Sequence[str], None] = 'a8d4f6b2c193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transactions_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(length=3), server_default='USD', nullable=False),
+    sa.Column('type', postgresql.ENUM('INCOME', 'EXPENSE', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('transaction_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('is_duplicate', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_archive_user_id_transaction_date', 'transactions_archive', ['user_id', 'transaction_date'], unique=False)
+    op.create_table('archive_manifest',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('archived_before', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('row_count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('first_transaction_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_transaction_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Redundant with the (user_id, transaction_date) and (user_id, fingerprint) indexes
+    op.drop_index('ix_transactions_user_id', table_name='transactions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Put archived rows back so no history is lost
+    columns = (
+        "id, user_id, category_id, amount, currency, type, transaction_date, description, "
+        "fingerprint, is_duplicate, created_at, updated_at"
+    )
+    op.execute(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_archive")
+    op.create_index('ix_transactions_user_id', 'transactions', ['user_id'], unique=False)
+    op.drop_table('archive_manifest')
+    op.drop_index('ix_transactions_archive_user_id_transaction_date', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
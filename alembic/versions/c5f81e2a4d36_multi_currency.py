@@ -0,0 +1,50 @@
+"""Add transaction currencies and exchange rates
+
+Revision ID: c5f81e2a4d36
+Revises: d41a7c3e5b90
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f81e2a4d36'
+down_revision: Union[str, Sequence[str], None] = 'd41a7c3e5b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def on_default_database() -> bool:
+    """Whether the default database is being migrated: only it holds the global tables (see env.py)."""
+    return context.config.attributes.get("default_database", True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing amounts were entered in USD; their fingerprints stay valid because
+    # the default currency is not part of the fingerprint
+    op.add_column('transactions', sa.Column('currency', sa.String(length=3), server_default='USD', nullable=False))
+    op.add_column('recurring_transactions', sa.Column('currency', sa.String(length=3), server_default='USD', nullable=False))
+    if not on_default_database():
+        return
+    op.create_table('fx_rates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('rate_date', sa.Date(), nullable=False),
+    sa.Column('rate', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('currency', 'rate_date', name='uix_fx_rate_currency_date')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if on_default_database():
+        op.drop_table('fx_rates')
+    op.drop_column('recurring_transactions', 'currency')
+    op.drop_column('transactions', 'currency')
@@ -0,0 +1,27 @@
+"""Index transactions by user and date
+
+Revision ID: e6a2d9f13c48
+Revises: c5f81e2a4d36
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2d9f13c48'
+down_revision: Union[str, Sequence[str], None] = 'c5f81e2a4d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_user_id_transaction_date', 'transactions', ['user_id', 'transaction_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_id_transaction_date', table_name='transactions')
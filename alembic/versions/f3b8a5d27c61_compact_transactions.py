@@ -0,0 +1,106 @@
+"""Store transaction amounts in minor units and rewrite the transaction tables compactly
+
+Revision ID: f3b8a5d27c61
+Revises: b7e3c1d94a52
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8a5d27c61'
+down_revision: Union[str, Sequence[str], None] = 'b7e3c1d94a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Widest-aligned columns first, so rows carry no alignment padding
+COLUMNS = (
+    "id, amount_minor, transaction_date, created_at, updated_at, user_id, category_id, "
+    "type, is_duplicate, currency, fingerprint, description"
+)
+# The same from the old layout, amounts rounded half away from zero to the cent
+OLD_COLUMNS = (
+    "id, round(amount::numeric * 100)::bigint, transaction_date, created_at, updated_at, user_id, category_id, "
+    "type, is_duplicate, currency, fingerprint, description"
+)
+LIST_COLUMNS = [
+    'id', 'amount_minor', 'created_at', 'updated_at', 'category_id', 'type', 'is_duplicate',
+    'currency', 'description',
+]
+
+
+def compact_table(name: str, id_column: sa.Column, timestamp_default=None) -> None:
+    """Create `<name>_compact` with the new column order and copy `name` into it."""
+    op.create_table(f'{name}_compact',
+    id_column,
+    sa.Column('amount_minor', sa.BigInteger(), nullable=False),
+    sa.Column('transaction_date', sa.DateTime(timezone=True), server_default=timestamp_default, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=timestamp_default, nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=timestamp_default, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('type', postgresql.ENUM('INCOME', 'EXPENSE', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('is_duplicate', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('currency', sa.String(length=3), server_default='USD', nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], name=f'{name}_category_id_fkey'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=f'{name}_user_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name=f'{name}_compact_pkey')
+    )
+    op.execute(f"INSERT INTO {name}_compact ({COLUMNS}) SELECT {OLD_COLUMNS} FROM {name}")
+
+
+def replace_table(name: str) -> None:
+    """Drop `name` and put `<name>_compact` in its place."""
+    op.drop_table(name)
+    op.rename_table(f'{name}_compact', name)
+    op.execute(f"ALTER TABLE {name} RENAME CONSTRAINT {name}_compact_pkey TO {name}_pkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rewriting the tables (rather than ALTERing them in place) is what reorders
+    # the columns. Indexes are built after the copy, once the old ones are gone.
+    compact_table('transactions', sa.Column(
+        'id', sa.BigInteger(), server_default=sa.text("nextval('transactions_id_seq'::regclass)"), nullable=False
+    ), timestamp_default=sa.text('now()'))
+    # Hand the ID sequence over before its owning column is dropped
+    op.execute("ALTER SEQUENCE transactions_id_seq AS bigint OWNED BY transactions_compact.id")
+    replace_table('transactions')
+    op.create_index('ix_transactions_user_id_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=False)
+    op.create_index('ix_transactions_category_id', 'transactions', ['category_id'], unique=False)
+    op.create_index(
+        'ix_transactions_user_id_transaction_date', 'transactions', ['user_id', 'transaction_date'], unique=False,
+        postgresql_include=LIST_COLUMNS,
+    )
+
+    compact_table('transactions_archive', sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False))
+    replace_table('transactions_archive')
+    op.create_index(
+        'ix_transactions_archive_user_id_transaction_date', 'transactions_archive', ['user_id', 'transaction_date'],
+        unique=False,
+    )
+
+    op.execute("ANALYZE transactions")
+    op.execute("ANALYZE transactions_archive")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Restores the column types in place; the column order stays compact
+    op.drop_index('ix_transactions_user_id_transaction_date', table_name='transactions')
+    for name in ('transactions', 'transactions_archive'):
+        op.add_column(name, sa.Column('amount', sa.Float(), nullable=True))
+        op.execute(f"UPDATE {name} SET amount = amount_minor / 100.0")
+        op.alter_column(name, 'amount', nullable=False)
+        op.drop_column(name, 'amount_minor')
+        op.alter_column(name, 'id', type_=sa.Integer(), existing_nullable=False)
+
+    op.execute("ALTER SEQUENCE transactions_id_seq AS integer")
+    op.create_index('ix_transactions_user_id_transaction_date', 'transactions', ['user_id', 'transaction_date'], unique=False)
@@ -0,0 +1,163 @@
+"""
+Benchmark the vectorized analytics on a synthetic multi-year history.
+
+Usage:
+    poetry run python benchmarks/bench_analytics.py [--rows 1000000] [--database-url postgresql+asyncpg://...]
+
+Times building the column arrays from query rows, converting them to a reporting
+currency, and each analytics computation on the converted columns. Rows are
+generated in the shape load_columns() fetches, and the FX cache is filled with
+synthetic daily rates. With a database URL, one user with as many transactions
+is also seeded into a scratch schema and load_columns() is timed against it,
+query and transfer included; the schema is dropped afterwards.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.finance_tracker import analytics  # noqa: E402
+from src.finance_tracker.models import User, Category, Transaction, ArchiveManifest  # noqa: E402
+
+
+CURRENCIES = ("EUR", "GBP", "USD")
+
+
+def synthetic_rows(n_rows: int, years: int = 5, seed: int = 0) -> list:
+    """Generate (id, epoch, amount_minor, is_income, category_id, currency_code) tuples, 80% USD."""
+    rng = np.random.default_rng(seed)
+    end = time.time()
+    start = end - years * 365 * analytics.SECONDS_PER_DAY
+
+    timestamps = rng.uniform(start, end, n_rows)
+    is_income = rng.random(n_rows) < 0.1
+    amounts = np.where(is_income, rng.lognormal(7, 0.5, n_rows), rng.lognormal(3, 1, n_rows))
+    amounts_minor = np.maximum(np.rint(amounts * analytics.MINOR_UNITS_PER_UNIT), 1).astype(np.int64)
+    categories = np.where(rng.random(n_rows) < 0.05, -1, rng.integers(1, 40, n_rows))
+    currency_codes = rng.choice(len(CURRENCIES), n_rows, p=[0.1, 0.1, 0.8])
+
+    return list(zip(
+        range(1, n_rows + 1), timestamps.tolist(), amounts_minor.tolist(), is_income.tolist(), categories.tolist(),
+        currency_codes.tolist(),
+    ))
+
+
+def fill_fx_cache(years: int = 5, seed: int = 0) -> None:
+    """Give EUR and GBP a random-walk rate for every day of the history."""
+    rng = np.random.default_rng(seed)
+    last_day = int(time.time() // analytics.SECONDS_PER_DAY) + 60
+    days = np.arange(last_day - (years + 1) * 365, last_day)
+    analytics.fx_rates._rates = {
+        currency: (days, start * np.exp(np.cumsum(rng.normal(0, 0.003, len(days)))))
+        for currency, start in (("EUR", 0.9), ("GBP", 0.78))
+    }
+    analytics.fx_rates._loaded_at = time.monotonic()
+
+
+SCHEMA = "bench_analytics"
+
+SEED_USER = [
+    "INSERT INTO users (id, username, email, password) VALUES (1, 'bench', 'bench@example.com', 'not-a-hash')",
+    "INSERT INTO categories (id, name, user_id) SELECT c, 'category ' || c, 1 FROM generate_series(1, 39) AS c",
+]
+
+# The same distributions as synthetic_rows()
+SEED_TRANSACTIONS = """
+    INSERT INTO transactions (user_id, category_id, amount_minor, currency, type, transaction_date, fingerprint)
+    SELECT
+        1,
+        CASE WHEN random() < 0.05 THEN NULL ELSE 1 + floor(random() * 39)::int END,
+        greatest(round(exp(CASE WHEN income THEN 7 + 0.5 * normal ELSE 3 + normal END) * 100), 1)::bigint,
+        CASE WHEN pick < 0.1 THEN 'EUR' WHEN pick < 0.2 THEN 'GBP' ELSE 'USD' END,
+        (CASE WHEN income THEN 'INCOME' ELSE 'EXPENSE' END)::transactiontype,
+        now() - random() * (:years * interval '365 days'),
+        md5(i::text) || md5((i + 1)::text)
+    FROM (
+        SELECT
+            i, random() < 0.1 AS income, random() AS pick,
+            sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random()) AS normal
+        FROM generate_series(1, :rows) AS i
+    ) AS s
+"""
+
+
+async def seed_database(engine, rows: int, years: int = 5) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        tables = [User.__table__, Category.__table__, Transaction.__table__, ArchiveManifest.__table__]
+        await conn.run_sync(lambda sync_conn: User.metadata.create_all(sync_conn, tables=tables, checkfirst=False))
+        for statement in SEED_USER:
+            await conn.execute(text(statement))
+        await conn.execute(text("SELECT setseed(0.42)"))
+        await conn.execute(text(SEED_TRANSACTIONS), {"rows": rows, "years": years})
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.transactions"))
+
+
+async def time_load_columns(database_url: str, rows: int, keep: bool) -> None:
+    """Time load_columns() on a seeded user, uncached and then cached."""
+    # transactiontype is found in public
+    engine = create_async_engine(database_url, connect_args={"server_settings": {"search_path": f"{SCHEMA}, public"}})
+    try:
+        started = time.perf_counter()
+        await seed_database(engine, rows)
+        print(f"{'seed database':<28}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+
+        async with AsyncSession(engine) as db:
+            for label in ("load_columns (database)", "load_columns (cached)"):
+                started = time.perf_counter()
+                columns = await analytics.load_columns(db, 1)
+                print(f"{label:<28}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+        assert len(columns) == rows
+    finally:
+        analytics.columns_cache.clear()
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+def timed(label: str, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    print(f"{label:<28}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", help="Also time load_columns() against this database")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    fill_fx_cache()
+    as_of_day = analytics.epoch_day(analytics.datetime.now(analytics.timezone.utc))
+    print(f"{args.rows:,} transactions")
+
+    started = time.perf_counter()
+    columns = timed("rows -> columns", analytics.TransactionColumns.from_rows, rows, CURRENCIES)
+    columns = timed("convert to EUR (3 currencies)", columns.in_currency, "EUR")
+    timed("rolling (365 days, 7/30)", analytics.rolling_series, columns, as_of_day, 365, [7, 30])
+    timed("category trends (24 months)", analytics.category_trends, columns, as_of_day, 24)
+    timed("month-end forecast", analytics.month_end_forecast, columns, as_of_day, 90)
+    timed("anomalies (90 days)", analytics.detect_anomalies, columns, as_of_day - 89, 3.5, 5)
+    print(f"{'total':<28}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+
+    if args.database_url:
+        asyncio.run(time_load_columns(args.database_url, args.rows, args.keep))
+
+
+if __name__ == "__main__":
+    main()
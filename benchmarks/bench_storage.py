@@ -0,0 +1,220 @@
+"""
+Benchmark the storage layout of the transactions table.
+
+Usage:
+    DATABASE_URL=postgresql+asyncpg://... poetry run python benchmarks/bench_storage.py [--rows 1000000]
+
+Seeds the same synthetic transactions into two scratch schemas, one with the
+previous layout (float amounts, integer IDs, declaration-order columns, plain
+list index) and one with the current model, then reports table and index
+sizes and the latency of the transaction list query on each. The schemas are
+dropped afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.finance_tracker.models import (  # noqa: E402
+    User, Category, Transaction, TRANSACTION_LIST_COLUMNS,
+)
+
+load_dotenv()
+
+USERS = 1000
+CATEGORIES_PER_USER = 10
+
+PREVIOUS_LAYOUT = [
+    """
+    CREATE TABLE transactions (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (id),
+        category_id INTEGER REFERENCES categories (id),
+        amount DOUBLE PRECISION NOT NULL,
+        type transactiontype NOT NULL,
+        transaction_date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        description VARCHAR,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        fingerprint VARCHAR(64) NOT NULL,
+        is_duplicate BOOLEAN NOT NULL DEFAULT false,
+        currency VARCHAR(3) NOT NULL DEFAULT 'USD'
+    )
+    """,
+    "CREATE INDEX ix_transactions_user_id_fingerprint ON transactions (user_id, fingerprint)",
+    "CREATE INDEX ix_transactions_category_id ON transactions (category_id)",
+    "CREATE INDEX ix_transactions_user_id_transaction_date ON transactions (user_id, transaction_date)",
+]
+
+SEED_USERS = [
+    """
+    INSERT INTO users (id, username, email, password)
+    SELECT u, 'user' || u, 'user' || u || '@example.com', 'not-a-hash'
+    FROM generate_series(1, :users) AS u
+    """,
+    """
+    INSERT INTO categories (name, user_id)
+    SELECT 'category ' || c, u
+    FROM generate_series(1, :users) AS u, generate_series(1, :categories) AS c
+    ORDER BY u, c
+    """,
+]
+
+# Both layouts get the same rows: random() is seeded first
+SEED_TRANSACTIONS = """
+    INSERT INTO transactions (
+        user_id, category_id, {amount_column}, currency, type, transaction_date, description, fingerprint
+    )
+    SELECT
+        u,
+        CASE WHEN i % 20 = 0 THEN NULL ELSE (u - 1) * :categories + i % :categories + 1 END,
+        {amount},
+        'USD',
+        (CASE WHEN i % 10 = 0 THEN 'INCOME' ELSE 'EXPENSE' END)::transactiontype,
+        now() - random() * interval '730 days',
+        'transaction ' || i,
+        md5(i::text) || md5((i + 1)::text)
+    FROM (SELECT i, 1 + i % :users AS u FROM generate_series(1, :transactions) AS i) AS s
+"""
+
+LAYOUTS = {
+    # The list query loaded whole rows before, and loads the list columns now
+    "previous": {
+        "amount_column": "amount",
+        "amount": "round((random() * 500)::numeric, 2)::double precision",
+        "columns": "*",
+    },
+    "compact": {
+        "amount_column": "amount_minor",
+        "amount": "round(random() * 50000)::bigint",
+        "columns": ", ".join(["user_id", "transaction_date"] + TRANSACTION_LIST_COLUMNS),
+    },
+}
+
+LIST_QUERY = """
+    SELECT {columns} FROM transactions
+    WHERE user_id = :user_id
+    ORDER BY transaction_date DESC
+    LIMIT :limit
+"""
+
+
+async def seed(engine, layout: str, rows: int) -> None:
+    schema = f"bench_storage_{layout}"
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        # transactiontype is found in public
+        await conn.execute(text(f"SET LOCAL search_path TO {schema}, public"))
+        tables = [User.__table__, Category.__table__]
+        if layout == "compact":
+            tables.append(Transaction.__table__)
+        await conn.run_sync(lambda sync_conn: User.metadata.create_all(sync_conn, tables=tables, checkfirst=False))
+        if layout == "previous":
+            for statement in PREVIOUS_LAYOUT:
+                await conn.execute(text(statement))
+
+        params = {"users": USERS, "categories": CATEGORIES_PER_USER, "transactions": rows}
+        for statement in SEED_USERS:
+            await conn.execute(text(statement), params)
+        await conn.execute(text("SELECT setseed(0.42)"))
+        await conn.execute(text(SEED_TRANSACTIONS.format(**LAYOUTS[layout])), params)
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"VACUUM ANALYZE {schema}.transactions"))
+
+
+async def measure(engine, layout: str, queries: int, limit: int) -> dict:
+    schema = f"bench_storage_{layout}"
+    async with engine.connect() as conn:
+        await conn.execute(text(f"SET search_path TO {schema}, public"))
+        sizes = (await conn.execute(text(
+            "SELECT pg_table_size('transactions'), pg_indexes_size('transactions'), "
+            "pg_relation_size('ix_transactions_user_id_transaction_date')"
+        ))).one()
+        width = (await conn.execute(text(
+            "SELECT avg(pg_column_size(t.*)) FROM transactions AS t"
+        ))).scalar_one()
+
+        query = text(LIST_QUERY.format(columns=LAYOUTS[layout]["columns"]))
+        rng = random.Random(0)
+        user_ids = [rng.randint(1, USERS) for _ in range(queries)]
+        # Warm the cache, then time
+        for user_id in user_ids:
+            (await conn.execute(query, {"user_id": user_id, "limit": limit})).all()
+        timings = []
+        for user_id in user_ids:
+            started = time.perf_counter()
+            (await conn.execute(query, {"user_id": user_id, "limit": limit})).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        await conn.rollback()
+
+    timings.sort()
+    return {
+        "table": sizes[0],
+        "indexes": sizes[1],
+        "list index": sizes[2],
+        "row": float(width),
+        "mean": sum(timings) / len(timings),
+        "p95": timings[int(len(timings) * 0.95)],
+    }
+
+
+def megabytes(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.database_url)
+    try:
+        results = {}
+        for layout in LAYOUTS:
+            started = time.perf_counter()
+            await seed(engine, layout, args.rows)
+            print(f"seeded {layout} layout in {time.perf_counter() - started:.1f} s")
+            results[layout] = await measure(engine, layout, args.queries, args.limit)
+
+        print(f"\n{args.rows:,} transactions, {USERS} users, list pages of {args.limit}")
+        print(f"{'':<28}" + "".join(f"{layout:>14}" for layout in results))
+        for label, key, fmt in (
+            ("table size", "table", megabytes),
+            ("index size (all)", "indexes", megabytes),
+            ("list index size", "list index", megabytes),
+            ("average row", "row", lambda value: f"{value:.1f} B"),
+            ("list query mean", "mean", lambda value: f"{value:.3f} ms"),
+            ("list query p95", "p95", lambda value: f"{value:.3f} ms"),
+        ):
+            print(f"{label:<28}" + "".join(f"{fmt(result[key]):>14}" for result in results.values()))
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                for layout in LAYOUTS:
+                    await conn.execute(text(f"DROP SCHEMA IF EXISTS bench_storage_{layout} CASCADE"))
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schemas")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import api from './api';
-import type { Transaction, TransactionCreate, TransactionUpdate, TransactionFilters } from './types';
+import type { Transaction, TransactionCreate, TransactionUpdate, TransactionFilters, TransactionChanges } from './types';
 
 export const transactionService = {
   // Get all transactions with optional filters
@@ -12,6 +12,7 @@ export const transactionService = {
     if (filters.end_date) params.append('end_date', filters.end_date);
     if (filters.transaction_type) params.append('transaction_type', filters.transaction_type);
     if (filters.category_id !== undefined) params.append('category_id', filters.category_id.toString());
+    if (filters.report_currency) params.append('report_currency', filters.report_currency);
 
     const queryString = params.toString();
     const url = queryString ? `/api/transactions?${queryString}` : '/api/transactions';
@@ -41,5 +42,14 @@ export const transactionService = {
   delete: async (id: number): Promise<void> => {
     await api.delete(`/api/transactions/${id}`);
   },
+
+  // Get changes since a sequence number (for incremental sync)
+  getChanges: async (since: number, limit?: number): Promise<TransactionChanges> => {
+    const params = new URLSearchParams({ since: since.toString() });
+    if (limit !== undefined) params.append('limit', limit.toString());
+
+    const response = await api.get<TransactionChanges>(`/api/transactions/changes?${params.toString()}`);
+    return response.data;
+  },
 };
 
@@ -15,6 +15,8 @@ export interface Transaction {
   id: number;
   user_id: number;
   amount: number;
+  currency: string;
+  report_amount?: number;
   type: TransactionType;
   transaction_date: string;
   description?: string;
@@ -26,6 +28,7 @@ export interface Transaction {
 
 export interface TransactionCreate {
   amount: number;
+  currency?: string;
   type: TransactionType;
   transaction_date?: string;
   description?: string;
@@ -34,6 +37,7 @@ export interface TransactionCreate {
 
 export interface TransactionUpdate {
   amount?: number;
+  currency?: string;
   type?: TransactionType;
   transaction_date?: string;
   description?: string;
@@ -47,5 +51,20 @@ export interface TransactionFilters {
   end_date?: string;
   transaction_type?: TransactionType;
   category_id?: number;
+  report_currency?: string;
 }
 
+export type ChangeOperation = 'insert' | 'update' | 'delete';
+
+export interface TransactionChange {
+  seq: number;
+  operation: ChangeOperation;
+  transaction_id: number;
+  transaction?: Transaction;
+}
+
+export interface TransactionChanges {
+  changes: TransactionChange[];
+  next_since: number;
+  has_more: boolean;
+}
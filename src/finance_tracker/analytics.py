@@ -0,0 +1,346 @@
+import copy
+import itertools
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select, func, cast, case, Float, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from .models import Transaction, TransactionType, MINOR_UNITS_PER_UNIT
+from .cache import TTLCache
+from .fx import fx_rates
+from .archive import archived_before, union_with_archive, transaction_columns
+
+load_dotenv()
+
+# Configuration
+# Column arrays are large (roughly 49 bytes per transaction), so only keep a few users
+ANALYTICS_CACHE_USERS = int(os.getenv("ANALYTICS_CACHE_USERS", "64"))
+
+SECONDS_PER_DAY = 86400
+# Scale factor making the median absolute deviation consistent with a normal std-dev
+MAD_SCALE = 0.6745
+# Same, for the mean absolute deviation used when the MAD is zero
+MEAN_AD_SCALE = 0.7979
+
+# Both depend on the loaded rates: columns encode currencies by their index
+# among the currencies with rates, and results may be converted
+columns_cache = TTLCache(entities=["transactions", "categories", "fx_rates"], maxsize=ANALYTICS_CACHE_USERS)
+results_cache = TTLCache(entities=["transactions", "categories", "fx_rates"], maxsize=4096)
+
+
+@dataclass
+class TransactionColumns:
+    """A user's transactions as parallel NumPy arrays."""
+    ids: np.ndarray           # int64
+    timestamps: np.ndarray    # float64, seconds since the Unix epoch (UTC)
+    amounts: np.ndarray       # float64, always positive
+    is_income: np.ndarray     # bool
+    category_ids: np.ndarray  # int64, -1 for uncategorized
+    currency_codes: np.ndarray  # int64, index into `currencies`, -1 if unknown
+    currencies: Tuple[str, ...]
+    days: np.ndarray = field(init=False)  # int64, day number since the Unix epoch (UTC)
+
+    def __post_init__(self):
+        self.days = np.floor_divide(self.timestamps, SECONDS_PER_DAY).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], currencies: Tuple[str, ...]) -> "TransactionColumns":
+        """
+        Build columns from (id, epoch, amount_minor, is_income, category_id, currency_code)
+        tuples, where amount_minor is in minor units and currency_code indexes `currencies`.
+        """
+        data = np.fromiter(
+            itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 6
+        ).reshape(len(rows), 6)
+        return cls(
+            ids=data[:, 0].astype(np.int64),
+            timestamps=data[:, 1],
+            amounts=data[:, 2] / MINOR_UNITS_PER_UNIT,
+            is_income=data[:, 3].astype(bool),
+            category_ids=data[:, 4].astype(np.int64),
+            currency_codes=data[:, 5].astype(np.int64),
+            currencies=currencies,
+        )
+
+    def currency_of(self, position: int) -> Optional[str]:
+        code = self.currency_codes[position]
+        return self.currencies[code] if code >= 0 else None
+
+    def in_currency(self, currency: Optional[str]) -> "TransactionColumns":
+        """
+        The same columns with amounts converted to a currency (None leaves them as
+        stored). Conversion is batched per source currency through the FX cache,
+        which must be loaded.
+
+        Raises:
+            FxRateMissing: If a needed exchange rate is not loaded
+        """
+        if currency is None:
+            return self
+        amounts = fx_rates.convert(self.amounts, self.currency_codes, self.currencies, self.days, currency)
+        if amounts is self.amounts:
+            return self
+        converted = copy.copy(self)
+        converted.amounts = amounts
+        return converted
+
+
+def build_columns_query(user_id: int, currencies: Tuple[str, ...], include_archive: bool = False) -> Select:
+    """Build the query that load_columns() runs, with currencies encoded by their index."""
+    source = Transaction
+    if include_archive:
+        source = aliased(Transaction, union_with_archive(
+            lambda model: select(*transaction_columns(model)).where(model.user_id == user_id)
+        ))
+    return select(
+        source.id,
+        cast(func.extract("epoch", source.transaction_date), Float),
+        source.amount_minor,
+        source.type == TransactionType.INCOME,
+        func.coalesce(source.category_id, -1),
+        case({currency: code for code, currency in enumerate(currencies)}, value=source.currency, else_=-1),
+    ).where(source.user_id == user_id)
+
+
+async def load_columns(db: AsyncSession, user_id: int) -> TransactionColumns:
+    """
+    Load a user's transactions as NumPy columns with a single query.
+
+    Dates are converted to epoch seconds, the type to a boolean and the currency
+    to an index into the currencies with exchange rates in SQL, so no Python
+    datetime, enum or string objects are created per row. Results are cached per
+    user until the user's transactions change. Also loads the FX rate cache.
+    Archived transactions are included.
+    """
+    await fx_rates.ensure_loaded()
+    cached = columns_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    cache_version = columns_cache.version
+    currencies = tuple(sorted(fx_rates.currencies))
+    include_archive = await archived_before(db, user_id) is not None
+    result = await db.execute(build_columns_query(user_id, currencies, include_archive))
+
+    columns = TransactionColumns.from_rows(result.all(), currencies)
+    columns_cache.set(user_id, columns, user_id, version=cache_version)
+    return columns
+
+
+def epoch_day(moment: datetime) -> int:
+    """Day number since the Unix epoch (UTC) of a datetime."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() // SECONDS_PER_DAY)
+
+
+def day_to_date(day: int) -> str:
+    return str(np.datetime64(day, "D"))
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average; the first window-1 entries average what is available."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (sums[end] - sums[start]) / (end - start)
+
+
+def daily_totals(columns: TransactionColumns, first_day: int, n_days: int) -> tuple:
+    """
+    Per-day income and expense totals for days [first_day, first_day + n_days).
+
+    Returns:
+        Tuple of (income, expense) float arrays of length n_days
+    """
+    offsets = columns.days - first_day
+    in_range = (offsets >= 0) & (offsets < n_days)
+    offsets = offsets[in_range]
+    amounts = columns.amounts[in_range]
+    is_income = columns.is_income[in_range]
+
+    income = np.bincount(offsets, weights=np.where(is_income, amounts, 0.0), minlength=n_days)
+    expense = np.bincount(offsets, weights=np.where(is_income, 0.0, amounts), minlength=n_days)
+    return income, expense
+
+
+def rolling_series(columns: TransactionColumns, as_of_day: int, days: int, windows: List[int]) -> Dict[str, Any]:
+    """Daily income, expense and net for the last `days` days with rolling averages."""
+    first_day = as_of_day - days + 1
+    # Include enough history for the first day's rolling windows to be complete
+    history = max(windows) - 1
+    income, expense = daily_totals(columns, first_day - history, days + history)
+    net = income - expense
+
+    return {
+        "dates": [day_to_date(day) for day in range(first_day, as_of_day + 1)],
+        "income": income[history:].tolist(),
+        "expense": expense[history:].tolist(),
+        "net": net[history:].tolist(),
+        "rolling": {
+            str(window): {
+                "expense": rolling_mean(expense, window)[history:].tolist(),
+                "net": rolling_mean(net, window)[history:].tolist(),
+            }
+            for window in windows
+        },
+    }
+
+
+def month_index(days: np.ndarray) -> np.ndarray:
+    """Months since January 1970 of each epoch day."""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def category_trends(columns: TransactionColumns, as_of_day: int, months: int) -> Dict[str, Any]:
+    """
+    Monthly expense per category over the last `months` months (current month
+    included) with the least-squares slope of each category's series.
+    """
+    last_month = int(month_index(np.array([as_of_day]))[0])
+    first_month = last_month - months + 1
+    first_day = int(np.datetime64(first_month, "M").astype("datetime64[D]").astype(np.int64))
+
+    # Select by day first; converting to months is the expensive part
+    in_range = (columns.days >= first_day) & (columns.days <= as_of_day) & ~columns.is_income
+    offsets = month_index(columns.days[in_range]) - first_month
+    categories, category_index = np.unique(columns.category_ids[in_range], return_inverse=True)
+
+    totals = np.bincount(
+        category_index * months + offsets,
+        weights=columns.amounts[in_range],
+        minlength=len(categories) * months,
+    ).reshape(len(categories), months)
+
+    # Slope of each row against month number, all rows at once
+    x = np.arange(months, dtype=np.float64)
+    x_centered = x - x.mean()
+    denominator = (x_centered ** 2).sum()
+    slopes = (totals - totals.mean(axis=1, keepdims=True)) @ x_centered / denominator if denominator else np.zeros(len(categories))
+
+    return {
+        "months": [str(np.datetime64(month, "M")) for month in range(first_month, last_month + 1)],
+        "categories": [
+            {
+                "category_id": int(category) if category >= 0 else None,
+                "monthly_expense": totals[row].tolist(),
+                "total": float(totals[row].sum()),
+                "slope": float(slopes[row]),
+            }
+            for row, category in enumerate(categories)
+        ],
+    }
+
+
+def month_end_forecast(columns: TransactionColumns, as_of_day: int, lookback_days: int) -> Dict[str, Any]:
+    """
+    Forecast month-end income, expense and net cash flow.
+
+    The projection is month-to-date totals, plus transactions already dated later
+    this month, plus the trailing `lookback_days` daily average for each day left
+    without such entries.
+    """
+    as_of = np.datetime64(as_of_day, "D")
+    month_start = int(as_of.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64))
+    month_end = int((as_of.astype("datetime64[M]") + 1).astype("datetime64[D]").astype(np.int64)) - 1
+    remaining_days = month_end - as_of_day
+
+    # Only the tail of the history matters
+    recent = columns.days > min(month_start - 1, as_of_day - lookback_days)
+    days = columns.days[recent]
+    is_income = columns.is_income[recent]
+    amounts = columns.amounts[recent]
+    signed = {
+        "income": np.where(is_income, amounts, 0.0),
+        "expense": np.where(is_income, 0.0, amounts),
+    }
+    to_date = (days >= month_start) & (days <= as_of_day)
+    scheduled = (days > as_of_day) & (days <= month_end)
+    lookback = (days > as_of_day - lookback_days) & (days <= as_of_day)
+
+    forecast: Dict[str, Any] = {
+        "month": str(as_of.astype("datetime64[M]")),
+        "as_of": day_to_date(as_of_day),
+        "days_remaining": remaining_days,
+    }
+    for kind, values in signed.items():
+        month_to_date = float(values[to_date].sum())
+        already_scheduled = float(values[scheduled].sum())
+        daily_average = float(values[lookback].sum()) / lookback_days
+        forecast[kind] = {
+            "month_to_date": month_to_date,
+            "scheduled": already_scheduled,
+            "daily_average": daily_average,
+            "projected": month_to_date + already_scheduled + daily_average * remaining_days,
+        }
+    forecast["net_projected"] = forecast["income"]["projected"] - forecast["expense"]["projected"]
+    return forecast
+
+
+def detect_anomalies(
+    columns: TransactionColumns,
+    since_day: int,
+    threshold: float,
+    min_samples: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Flag unusually large expenses using a robust z-score within each category.
+
+    The score is computed against each category's full history (median and median
+    absolute deviation); only transactions on or after `since_day` are reported.
+    Categories with fewer than `min_samples` expenses are never flagged.
+
+    Returns:
+        Dict with the flagged rows' positions in `columns` and their scores,
+        highest score first
+    """
+    positions = np.flatnonzero(~columns.is_income)
+    categories = columns.category_ids[positions]
+    amounts = columns.amounts[positions]
+
+    # Sort by category then amount so that each group's median sits at a fixed
+    # offset. A single float key (category + scaled amount in [0, 0.5]) sorts an
+    # order of magnitude faster than a two-key lexsort; rounding can only swap
+    # near-equal amounts, which does not move a median.
+    order = np.argsort(categories + amounts / (2 * amounts.max(initial=0.0) + 1.0))
+    positions, categories, amounts = positions[order], categories[order], amounts[order]
+    _, starts, counts = np.unique(categories, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(counts)), counts)
+
+    lower_mid = starts + (counts - 1) // 2
+    upper_mid = starts + counts // 2
+    median = (amounts[lower_mid] + amounts[upper_mid]) / 2
+    deviation = amounts - median[group]
+
+    abs_deviation = np.abs(deviation)
+    deviation_order = np.argsort(group + abs_deviation / (2 * abs_deviation.max(initial=0.0) + 1.0))
+    deviation_sorted = abs_deviation[deviation_order]
+    mad = (deviation_sorted[lower_mid] + deviation_sorted[upper_mid]) / 2
+    mean_ad = np.bincount(group, weights=abs_deviation, minlength=len(counts)) / np.maximum(counts, 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(
+            mad[group] > 0,
+            MAD_SCALE * deviation / mad[group],
+            MEAN_AD_SCALE * deviation / mean_ad[group],
+        )
+    scores = np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    flagged = (
+        (scores > threshold)
+        & (counts[group] >= min_samples)
+        & (columns.days[positions] >= since_day)
+    )
+    flagged_positions = positions[flagged]
+    flagged_scores = scores[flagged]
+    ranking = np.argsort(-flagged_scores)
+    return {"positions": flagged_positions[ranking], "scores": flagged_scores[ranking]}
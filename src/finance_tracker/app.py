@@ -1,12 +1,37 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from .routers import transactions, users, events, jobs, recurring, analytics, dashboard
+from .cache import invalidation_bus
+from .jobs import job_runner
+from .scheduler import recurring_scheduler
+from .fx import FxRateMissing
+from .shards import shard_router
+from .dashboard import dashboard_snapshots
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start per-worker background services
+    await invalidation_bus.start()
+    await job_runner.start()
+    await recurring_scheduler.start()
+    yield
+    await dashboard_snapshots.stop()
+    await recurring_scheduler.stop()
+    await job_runner.stop()
+    await invalidation_bus.stop()
+    await shard_router.dispose()
 
-from .routers import transactions, users
 
 app = FastAPI(
     title="Finance Tracker API",
     description="API for tracking personal finances",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -23,9 +48,19 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.exception_handler(FxRateMissing)
+async def fx_rate_missing_handler(request: Request, exc: FxRateMissing):
+    """Report amounts that cannot be converted to the requested currency."""
+    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content={"detail": str(exc)})
+
 # Include routers
 app.include_router(users.router)
 app.include_router(transactions.router)
+app.include_router(events.router)
+app.include_router(jobs.router)
+app.include_router(recurring.router)
+app.include_router(analytics.router)
+app.include_router(dashboard.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,212 @@
+"""
+Cold storage for old transactions.
+
+Transactions dated more than ARCHIVE_AFTER_MONTHS ago are moved from the hot
+`transactions` table to `transactions_archive`, which only carries a date and
+a fingerprint index, so the hot table and its indexes stay small. A per-user manifest records the
+archive cutoff: reads whose date range reaches before it read both tables with
+UNION ALL, others never touch the archive. Archived transactions are read-only.
+
+Archive every user's old transactions on every shard with:
+    poetry run python -m src.finance_tracker.archive [--months 24] [--user-id 42]
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, insert, delete, func, and_, union_all, Select, Subquery
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Transaction, ArchivedTransaction, ArchiveManifest, User
+from .cache import TTLCache, invalidation_bus
+from .scheduler import add_months
+from .shards import shard_router
+
+load_dotenv()
+
+# Configuration
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+
+# Columns shared by the hot table and the archive, in table order
+ARCHIVE_COLUMNS = [column.name for column in ArchivedTransaction.__table__.columns]
+
+# Archive cutoff per user (False when the user has no archive)
+manifest_cache = TTLCache(entities=["transactions"])
+
+
+def archive_cutoff(months: int = ARCHIVE_AFTER_MONTHS, now: Optional[datetime] = None) -> datetime:
+    """
+    Start of the month `months` months ago; transactions before it get archived.
+
+    Raises:
+        ValueError: If months is below 1, which would archive the current month
+    """
+    if months < 1:
+        raise ValueError(f"Archiving must keep at least the current month in the hot table, not {months} months")
+    now = now or datetime.now(timezone.utc)
+    return add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), -months)
+
+
+def job_archive_months(months: Any = None) -> int:
+    """
+    Months kept in the hot table by a user's archive job: ARCHIVE_AFTER_MONTHS
+    by default, and never fewer (archived transactions are read-only).
+
+    Raises:
+        ValueError: If months is not an integer of at least ARCHIVE_AFTER_MONTHS
+    """
+    if months is None:
+        return ARCHIVE_AFTER_MONTHS
+    if isinstance(months, bool) or not isinstance(months, int) or months < ARCHIVE_AFTER_MONTHS:
+        raise ValueError(f"months must be an integer of at least {ARCHIVE_AFTER_MONTHS}")
+    return months
+
+
+def _aware(moment: datetime) -> datetime:
+    """SQLite shards return naive (UTC) datetimes."""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def transaction_columns(model) -> list:
+    """The ARCHIVE_COLUMNS of Transaction or ArchivedTransaction."""
+    return [getattr(model, name) for name in ARCHIVE_COLUMNS]
+
+
+def reads_archive(archived_before: Optional[datetime], start_date: Optional[datetime] = None) -> bool:
+    """Whether a read of transactions from `start_date` on needs the archive."""
+    return archived_before is not None and (start_date is None or start_date < archived_before)
+
+
+def union_with_archive(build: Callable[[type], Select], name: str = "transactions") -> Subquery:
+    """
+    UNION ALL of a query over the hot table and the same query over the archive.
+
+    `build` is called with Transaction and with ArchivedTransaction and must
+    select the same columns from each (transaction_columns() for whole rows).
+    Wrap the result in aliased(Transaction, ...) to query it like the hot table.
+    """
+    return union_all(
+        # Each branch is its own subquery so it may carry ORDER BY and LIMIT
+        *(build(model).subquery().select() for model in (Transaction, ArchivedTransaction))
+    ).subquery(name)
+
+
+async def archived_before(db: AsyncSession, user_id: int) -> Optional[datetime]:
+    """The user's archive cutoff from the manifest, or None if nothing is archived."""
+    cached = manifest_cache.get(user_id)
+    if cached is not None:
+        return cached or None
+
+    cache_version = manifest_cache.version
+    result = await db.execute(select(ArchiveManifest.archived_before).where(ArchiveManifest.user_id == user_id))
+    cutoff = result.scalar_one_or_none()
+    if cutoff is not None:
+        cutoff = _aware(cutoff)
+    manifest_cache.set(user_id, cutoff or False, user_id, version=cache_version)
+    return cutoff
+
+
+async def get_archived(db: AsyncSession, user_id: int, transaction_ids: List[int]) -> List[ArchivedTransaction]:
+    """Fetch archived transactions of a user by ID."""
+    if not transaction_ids:
+        return []
+    result = await db.execute(
+        select(ArchivedTransaction).where(and_(
+            ArchivedTransaction.user_id == user_id, ArchivedTransaction.id.in_(transaction_ids)
+        ))
+    )
+    return list(result.scalars().all())
+
+
+async def archive_user(db: AsyncSession, user_id: int, cutoff: datetime) -> int:
+    """
+    Move a user's transactions dated before `cutoff` to the archive and update
+    the manifest. The caller commits.
+
+    On Postgres the rows are moved with a single DELETE ... RETURNING feeding the
+    INSERT, so a concurrent update is either archived or waited for, never lost.
+
+    Returns:
+        Number of transactions archived
+    """
+    hot = Transaction.__table__
+    archive = ArchivedTransaction.__table__
+    condition = and_(hot.c.user_id == user_id, hot.c.transaction_date < cutoff)
+
+    if db.bind.dialect.name == "postgresql":
+        moved = delete(hot).where(condition).returning(*[hot.c[name] for name in ARCHIVE_COLUMNS]).cte("moved")
+        result = await db.execute(
+            insert(archive).from_select(ARCHIVE_COLUMNS, select(moved)).add_cte(moved)
+        )
+        count = result.rowcount
+    else:
+        await db.execute(insert(archive).from_select(
+            ARCHIVE_COLUMNS, select(*[hot.c[name] for name in ARCHIVE_COLUMNS]).where(condition)
+        ))
+        count = (await db.execute(delete(hot).where(condition))).rowcount
+
+    manifest = await db.get(ArchiveManifest, user_id)
+    if count == 0 and manifest is None:
+        return 0
+
+    row_count, first_date, last_date = (await db.execute(
+        select(func.count(), func.min(archive.c.transaction_date), func.max(archive.c.transaction_date))
+        .where(archive.c.user_id == user_id)
+    )).one()
+    if manifest is None:
+        manifest = ArchiveManifest(user_id=user_id, archived_before=cutoff)
+        db.add(manifest)
+    # Never move the cutoff back: older rows may still sit in the archive
+    manifest.archived_before = max(_aware(manifest.archived_before), cutoff)
+    manifest.row_count = row_count
+    manifest.first_transaction_date = first_date
+    manifest.last_transaction_date = last_date
+
+    # The data itself is unchanged, so no change event; cached reads are dropped
+    await invalidation_bus.publish(db, user_id, "transactions")
+    return count
+
+
+async def archive_shard(shard: int, cutoff: datetime, user_ids: Optional[List[int]] = None) -> int:
+    """Archive the old transactions of every user (or the given users) on a shard, one transaction per user."""
+    async with shard_router.session(shard) as db:
+        if user_ids is None:
+            user_ids = list((await db.execute(select(User.id).order_by(User.id))).scalars().all())
+
+    total = 0
+    for user_id in user_ids:
+        async with shard_router.session(shard) as db:
+            total += await archive_user(db, user_id, cutoff)
+            await db.commit()
+    return total
+
+
+async def _run(args: argparse.Namespace) -> None:
+    cutoff = archive_cutoff(args.months)
+    try:
+        if args.user_id is not None:
+            total = await archive_shard(await shard_router.shard_of(args.user_id), cutoff, [args.user_id])
+        else:
+            total = 0
+            for shard in range(len(shard_router)):
+                total += await archive_shard(shard, cutoff)
+        print(f"Archived {total} transactions dated before {cutoff.date().isoformat()}")
+    finally:
+        await shard_router.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move old transactions to the archive table.")
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="Keep this many months in the hot table")
+    parser.add_argument("--user-id", type=int, help="Only archive this user's transactions")
+    args = parser.parse_args()
+    if args.months < 1:
+        parser.error("--months must be at least 1 (the current month is never archived)")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
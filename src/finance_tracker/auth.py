@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import AsyncIterator, Optional
 import os
 from dotenv import load_dotenv
 
@@ -8,11 +8,13 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, Select
 
-from .models import User
+from .models import User, UserDirectory
 from .schemas import TokenData
 from .database import get_db
+from .cache import TTLCache
+from .shards import shard_router
 
 load_dotenv()
 
@@ -27,6 +29,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Authenticated users by username, shared across requests in this worker
+user_cache = TTLCache(entities=["user"])
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -62,6 +67,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def build_user_query(username: str) -> Select:
+    """Build the directory lookup of the authenticated user (served by ix_user_directory_username)."""
+    return select(UserDirectory).where(UserDirectory.username == username)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
@@ -71,7 +81,7 @@ async def get_current_user(
     
     Args:
         token: JWT token from Authorization header
-        db: Database session
+        db: Session on the default database, which holds the user directory
         
     Returns:
         User object of the authenticated user
@@ -98,17 +108,43 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    # Fetch user from database
-    query = select(User).where(User.username == token_data.username)
+    cached_user = user_cache.get(token_data.username)
+    if cached_user is not None:
+        return cached_user
+
+    # Find the user's shard in the directory, then fetch the user from it
+    cache_version = user_cache.version
+    query = build_user_query(token_data.username)
     result = await db.execute(query)
-    user = result.scalar_one_or_none()
-    
-    if user is None:
+    entry = result.scalar_one_or_none()
+
+    if entry is None:
         raise credentials_exception
+
+    shard_router.remember(entry.id, entry.shard)
+    async with shard_router.session(entry.shard) as shard_db:
+        user = await shard_db.get(User, entry.id)
+        if user is None:
+            raise credentials_exception
+        # Detach so the cached instance is never tied to this request's session
+        shard_db.expunge(user)
+
+    user_cache.set(token_data.username, user, user.id, version=cache_version)
         
     return user
 
 
+async def get_user_db(current_user: User = Depends(get_current_user)) -> AsyncIterator[AsyncSession]:
+    """
+    Dependency yielding a session on the shard holding the current user's data.
+
+    Use instead of get_db for everything except the global tables (user
+    directory, jobs, FX rates), which stay on the default database.
+    """
+    async with shard_router.user_session(current_user.id) as session:
+        yield session
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -0,0 +1,423 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import asyncpg
+from dotenv import load_dotenv
+from sqlalchemy import text, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import DATABASE_URL, SHARD_DATABASE_URLS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_FALLBACK_TTL_SECONDS = float(os.getenv("CACHE_FALLBACK_TTL_SECONDS", "5"))
+CACHE_LISTENER_ENABLED = os.getenv("CACHE_LISTENER_ENABLED", "true").lower() == "true"
+
+INVALIDATION_CHANNEL = "finance_tracker_invalidate"
+LISTENER_MIN_BACKOFF_SECONDS = 1.0
+LISTENER_MAX_BACKOFF_SECONDS = 30.0
+LISTENER_KEEPALIVE_SECONDS = 30.0
+
+# Identifies this process so it can tell its own notifications apart
+WORKER_ID = uuid.uuid4().hex
+
+# Session.info key of the local evictions to run once the session commits
+PENDING_EVICTIONS_KEY = "pending_cache_evictions"
+
+# Callback invoked with the affected user ID, or None to evict everything
+InvalidationCallback = Callable[[Optional[int]], None]
+
+# Callback invoked with (user_id, entity, data) for changes made by other workers
+RemoteChangeCallback = Callable[[int, str, Optional[Dict[str, Any]]], None]
+
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Write handlers call publish() inside their transaction; the local caches are
+    evicted and Postgres delivers the notification to every worker once the
+    transaction commits. Each worker keeps
+    one dedicated asyncpg connection per database (the default database and every
+    shard, since a notification is only delivered on the database it was sent on)
+    listening on the channel and evicts matching local cache entries. While any
+    of those connections is down, caches fall back to a short TTL instead of
+    trusting their entries.
+    """
+
+    def __init__(self, dsns: Sequence[str]):
+        self.dsns = list(dict.fromkeys(dsns))
+        self._connected: set = set()
+        self._subscribers: Dict[str, List[InvalidationCallback]] = {}
+        self._remote_subscribers: List[RemoteChangeCallback] = []
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def listening(self) -> bool:
+        """Whether a listener is connected to every database."""
+        return bool(self.dsns) and len(self._connected) == len(self.dsns)
+
+    @property
+    def reliable(self) -> bool:
+        """Whether local caches can rely on invalidations instead of short TTLs."""
+        return self.listening or not self.dsns
+
+    def subscribe(self, entity: str, callback: InvalidationCallback) -> None:
+        """Register a callback run whenever an entity changes for a user."""
+        self._subscribers.setdefault(entity, []).append(callback)
+
+    def subscribe_remote(self, callback: RemoteChangeCallback) -> None:
+        """Register a callback run for every change published by another worker."""
+        self._remote_subscribers.append(callback)
+
+    def evict(self, user_id: Optional[int], entity: Optional[str] = None) -> None:
+        """
+        Evict local cache entries.
+
+        Args:
+            user_id: Affected user, or None for all users
+            entity: Changed entity, or None for every entity
+        """
+        if entity is None:
+            callbacks = [cb for entity_callbacks in self._subscribers.values() for cb in entity_callbacks]
+        else:
+            callbacks = self._subscribers.get(entity, [])
+
+        for callback in callbacks:
+            try:
+                callback(user_id)
+            except Exception:
+                logger.exception("Cache invalidation callback failed")
+
+    async def publish(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        entity: str,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Announce that an entity changed for a user.
+
+        Must be called before the session commits. Local caches are evicted
+        once the session commits (not before, so a read in between cannot
+        re-cache the old data under the new version) and nothing is evicted
+        if it rolls back; the NOTIFY is delivered to other workers on commit.
+        `data` is passed on to remote change subscribers and must stay small
+        (NOTIFY payloads are limited to 8000 bytes).
+        """
+        db.info.setdefault(PENDING_EVICTIONS_KEY, []).append((self, user_id, entity))
+
+        if db.bind.dialect.name != "postgresql":
+            return
+
+        payload = json.dumps({"origin": WORKER_ID, "user_id": user_id, "entity": entity, "data": data})
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": INVALIDATION_CHANNEL, "payload": payload}
+        )
+
+    def _on_notification(self, connection, pid, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            user_id = message["user_id"]
+            entity = message["entity"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload: %r", payload)
+            return
+
+        self.evict(user_id, entity)
+
+        if message.get("origin") == WORKER_ID:
+            return
+        for callback in self._remote_subscribers:
+            try:
+                callback(user_id, entity, message.get("data"))
+            except Exception:
+                logger.exception("Remote change callback failed")
+
+    async def _listen(self, dsn: str) -> None:
+        """Hold the listener connection to one database, reconnecting with exponential backoff."""
+        backoff = LISTENER_MIN_BACKOFF_SECONDS
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(INVALIDATION_CHANNEL, self._on_notification)
+
+                # Anything cached while we were not listening may have missed events
+                self.evict(None)
+                self._connected.add(dsn)
+                backoff = LISTENER_MIN_BACKOFF_SECONDS
+                logger.info("Cache invalidation listener connected")
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=LISTENER_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Detect half-open connections that never report termination
+                        await connection.fetchval("SELECT 1")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Cache invalidation listener dropped: %s", exc)
+            finally:
+                self._connected.discard(dsn)
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, LISTENER_MAX_BACKOFF_SECONDS)
+
+    async def start(self) -> None:
+        """Start one listener task per database (no-op when there is nothing to listen to)."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._listen(dsn)) for dsn in self.dsns]
+
+    async def stop(self) -> None:
+        """Stop the listener tasks."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._connected.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session: Session) -> None:
+    for bus, user_id, entity in session.info.pop(PENDING_EVICTIONS_KEY, ()):
+        bus.evict(user_id, entity)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_evictions(session: Session) -> None:
+    session.info.pop(PENDING_EVICTIONS_KEY, None)
+
+
+def _listener_dsns() -> List[str]:
+    if not CACHE_LISTENER_ENABLED:
+        return []
+    # asyncpg takes a plain libpq URL
+    return [
+        url.replace("+asyncpg", "")
+        for url in [DATABASE_URL, *SHARD_DATABASE_URLS]
+        if url.startswith("postgresql")
+    ]
+
+
+invalidation_bus = InvalidationBus(_listener_dsns())
+
+
+class TTLCache:
+    """
+    Bounded per-process cache whose entries are tagged with a user ID.
+
+    Entries are evicted when the invalidation bus reports a change to one of the
+    given entities for that user. Entries live for `ttl` seconds while the bus is
+    reliable and only `fallback_ttl` seconds while it is not.
+    """
+
+    def __init__(
+        self,
+        entities: List[str],
+        maxsize: int = 10000,
+        ttl: float = CACHE_TTL_SECONDS,
+        fallback_ttl: float = CACHE_FALLBACK_TTL_SECONDS,
+        bus: InvalidationBus = invalidation_bus,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.bus = bus
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, user_id, value)
+        self._keys_by_user: Dict[int, set] = {}
+        self._version = 0  # Bumped on every invalidation
+
+        for entity in entities:
+            bus.subscribe(entity, self.invalidate_user)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, user_id, value = entry
+        ttl = self.ttl if self.bus.reliable else self.fallback_ttl
+        if time.monotonic() - stored_at > ttl:
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    @property
+    def version(self) -> int:
+        """Token to read before loading a value and pass to set()."""
+        return self._version
+
+    def set(self, key: Hashable, value: Any, user_id: int, version: Optional[int] = None) -> None:
+        """
+        Store a value that depends on the given user's data.
+
+        If `version` is given and an invalidation happened since it was read, the
+        value may already be stale and is not stored.
+        """
+        if version is not None and version != self._version:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic(), user_id, value)
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        """Evict every entry of a user, or everything when user_id is None."""
+        self._version += 1
+        if user_id is None:
+            self.clear()
+            return
+        for key in list(self._keys_by_user.get(user_id, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_keys = self._keys_by_user.get(entry[1])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[entry[1]]
+
+
+class SnapshotCache:
+    """
+    Bounded per-process cache of one precomputed value per user, served stale
+    while it is recomputed.
+
+    A change to one of the given entities marks the user's snapshot stale
+    instead of evicting it, as does reaching the TTL (`fallback_ttl` while the
+    bus is not reliable). A read of a stale snapshot returns it at once and
+    recomputes it in a background task; only a read with no snapshot at all
+    waits. At most one computation per user runs at a time: concurrent reads
+    share it. The least recently read users are evicted beyond `maxsize`.
+    """
+
+    def __init__(
+        self,
+        entities: List[str],
+        compute: Callable[[int], Awaitable[Any]],
+        maxsize: int = 1000,
+        ttl: float = CACHE_TTL_SECONDS,
+        fallback_ttl: float = CACHE_FALLBACK_TTL_SECONDS,
+        bus: InvalidationBus = invalidation_bus,
+    ):
+        self.compute = compute
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.bus = bus
+        self._entries: "OrderedDict[int, list]" = OrderedDict()  # user_id -> [computed_at, stale, value]
+        self._inflight: Dict[int, asyncio.Task] = {}
+        # Users whose data changed while their snapshot was being computed
+        self._outdated: set = set()
+
+        for entity in entities:
+            bus.subscribe(entity, self.invalidate_user)
+
+    async def get(self, user_id: int) -> Tuple[Any, bool]:
+        """
+        Return the user's snapshot, computing it first if there is none.
+
+        Returns:
+            Tuple of (snapshot, whether it is stale and being recomputed)
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            # Shielded so a client going away does not cancel a computation others share
+            return await asyncio.shield(self.refresh(user_id)), False
+
+        self._entries.move_to_end(user_id)
+        computed_at, stale, value = entry
+        ttl = self.ttl if self.bus.reliable else self.fallback_ttl
+        if stale or time.monotonic() - computed_at > ttl:
+            self.refresh(user_id)
+            return value, True
+        return value, False
+
+    def refresh(self, user_id: int) -> asyncio.Task:
+        """Start recomputing a user's snapshot unless that is already under way."""
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._compute(user_id))
+            task.add_done_callback(self._log_failure)
+            self._inflight[user_id] = task
+        return task
+
+    async def _compute(self, user_id: int) -> Any:
+        try:
+            value = await self.compute(user_id)
+            self._store(user_id, value, stale=user_id in self._outdated)
+            return value
+        finally:
+            del self._inflight[user_id]
+            self._outdated.discard(user_id)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Snapshot computation failed", exc_info=task.exception())
+
+    def _store(self, user_id: int, value: Any, stale: bool) -> None:
+        self._entries[user_id] = [time.monotonic(), stale, value]
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        """Mark a user's snapshot stale, or every snapshot when user_id is None."""
+        user_ids = list(self._entries) + list(self._inflight) if user_id is None else [user_id]
+        for stale_user_id in user_ids:
+            entry = self._entries.get(stale_user_id)
+            if entry is not None:
+                entry[1] = True
+            if stale_user_id in self._inflight:
+                self._outdated.add(stale_user_id)
+
+    async def stop(self) -> None:
+        """Cancel the computations under way."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
@@ -0,0 +1,62 @@
+from typing import Sequence
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User, TransactionChange, ChangeOperation
+
+
+async def allocate_sequence(db: AsyncSession, user_id: int, count: int = 1) -> int:
+    """
+    Reserve `count` consecutive change sequence numbers for a user.
+
+    The UPDATE locks the user's row until the surrounding transaction ends, so a
+    user's changes commit in sequence order and a reader can never observe seq N
+    before every seq below N is visible.
+
+    Returns:
+        The last reserved sequence number
+    """
+    query = (
+        update(User)
+        .where(User.id == user_id)
+        .values(change_seq=User.change_seq + count)
+        .returning(User.change_seq)
+    )
+    result = await db.execute(query)
+    return result.scalar_one()
+
+
+async def record_changes(
+    db: AsyncSession,
+    user_id: int,
+    transaction_ids: Sequence[int],
+    operation: ChangeOperation,
+) -> int:
+    """
+    Append entries to a user's change feed in one statement.
+
+    Must run in the same database transaction as the change it records.
+
+    Returns:
+        The sequence number of the last recorded change, or 0 if nothing was recorded
+    """
+    if not transaction_ids:
+        return 0
+
+    last_seq = await allocate_sequence(db, user_id, len(transaction_ids))
+    first_seq = last_seq - len(transaction_ids) + 1
+
+    await db.execute(
+        insert(TransactionChange),
+        [
+            {
+                "user_id": user_id,
+                "seq": first_seq + offset,
+                "transaction_id": transaction_id,
+                "operation": operation,
+            }
+            for offset, transaction_id in enumerate(transaction_ids)
+        ]
+    )
+    return last_seq
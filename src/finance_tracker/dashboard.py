@@ -0,0 +1,131 @@
+"""
+Per-user dashboard snapshot: the most recent transactions, month-to-date totals
+and the month's top expense categories, computed together and served from a
+SnapshotCache so a page load costs no queries while the user's data is unchanged.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, Select
+
+from .models import Transaction, Category, TransactionType, from_minor_units
+from .cache import SnapshotCache
+from .shards import shard_router
+from .archive import archived_before
+from .queries import build_transactions_query
+
+load_dotenv()
+
+# Configuration
+DASHBOARD_CACHE_USERS = int(os.getenv("DASHBOARD_CACHE_USERS", "1000"))
+DASHBOARD_RECENT_TRANSACTIONS = int(os.getenv("DASHBOARD_RECENT_TRANSACTIONS", "10"))
+DASHBOARD_TOP_CATEGORIES = int(os.getenv("DASHBOARD_TOP_CATEGORIES", "5"))
+
+
+def month_start(now: datetime) -> datetime:
+    """Start of the (UTC) calendar month of a datetime."""
+    return now.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def build_month_totals_query(user_id: int, since: datetime, until: datetime) -> Select:
+    """
+    Build the query for a user's totals per currency, type and category over a
+    date range.
+
+    Reads only columns the (user_id, transaction_date) index includes. The
+    current month is never archived, so the archive is not read.
+    """
+    return (
+        select(
+            Transaction.currency,
+            Transaction.type,
+            Transaction.category_id,
+            Category.name,
+            func.sum(Transaction.amount_minor),
+            func.count(),
+        )
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= since,
+            Transaction.transaction_date <= until,
+        )
+        .group_by(Transaction.currency, Transaction.type, Transaction.category_id, Category.name)
+    )
+
+
+async def compute_snapshot(user_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Compute a user's dashboard snapshot with two queries on the user's shard.
+
+    Totals are kept per currency, and the top categories are ranked within
+    each currency, so amounts in different currencies are never added up.
+    """
+    now = now or datetime.now(timezone.utc)
+    since = month_start(now)
+
+    async with shard_router.user_session(user_id) as db:
+        recent_query = build_transactions_query(
+            user_id, limit=DASHBOARD_RECENT_TRANSACTIONS, archive_cutoff=await archived_before(db, user_id)
+        )
+        recent = (await db.execute(recent_query)).scalars().all()
+        totals = (await db.execute(build_month_totals_query(user_id, since, now))).all()
+
+    # currency -> [income, expense, transactions], in minor units
+    month_to_date: Dict[str, List[int]] = {}
+    categories: Dict[str, List[tuple]] = {}
+    for currency, transaction_type, category_id, name, amount_minor, count in totals:
+        currency_totals = month_to_date.setdefault(currency, [0, 0, 0])
+        currency_totals[0 if transaction_type == TransactionType.INCOME else 1] += amount_minor
+        currency_totals[2] += count
+        if transaction_type == TransactionType.EXPENSE:
+            categories.setdefault(currency, []).append((amount_minor, count, category_id, name))
+
+    top_categories = []
+    for currency in sorted(categories):
+        ranked = sorted(categories[currency], key=lambda category: category[0], reverse=True)
+        top_categories.extend(
+            {
+                "category_id": category_id,
+                "name": name,
+                "currency": currency,
+                "expense": from_minor_units(amount_minor),
+                "transactions": count,
+            }
+            for amount_minor, count, category_id, name in ranked[:DASHBOARD_TOP_CATEGORIES]
+        )
+
+    return {
+        "month": since.strftime("%Y-%m"),
+        "computed_at": now,
+        "recent_transactions": [
+            {
+                "id": transaction.id,
+                "transaction_date": transaction.transaction_date,
+                "type": transaction.type,
+                "amount": transaction.amount,
+                "currency": transaction.currency,
+                "description": transaction.description,
+                "category_id": transaction.category_id,
+            }
+            for transaction in recent
+        ],
+        "month_to_date": [
+            {
+                "currency": currency,
+                "income": from_minor_units(income),
+                "expense": from_minor_units(expense),
+                "net": from_minor_units(income - expense),
+                "transactions": count,
+            }
+            for currency, (income, expense, count) in sorted(month_to_date.items())
+        ],
+        "top_categories": top_categories,
+    }
+
+
+dashboard_snapshots = SnapshotCache(
+    entities=["transactions", "categories"], compute=compute_snapshot, maxsize=DASHBOARD_CACHE_USERS
+)
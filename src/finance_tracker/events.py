@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence, Set
+
+from dotenv import load_dotenv
+
+from .cache import invalidation_bus
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "500"))
+SSE_STREAM_LIFETIME_SECONDS = float(os.getenv("SSE_STREAM_LIFETIME_SECONDS", "300"))
+
+# Events carrying more IDs than this only carry the sequence number
+MAX_EVENT_IDS = 100
+
+RESYNC_EVENT = {"event": "resync", "data": {}}
+
+
+class StreamLimitExceeded(Exception):
+    """Raised when this worker already serves the maximum number of streams."""
+
+
+def change_event(
+    seq: int,
+    inserted: Sequence[int] = (),
+    updated: Sequence[int] = (),
+    deleted: Sequence[int] = (),
+) -> Dict[str, Any]:
+    """
+    Build the payload announcing changes to a user's transactions.
+
+    `seq` is the change feed sequence number after the change; clients that miss
+    events catch up through GET /api/transactions/changes.
+    """
+    payload: Dict[str, Any] = {"seq": seq}
+    if len(inserted) + len(updated) + len(deleted) <= MAX_EVENT_IDS:
+        payload.update(inserted=list(inserted), updated=list(updated), deleted=list(deleted))
+    else:
+        payload["truncated"] = True
+    return payload
+
+
+class Subscription:
+    """One open event stream, with a bounded queue of pending events."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event without blocking the publisher.
+
+        A consumer too slow to keep up loses its pending events and is told to
+        resync from the change feed instead.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(RESYNC_EVENT)
+
+
+class EventHub:
+    """
+    In-process pub/sub hub fanning out per-user events to open SSE streams.
+
+    Write handlers publish after committing. Events published on other workers
+    arrive through the invalidation bus.
+    """
+
+    def __init__(
+        self,
+        max_streams: int = SSE_MAX_STREAMS,
+        queue_size: int = SSE_QUEUE_SIZE,
+        heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+        stream_lifetime_seconds: float = SSE_STREAM_LIFETIME_SECONDS,
+    ):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stream_lifetime_seconds = stream_lifetime_seconds
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._count = 0
+
+    @property
+    def stream_count(self) -> int:
+        return self._count
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Open a subscription for a user's events.
+
+        Raises:
+            StreamLimitExceeded: If this worker is at its stream cap
+        """
+        if self._count >= self.max_streams:
+            raise StreamLimitExceeded()
+
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        user_subscriptions = self._subscriptions.get(subscription.user_id)
+        if not user_subscriptions or subscription not in user_subscriptions:
+            return
+
+        user_subscriptions.discard(subscription)
+        self._count -= 1
+        if not user_subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: str, data: Dict[str, Any]) -> None:
+        """Deliver an event to every open stream of a user on this worker."""
+        for subscription in self._subscriptions.get(user_id, ()):
+            subscription.deliver({"event": event, "data": data})
+
+    def _on_remote_change(self, user_id: int, entity: str, data: Optional[Dict[str, Any]]) -> None:
+        if data is not None:
+            self.publish(user_id, entity, data)
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+event_hub = EventHub()
+invalidation_bus.subscribe_remote(event_hub._on_remote_change)
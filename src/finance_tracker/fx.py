@@ -0,0 +1,329 @@
+"""
+Exchange rates: an in-memory, date-indexed cache of the fx_rates table and a
+loader for rate files.
+
+Load a rate file with:
+    poetry run python -m src.finance_tracker.fx rates.csv [--base EUR]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from .database import async_session
+from .models import FxRate, DEFAULT_CURRENCY
+from .cache import invalidation_bus, InvalidationBus
+
+load_dotenv()
+
+# Configuration
+# Rates are reloaded after this long even without an invalidation
+FX_RATES_TTL_SECONDS = float(os.getenv("FX_RATES_TTL_SECONDS", "3600"))
+
+FX_LOAD_BATCH_SIZE = 5000
+SECONDS_PER_DAY = 86400
+
+
+class FxRateMissing(Exception):
+    """No exchange rate is known for a currency on or before a date."""
+
+    def __init__(self, currency: Optional[str], day: Optional[int] = None):
+        self.currency = currency
+        self.day = day
+        if currency is None:
+            message = "No exchange rates for one or more transaction currencies"
+        elif day is None:
+            message = f"No exchange rates for {currency}"
+        else:
+            message = f"No exchange rate for {currency} on or before {np.datetime64(day, 'D')}"
+        super().__init__(message)
+
+
+def epoch_days(moments: Sequence[datetime]) -> np.ndarray:
+    """Day number since the Unix epoch (UTC) of each datetime; naive ones are taken as UTC."""
+    timestamps = (
+        (moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)).timestamp()
+        for moment in moments
+    )
+    return np.floor_divide(
+        np.fromiter(timestamps, dtype=np.float64, count=len(moments)), SECONDS_PER_DAY,
+    ).astype(np.int64)
+
+
+def encode_currencies(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Encode currency codes as small integers.
+
+    Returns:
+        Tuple of (index into the currency list for each value, currency list)
+    """
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+class FxRateCache:
+    """
+    In-memory copy of the fx_rates table, indexed by date.
+
+    Each currency's history is held as two sorted arrays (day number, rate), so
+    converting a batch of amounts takes one np.searchsorted per currency instead
+    of a lookup per row. The rate in effect on a day is the latest one on or
+    before it. The whole table is dropped when the loader publishes new rates.
+    """
+
+    def __init__(self, ttl: float = FX_RATES_TTL_SECONDS, bus: InvalidationBus = invalidation_bus):
+        self.ttl = ttl
+        self._rates: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+        self._loaded_at = 0.0
+
+        bus.subscribe("fx_rates", lambda user_id: self.clear())
+
+    @property
+    def loaded(self) -> bool:
+        return self._rates is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    def clear(self) -> None:
+        self._rates = None
+
+    async def ensure_loaded(self) -> None:
+        """
+        Load the rate table with one query unless a fresh copy is held.
+
+        Rates live in the default database, not on the user data shards.
+        """
+        if self.loaded:
+            return
+
+        query = select(FxRate.currency, FxRate.rate_date, FxRate.rate).order_by(FxRate.currency, FxRate.rate_date)
+        async with async_session() as db:
+            rows = (await db.execute(query)).all()
+
+        rates: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        if rows:
+            currencies = [row[0] for row in rows]
+            days = np.array([row[1] for row in rows], dtype="datetime64[D]").astype(np.int64)
+            values = np.array([row[2] for row in rows], dtype=np.float64)
+            # Rows are sorted by currency, so each currency is one contiguous slice
+            bounds = [0] + [i for i in range(1, len(rows)) if currencies[i] != currencies[i - 1]] + [len(rows)]
+            for start, end in zip(bounds, bounds[1:]):
+                rates[currencies[start]] = (days[start:end], values[start:end])
+
+        self._rates = rates
+        self._loaded_at = time.monotonic()
+
+    @property
+    def currencies(self) -> set:
+        """Currencies amounts can be converted from and to."""
+        return set(self._rates or ()) | {DEFAULT_CURRENCY}
+
+    def _lookup(self, currency: str, days: np.ndarray) -> np.ndarray:
+        """Rate in effect on each day, NaN where none is known."""
+        if currency == DEFAULT_CURRENCY:
+            return np.ones(len(days))
+        if not self._rates or currency not in self._rates:
+            return np.full(len(days), np.nan)
+
+        rate_days, values = self._rates[currency]
+        index = np.searchsorted(rate_days, days, side="right") - 1
+        return np.where(index >= 0, values[index], np.nan)
+
+    def rates(self, currency: str, days: np.ndarray) -> np.ndarray:
+        """
+        Rate (units of the currency per DEFAULT_CURRENCY) in effect on each day.
+
+        Raises:
+            FxRateMissing: If the currency has no rate on or before one of the days
+        """
+        rates = self._lookup(currency, days)
+        missing = np.isnan(rates)
+        if missing.any():
+            if currency not in (self._rates or ()):
+                raise FxRateMissing(currency)
+            raise FxRateMissing(currency, int(days[missing].min()))
+        return rates
+
+    def convert(
+        self,
+        amounts: np.ndarray,
+        codes: np.ndarray,
+        currencies: Sequence[Optional[str]],
+        days: np.ndarray,
+        target: str,
+    ) -> np.ndarray:
+        """
+        Convert amounts to a target currency at the rate of each amount's day.
+
+        When the amounts cover a dense range of days, a table of conversion
+        factors per (currency, day) is built first and every amount is converted
+        with a single gather from it; otherwise rates are looked up per currency.
+
+        Args:
+            amounts: Amounts in their own currency
+            codes: Index into `currencies` of each amount's currency (-1 if unknown)
+            currencies: Currency codes
+            days: Day number since the Unix epoch of each amount
+            target: Currency to convert to
+
+        Returns:
+            Converted amounts (`amounts` itself when nothing needs converting)
+
+        Raises:
+            FxRateMissing: If a needed rate is not loaded
+        """
+        if len(amounts) == 0:
+            return amounts
+        if codes.min() < 0:
+            raise FxRateMissing(None)
+
+        present = np.flatnonzero(np.bincount(codes, minlength=len(currencies)))
+        if len(present) == 1 and currencies[present[0]] == target:
+            return amounts
+
+        first_day = int(days.min())
+        span = int(days.max()) - first_day + 1
+        if span * len(present) <= len(amounts):
+            calendar = np.arange(first_day, first_day + span)
+            target_rates = self._lookup(target, calendar)
+            factors = np.full((len(currencies), span), np.nan)
+            for code in present:
+                factors[code] = target_rates / self._lookup(currencies[code], calendar)
+            converted = amounts * factors[codes, days - first_day]
+            if not np.isnan(converted).any():
+                return converted
+            # Otherwise fall through to find and report the missing rate
+
+        target_rates = self.rates(target, days)
+        converted = np.empty_like(amounts, dtype=np.float64)
+        for code in present:
+            mask = codes == code
+            converted[mask] = amounts[mask] * target_rates[mask] / self.rates(currencies[code], days[mask])
+        return converted
+
+    def convert_values(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        moments: Sequence[datetime],
+        target: str,
+    ) -> np.ndarray:
+        """convert() for a batch of Python values, e.g. one page of transactions."""
+        codes, currency_list = encode_currencies(currencies)
+        return self.convert(
+            np.asarray(amounts, dtype=np.float64), codes, currency_list, epoch_days(moments), target
+        )
+
+
+fx_rates = FxRateCache()
+
+
+def read_rate_file(path: str, base: str = DEFAULT_CURRENCY) -> Tuple[List[dict], int]:
+    """
+    Read an exchange rate CSV file.
+
+    Two layouts are accepted: long, with `date`, `currency` and `rate` columns, and
+    wide, with a date in the first column and one column per currency (the ECB
+    reference rate history layout). Rates are units of the currency per `base`;
+    they are converted to be per DEFAULT_CURRENCY, which needs a DEFAULT_CURRENCY
+    quote on every date when `base` is another currency.
+
+    Returns:
+        Tuple of (rows for the fx_rates table, number of dates skipped for lack of
+        a DEFAULT_CURRENCY quote)
+
+    Raises:
+        ValueError: If the file quotes `base` itself at a rate other than 1, i.e.
+            its rates are against another base (such as EUR for the ECB history)
+    """
+    quotes: Dict[date, Dict[str, float]] = defaultdict(dict)
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader, [])]
+        lowered = [column.lower() for column in header]
+
+        if "currency" in lowered and "rate" in lowered:
+            date_column = lowered.index("date")
+            currency_column = lowered.index("currency")
+            rate_column = lowered.index("rate")
+            records = (
+                (record[date_column], record[currency_column], record[rate_column])
+                for record in reader if record
+            )
+        else:
+            records = (
+                (record[0], currency, value)
+                for record in reader if record
+                for currency, value in zip(header[1:], record[1:])
+                if currency
+            )
+
+        for day, currency, value in records:
+            try:
+                rate = float(value)
+            except ValueError:
+                continue  # e.g. "N/A" before a currency was quoted
+            if rate > 0:
+                quotes[date.fromisoformat(day.strip()[:10])][currency.strip().upper()] = rate
+
+    base = base.upper()
+    rows: List[dict] = []
+    skipped = 0
+    for day, day_quotes in quotes.items():
+        if abs(day_quotes.get(base, 1.0) - 1.0) > 1e-9:
+            raise ValueError(
+                f"{path} quotes {base} at {day_quotes[base]} on {day}, so its rates are not per {base}; "
+                f"pass the currency they are quoted against as the base"
+            )
+        day_quotes[base] = 1.0
+        per_default = day_quotes.get(DEFAULT_CURRENCY)
+        if per_default is None:
+            skipped += 1
+            continue
+        rows.extend(
+            {"currency": currency, "rate_date": day, "rate": rate / per_default}
+            for currency, rate in day_quotes.items()
+            if currency != DEFAULT_CURRENCY
+        )
+    return rows, skipped
+
+
+async def store_rates(rows: List[dict]) -> None:
+    """Upsert rows into fx_rates and tell every worker to reload its rate cache."""
+    async with async_session() as db:
+        table = FxRate.__table__
+        for start in range(0, len(rows), FX_LOAD_BATCH_SIZE):
+            statement = insert(table).values(rows[start:start + FX_LOAD_BATCH_SIZE])
+            await db.execute(statement.on_conflict_do_update(
+                constraint="uix_fx_rate_currency_date",
+                set_={"rate": statement.excluded.rate},
+            ))
+        await invalidation_bus.publish(db, None, "fx_rates")
+        await db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load exchange rates from a CSV file into fx_rates.")
+    parser.add_argument("path", help="Rate file (long: date,currency,rate; or wide: date then one column per currency)")
+    parser.add_argument("--base", default=DEFAULT_CURRENCY, help="Currency the file's rates are quoted against")
+    args = parser.parse_args()
+
+    try:
+        rows, skipped = read_rate_file(args.path, args.base)
+    except ValueError as exc:
+        parser.error(str(exc))
+    asyncio.run(store_rates(rows))
+    print(f"Loaded {len(rows)} rates" + (f", skipped {skipped} dates without a {DEFAULT_CURRENCY} quote" if skipped else ""))
+
+
+if __name__ == "__main__":
+    main()
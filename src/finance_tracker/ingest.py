@@ -0,0 +1,197 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Transaction, ArchivedTransaction, Category, DuplicatePolicy, ChangeOperation, compute_fingerprint
+from .schemas import TransactionCreate
+from .change_feed import record_changes
+from .fx import fx_rates
+from .archive import archived_before
+
+
+@dataclass
+class IngestResult:
+    """Outcome of ingesting a batch of transactions."""
+    created: List[Transaction] = field(default_factory=list)
+    merged: List[Transaction] = field(default_factory=list)
+    skipped: List[Union[Transaction, ArchivedTransaction]] = field(default_factory=list)  # Existing rows that matched skipped input
+    flagged: int = 0
+    last_seq: int = 0  # Change feed sequence number after this batch
+
+
+async def validate_categories(db: AsyncSession, user_id: int, category_ids: set) -> None:
+    """
+    Check that every category ID belongs to the user, using a single query.
+
+    Raises:
+        HTTPException: If any category does not exist or belongs to another user
+    """
+    category_ids = {category_id for category_id in category_ids if category_id}
+    if not category_ids:
+        return
+
+    query = select(Category.id).where(
+        and_(Category.id.in_(category_ids), Category.user_id == user_id)
+    )
+    result = await db.execute(query)
+    found = set(result.scalars().all())
+
+    if found != category_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found or does not belong to you"
+        )
+
+
+async def validate_currencies(currencies: set) -> None:
+    """
+    Check that exchange rates are loaded for every currency.
+
+    Raises:
+        HTTPException: If a currency has no exchange rates
+    """
+    currencies = {currency for currency in currencies if currency}
+    if not currencies:
+        return
+
+    await fx_rates.ensure_loaded()
+    unknown = currencies - fx_rates.currencies
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No exchange rates loaded for currency: {', '.join(sorted(unknown))}"
+        )
+
+
+async def find_by_fingerprints(
+    db: AsyncSession, user_id: int, fingerprints: set, model: type = Transaction
+) -> Dict[str, Transaction]:
+    """
+    Fetch the user's existing transactions matching any of the given fingerprints.
+
+    Uses the (user_id, fingerprint) index of the hot table, or of the archive
+    when `model` is ArchivedTransaction, so this is one index lookup per batch.
+
+    Returns:
+        Mapping of fingerprint to the oldest matching transaction
+    """
+    if not fingerprints:
+        return {}
+
+    query = (
+        select(model)
+        .where(and_(model.user_id == user_id, model.fingerprint.in_(fingerprints)))
+        .order_by(model.id)
+    )
+    result = await db.execute(query)
+
+    existing: Dict[str, Transaction] = {}
+    for transaction in result.scalars().all():
+        existing.setdefault(transaction.fingerprint, transaction)
+    return existing
+
+
+def _merge_into(existing: Transaction, incoming: TransactionCreate) -> None:
+    """Fill fields missing on the existing transaction from the incoming one."""
+    if existing.category_id is None and incoming.category_id is not None:
+        existing.category_id = incoming.category_id
+    if not existing.description and incoming.description:
+        existing.description = incoming.description
+
+
+async def ingest_transactions(
+    db: AsyncSession,
+    user_id: int,
+    items: Sequence[TransactionCreate],
+    policy: DuplicatePolicy = DuplicatePolicy.ALLOW,
+) -> IngestResult:
+    """
+    Add a batch of transactions for a user, applying a duplicate policy.
+
+    Duplicates are detected against both the user's stored transactions, archived
+    ones included, and earlier items of the same batch. Archived transactions are
+    read-only, so merging into one skips the item instead. Created and merged
+    transactions are recorded in the change feed. The session is flushed but not
+    committed.
+
+    Args:
+        db: Database session
+        user_id: Owner of the transactions
+        items: Transactions to add
+        policy: How to treat transactions whose fingerprint already exists
+
+    Returns:
+        IngestResult describing what was created, merged and skipped
+
+    Raises:
+        HTTPException: If a referenced category does not belong to the user, or a
+            currency has no exchange rates
+    """
+    await validate_categories(db, user_id, {item.category_id for item in items})
+    await validate_currencies({item.currency for item in items})
+
+    now = datetime.now(timezone.utc)
+    prepared = []
+    for item in items:
+        transaction_date = item.transaction_date or now
+        fingerprint = compute_fingerprint(
+            user_id, transaction_date, item.amount, item.type, item.description, item.currency
+        )
+        prepared.append((item, transaction_date, fingerprint))
+
+    existing: Dict[str, Union[Transaction, ArchivedTransaction]] = {}
+    if policy != DuplicatePolicy.ALLOW:
+        existing = await find_by_fingerprints(db, user_id, {fp for _, _, fp in prepared})
+        cutoff = await archived_before(db, user_id)
+        if cutoff is not None:
+            # Only items on or before the cutoff's day can share a fingerprint with archived rows
+            old = {
+                fp for _, transaction_date, fp in prepared
+                if transaction_date.replace(tzinfo=transaction_date.tzinfo or timezone.utc) < cutoff + timedelta(days=1)
+            }
+            existing.update(await find_by_fingerprints(db, user_id, old - existing.keys(), ArchivedTransaction))
+
+    result = IngestResult()
+    for item, transaction_date, fingerprint in prepared:
+        match = existing.get(fingerprint)
+
+        if match is not None and (
+            policy == DuplicatePolicy.SKIP
+            or (policy == DuplicatePolicy.MERGE and isinstance(match, ArchivedTransaction))
+        ):
+            result.skipped.append(match)
+            continue
+
+        if match is not None and policy == DuplicatePolicy.MERGE:
+            _merge_into(match, item)
+            if match not in result.merged and match not in result.created:
+                result.merged.append(match)
+            continue
+
+        new_transaction = Transaction(
+            amount=item.amount,
+            currency=item.currency,
+            type=item.type,
+            description=item.description,
+            category_id=item.category_id,
+            transaction_date=transaction_date,
+            fingerprint=fingerprint,
+            is_duplicate=match is not None and policy == DuplicatePolicy.FLAG,
+            user_id=user_id
+        )
+        db.add(new_transaction)
+        result.created.append(new_transaction)
+
+        if new_transaction.is_duplicate:
+            result.flagged += 1
+        existing.setdefault(fingerprint, new_transaction)
+
+    await db.flush()
+    insert_seq = await record_changes(db, user_id, [t.id for t in result.created], ChangeOperation.INSERT)
+    update_seq = await record_changes(db, user_id, [t.id for t in result.merged], ChangeOperation.UPDATE)
+    result.last_seq = max(insert_seq, update_seq)
+    return result
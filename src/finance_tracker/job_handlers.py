@@ -0,0 +1,274 @@
+import asyncio
+import csv
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.orm import aliased
+
+from .models import Transaction, ArchivedTransaction, DuplicatePolicy, DEFAULT_CURRENCY, compute_fingerprint
+from .schemas import TransactionCreate
+from .ingest import ingest_transactions
+from .cache import invalidation_bus
+from .events import event_hub, change_event
+from .jobs import job_runner, JobContext, JOB_STORAGE_DIR
+from .fx import fx_rates
+from .shards import shard_router
+from .archive import (
+    archived_before, union_with_archive, transaction_columns, archive_user, archive_cutoff, job_archive_months,
+)
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 5000
+REBUILD_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_COLUMNS = ["id", "transaction_date", "type", "amount", "currency", "description", "category_id"]
+
+
+def parse_transactions_csv(path: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Parse and validate a transactions CSV file (runs in the process pool).
+
+    Expected columns: transaction_date, amount, type, and optionally currency,
+    description and category_id.
+
+    Returns:
+        Tuple of (validated rows as dicts, error messages for rejected lines)
+    """
+    rows: List[Dict[str, Any]] = []
+    errors: List[str] = []
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line_number, record in enumerate(csv.DictReader(f), start=2):
+            record = {key.strip().lower(): (value or "").strip() for key, value in record.items() if key}
+            try:
+                transaction = TransactionCreate(
+                    amount=record.get("amount"),
+                    currency=(record.get("currency") or DEFAULT_CURRENCY).upper(),
+                    type=record.get("type", "").lower(),
+                    transaction_date=record.get("transaction_date") or None,
+                    description=record.get("description") or None,
+                    category_id=record.get("category_id") or None,
+                )
+            except ValidationError as exc:
+                errors.append(f"line {line_number}: {exc.errors()[0]['msg']}")
+                continue
+            rows.append(transaction.model_dump())
+
+    return rows, errors
+
+
+def compute_fingerprints(rows: List[Tuple]) -> List[Dict[str, Any]]:
+    """Compute fingerprints for (id, user_id, date, amount, type, description, currency) rows (runs in the process pool)."""
+    return [
+        {"row_id": row[0], "row_fingerprint": compute_fingerprint(*row[1:])}
+        for row in rows
+    ]
+
+
+def _write_csv_rows(path: str, rows: List[Tuple], header: Optional[List[str]]) -> None:
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(header)
+        writer.writerows(rows)
+
+
+def upload_path(name: str) -> str:
+    """Path of a file uploaded for a job, from the name kept in the job's params."""
+    return os.path.join(JOB_STORAGE_DIR, "uploads", os.path.basename(name))
+
+
+@job_runner.register("import")
+async def import_transactions_job(context: JobContext) -> None:
+    """
+    Import a CSV file of transactions uploaded through POST /api/jobs/import.
+
+    The partial result records how many rows are done after each batch, so a
+    re-queued import resumes there. The batch that was in flight may have been
+    committed, so it is re-run skipping duplicates, whatever the policy.
+    """
+    path = upload_path(context.params["upload"])
+    try:
+        policy = DuplicatePolicy(context.params.get("on_duplicate", DuplicatePolicy.SKIP.value))
+        rows, errors = await context.run_cpu(parse_transactions_csv, path)
+
+        resumed = context.result is not None
+        checkpoint = context.result or {}
+        totals = {key: checkpoint.get(key, 0) for key in ("created", "merged", "skipped", "flagged")}
+        first_row = checkpoint.get("rows_done", 0)
+        if not resumed:
+            context.result = {**totals, "rows_done": 0}
+            await context.set_progress(0.0)
+
+        for start in range(first_row, len(rows), IMPORT_BATCH_SIZE):
+            batch = [TransactionCreate.model_construct(**row) for row in rows[start:start + IMPORT_BATCH_SIZE]]
+            batch_policy = policy
+            if resumed and start == first_row and policy != DuplicatePolicy.MERGE:
+                batch_policy = DuplicatePolicy.SKIP
+
+            async with shard_router.user_session(context.user_id) as db:
+                result = await ingest_transactions(db, context.user_id, batch, batch_policy)
+                event = None
+                if result.created or result.merged:
+                    event = change_event(
+                        result.last_seq,
+                        inserted=[t.id for t in result.created],
+                        updated=[t.id for t in result.merged],
+                    )
+                    await invalidation_bus.publish(db, context.user_id, "transactions", event)
+                await db.commit()
+
+            if event is not None:
+                event_hub.publish(context.user_id, "transactions", event)
+
+            totals["created"] += len(result.created)
+            totals["merged"] += len(result.merged)
+            totals["skipped"] += len(result.skipped)
+            totals["flagged"] += result.flagged
+            context.result = {**totals, "rows_done": start + len(batch)}
+            await context.set_progress((start + len(batch)) / len(rows))
+
+        context.result = {
+            **totals, "rows_done": len(rows), "error_count": len(errors), "errors": errors[:MAX_REPORTED_ERRORS],
+        }
+    finally:
+        # Kept only while the job will run again after a restart
+        if not context.runner.stopping and os.path.exists(path):
+            os.remove(path)
+
+
+@job_runner.register("export")
+async def export_transactions_job(context: JobContext) -> None:
+    """
+    Export all of the user's transactions, archived ones included, to a CSV file.
+
+    With a `report_currency` param, a report_amount column holds each amount
+    converted at its date's exchange rate, converted a partition at a time.
+    """
+    report_currency = context.params.get("report_currency")
+    header = EXPORT_COLUMNS + (["report_currency", "report_amount"] if report_currency else [])
+    export_dir = os.path.join(JOB_STORAGE_DIR, "exports")
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"transactions-{context.job_id}.csv")
+    if os.path.exists(path):
+        os.remove(path)  # Left over from an interrupted run
+
+    async with shard_router.user_session(context.user_id) as db:
+        if report_currency:
+            await fx_rates.ensure_loaded()
+        source = Transaction
+        if await archived_before(db, context.user_id) is not None:
+            source = aliased(Transaction, union_with_archive(
+                lambda model: select(*transaction_columns(model)).where(model.user_id == context.user_id)
+            ))
+        total = (await db.execute(
+            select(func.count()).select_from(source).where(source.user_id == context.user_id)
+        )).scalar_one()
+
+        query = (
+            select(
+                source.id, source.transaction_date, source.type, source.amount,
+                source.currency, source.description, source.category_id,
+            )
+            .where(source.user_id == context.user_id)
+            .order_by(source.transaction_date, source.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        stream = await db.stream(query)
+
+        written = 0
+        async for partition in stream.partitions():
+            rows = [
+                (
+                    row.id, row.transaction_date.isoformat(), row.type.value, row.amount,
+                    row.currency, row.description or "", row.category_id or "",
+                )
+                for row in partition
+            ]
+            if report_currency:
+                report_amounts = fx_rates.convert_values(
+                    [row.amount for row in partition],
+                    [row.currency for row in partition],
+                    [row.transaction_date for row in partition],
+                    report_currency,
+                )
+                rows = [
+                    row + (report_currency, round(report_amount, 2))
+                    for row, report_amount in zip(rows, report_amounts.tolist())
+                ]
+            await asyncio.to_thread(_write_csv_rows, path, rows, header if written == 0 else None)
+            written += len(rows)
+            await context.set_progress(written / total)
+
+    if written == 0:
+        await asyncio.to_thread(_write_csv_rows, path, [], header)
+
+    context.result = {"rows": written}
+    context.result_location = path
+
+
+@job_runner.register("rebuild_fingerprints")
+async def rebuild_fingerprints_job(context: JobContext) -> None:
+    """Recompute the duplicate-detection fingerprints of all of the user's transactions, archived ones included."""
+    models = (Transaction, ArchivedTransaction)
+    total = 0
+    async with shard_router.user_session(context.user_id) as db:
+        for model in models:
+            total += (await db.execute(
+                select(func.count()).select_from(model).where(model.user_id == context.user_id)
+            )).scalar_one()
+
+    done = 0
+    for model in models:
+        last_id = 0
+        while True:
+            async with shard_router.user_session(context.user_id) as db:
+                result = await db.execute(
+                    select(
+                        model.id, model.user_id, model.transaction_date,
+                        model.amount, model.type, model.description, model.currency,
+                    )
+                    .where(model.user_id == context.user_id, model.id > last_id)
+                    .order_by(model.id)
+                    .limit(REBUILD_BATCH_SIZE)
+                )
+                rows = [tuple(row) for row in result.all()]
+                if not rows:
+                    break
+
+                fingerprints = await context.run_cpu(compute_fingerprints, rows)
+                await db.execute(
+                    update(model.__table__)
+                    .where(model.__table__.c.id == bindparam("row_id"))
+                    .values(fingerprint=bindparam("row_fingerprint")),
+                    fingerprints,
+                )
+                await db.commit()
+
+            last_id = rows[-1][0]
+            done += len(rows)
+            await context.set_progress(done / total)
+
+    # Fingerprints are not part of the transactions clients hold, so no change
+    # event; cached reads (e.g. duplicate clusters) are dropped
+    async with shard_router.user_session(context.user_id) as db:
+        await invalidation_bus.publish(db, context.user_id, "transactions")
+        await db.commit()
+
+    context.result = {"rows": done}
+
+
+@job_runner.register("archive")
+async def archive_transactions_job(context: JobContext) -> None:
+    """
+    Move the user's transactions older than `months` months (default and
+    minimum ARCHIVE_AFTER_MONTHS) to the archive table.
+    """
+    cutoff = archive_cutoff(job_archive_months(context.params.get("months")))
+    async with shard_router.user_session(context.user_id) as db:
+        archived = await archive_user(db, context.user_id, cutoff)
+        await db.commit()
+    context.result = {"rows": archived, "archived_before": cutoff.isoformat()}
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import async_session
+from .models import Job, JobStatus
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_PROCESS_POOL_SIZE = int(os.getenv("JOB_PROCESS_POOL_SIZE", "2"))
+JOB_STORAGE_DIR = os.getenv("JOB_STORAGE_DIR", "var/jobs")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "10"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+# A running job whose heartbeat is older than this is assumed orphaned and re-queued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+
+
+class JobContext:
+    """Handle passed to a running job for reporting progress and offloading CPU work."""
+
+    def __init__(self, runner: "JobRunner", job: Job):
+        self.runner = runner
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.params: Dict[str, Any] = dict(job.params or {})
+        # A re-queued job gets back the partial result it last persisted
+        self.result: Optional[Dict[str, Any]] = job.result
+        self.result_location: Optional[str] = None
+
+    async def set_progress(self, progress: float) -> None:
+        """
+        Persist progress as a fraction between 0 and 1.
+
+        The partial result, if the handler has set one, is persisted along with
+        it, so a job re-queued after a crash or restart can resume from it.
+        """
+        values: Dict[str, Any] = {
+            "progress": min(max(progress, 0.0), 1.0),
+            "heartbeat_at": datetime.now(timezone.utc),
+        }
+        if self.result is not None:
+            values["result"] = self.result
+        async with async_session() as db:
+            await db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            await db.commit()
+
+    async def run_cpu(self, fn: Callable, *args: Any) -> Any:
+        """Run a picklable, module-level function in the process pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.runner.process_pool, fn, *args)
+
+
+JobHandler = Callable[[JobContext], Awaitable[None]]
+
+
+class JobRunner:
+    """
+    In-process background job runner backed by the jobs table.
+
+    Submitted jobs are persisted as QUEUED and their IDs pushed onto an asyncio
+    queue served by JOB_CONCURRENCY worker tasks. Workers claim jobs with a
+    conditional UPDATE so that several processes can share the table without
+    running a job twice. Workers also poll the table, which picks up jobs
+    submitted by other processes and jobs re-queued after a crash or restart.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, process_pool_size: int = JOB_PROCESS_POOL_SIZE):
+        self.concurrency = concurrency
+        self.process_pool_size = process_pool_size
+        self.handlers: Dict[str, JobHandler] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: list = []
+        self._running: Dict[int, asyncio.Task] = {}
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._stopping = False
+
+    @property
+    def stopping(self) -> bool:
+        """Whether the runner is shutting down (interrupted jobs will run again)."""
+        return self._stopping
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_pool_size)
+        return self._process_pool
+
+    def register(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Decorator registering the handler for a job kind."""
+        def decorator(handler: JobHandler) -> JobHandler:
+            self.handlers[kind] = handler
+            return handler
+        return decorator
+
+    async def submit(self, db: AsyncSession, user_id: int, kind: str, params: Dict[str, Any]) -> Job:
+        """
+        Persist a new job and queue it for execution.
+
+        Raises:
+            ValueError: If no handler is registered for the kind
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job = Job(user_id=user_id, kind=kind, params=params, status=JobStatus.QUEUED)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def cancel(self, db: AsyncSession, job: Job) -> Job:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately. Running jobs are flagged and stopped
+        by the process running them at its next heartbeat (or right away if that
+        is this process).
+        """
+        if job.status == JobStatus.QUEUED:
+            await db.execute(
+                update(Job)
+                .where(and_(Job.id == job.id, Job.status == JobStatus.QUEUED))
+                .values(status=JobStatus.CANCELLED, finished_at=datetime.now(timezone.utc))
+            )
+        elif job.status == JobStatus.RUNNING:
+            await db.execute(update(Job).where(Job.id == job.id).values(cancel_requested=True))
+            task = self._running.get(job.id)
+            if task is not None:
+                task.cancel()
+
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    async def start(self) -> None:
+        """Re-queue orphaned jobs, queue pending ones and start the worker tasks."""
+        self._stopping = False
+        await self._requeue_stale()
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(Job.id).where(Job.status == JobStatus.QUEUED).order_by(Job.id)
+            )
+            for job_id in result.scalars().all():
+                self._queue.put_nowait(job_id)
+
+        for _ in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        """Stop workers; interrupted jobs go back to the queue for the next start."""
+        self._stopping = True
+        for task in list(self._running.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    async def _requeue_stale(self) -> None:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+        async with async_session() as db:
+            result = await db.execute(
+                update(Job)
+                .where(and_(
+                    Job.status == JobStatus.RUNNING,
+                    Job.heartbeat_at < stale_before,
+                ))
+                .values(status=JobStatus.QUEUED)
+                .returning(Job.id)
+            )
+            requeued = result.scalars().all()
+            await db.commit()
+
+        if requeued:
+            logger.warning("Re-queued orphaned jobs: %s", requeued)
+
+    async def _claim(self, job_id: Optional[int]) -> Optional[Job]:
+        """Atomically move a queued job (the given one, or the oldest) to RUNNING."""
+        candidate = select(Job.id).where(Job.status == JobStatus.QUEUED)
+        if job_id is not None:
+            candidate = candidate.where(Job.id == job_id)
+        candidate = candidate.order_by(Job.id).limit(1).with_for_update(skip_locked=True)
+
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            result = await db.execute(
+                update(Job)
+                .where(and_(Job.id == candidate.scalar_subquery(), Job.status == JobStatus.QUEUED))
+                .values(status=JobStatus.RUNNING, started_at=now, heartbeat_at=now, error=None)
+                .returning(Job)
+            )
+            job = result.scalar_one_or_none()
+            await db.commit()
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job_id = await asyncio.wait_for(self._queue.get(), timeout=JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                job_id = None
+
+            try:
+                if job_id is None:
+                    await self._requeue_stale()
+                job = await self._claim(job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker error")
+
+    async def _heartbeat(self, job_id: int, task: asyncio.Task) -> None:
+        """Keep the job's heartbeat fresh and honour cancellation requests from any process."""
+        while not task.done():
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            async with async_session() as db:
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id)
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                    .returning(Job.cancel_requested)
+                )
+                cancel_requested = result.scalar_one()
+                await db.commit()
+            if cancel_requested:
+                task.cancel()
+
+    async def _run(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        context = JobContext(self, job)
+        values: Dict[str, Any]
+
+        if handler is None:
+            values = {"status": JobStatus.FAILED, "error": f"Unknown job kind: {job.kind}"}
+        else:
+            task = asyncio.create_task(handler(context))
+            self._running[job.id] = task
+            heartbeat = asyncio.create_task(self._heartbeat(job.id, task))
+            try:
+                await task
+                values = {
+                    "status": JobStatus.SUCCEEDED,
+                    "progress": 1.0,
+                    "result": context.result,
+                    "result_location": context.result_location,
+                }
+            except asyncio.CancelledError:
+                if self._stopping:
+                    values = {"status": JobStatus.QUEUED}
+                else:
+                    values = {"status": JobStatus.CANCELLED}
+            except Exception as exc:
+                logger.exception("Job %s failed", job.id)
+                values = {"status": JobStatus.FAILED, "error": str(exc) or exc.__class__.__name__}
+            finally:
+                heartbeat.cancel()
+                self._running.pop(job.id, None)
+
+        if values["status"] != JobStatus.QUEUED:
+            values["finished_at"] = datetime.now(timezone.utc)
+
+        async with async_session() as db:
+            await db.execute(update(Job).where(Job.id == job.id).values(**values))
+            await db.commit()
+
+        if self._stopping:
+            raise asyncio.CancelledError()
+
+
+job_runner = JobRunner()
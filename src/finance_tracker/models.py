@@ -1,18 +1,89 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Float, DateTime, Enum as SAEnum, ForeignKey, UniqueConstraint
-from sqlalchemy.sql import func
-from datetime import datetime
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy import Integer, BigInteger, String, Float, Boolean, Date, DateTime, JSON, Enum as SAEnum, ForeignKey, UniqueConstraint, Index, event, cast
+from sqlalchemy.sql import func, false, true
+from datetime import date, datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum   
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import hashlib
+import re
 from .database import Base
 
-__all__ = ["Base", "TransactionType", "User", "Category", "Transaction"]    
+__all__ = [
+    "Base", "TransactionType", "DuplicatePolicy", "ChangeOperation",
+    "JobStatus", "RecurrenceFrequency", "UserDirectory", "User", "Category", "Transaction", "TransactionChange",
+    "ArchivedTransaction", "ArchiveManifest", "Job", "RecurringTransaction", "FxRate", "DEFAULT_CURRENCY",
+    "normalize_description", "compute_fingerprint", "to_minor_units", "from_minor_units",
+    "MINOR_UNITS_PER_UNIT", "TRANSACTION_LIST_COLUMNS",
+]    
+
+# Currency of amounts stored without an explicit one, and the currency FX rates are quoted against
+DEFAULT_CURRENCY = "USD"
+
+# Transaction amounts are stored as integer hundredths of the currency unit
+MINOR_UNITS_PER_UNIT = 100
+
+# 64-bit auto-incrementing primary key (SQLite only auto-increments INTEGER primary keys)
+BigIntegerId = BigInteger().with_variant(Integer, "sqlite")
 
 class TransactionType(str, Enum):
     INCOME = "income"
     EXPENSE = "expense"
 
 
+class DuplicatePolicy(str, Enum):
+    """What to do when an incoming transaction matches an existing fingerprint."""
+    ALLOW = "allow"  # Insert it anyway
+    SKIP = "skip"    # Drop the incoming transaction
+    FLAG = "flag"    # Insert it with is_duplicate set
+    MERGE = "merge"  # Fill gaps in the existing transaction from the incoming one
+
+
+class ChangeOperation(str, Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class RecurrenceFrequency(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+
+
+class UserDirectory(Base):
+    """
+    Global record of every user, kept in the default database when user data is
+    sharded: allocates user IDs, enforces unique usernames and emails across
+    shards, and maps each user to the shard holding their data.
+    """
+    __tablename__ = "user_directory"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    username: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"UserDirectory(id={self.id}, username={self.username}, shard={self.shard})"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -20,6 +91,8 @@ class User(Base):
     username: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     password: Mapped[str] = mapped_column(String, nullable=False)
+    # Last sequence number handed out to this user's change feed
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -59,27 +132,282 @@ class Category(Base):
         return f"Category(id={self.id}, name={self.name}, description={self.description})"
 
 
-class Transaction(Base):
+def to_minor_units(amount: float) -> int:
+    """Convert an amount to integer minor units, rounding half up to the nearest one."""
+    return int((Decimal(repr(amount)) * MINOR_UNITS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(amount_minor: int) -> float:
+    return amount_minor / MINOR_UNITS_PER_UNIT
+
+
+class MinorUnitAmountMixin:
+    """`amount` in currency units on top of an exact integer `amount_minor` column."""
+
+    @hybrid_property
+    def amount(self) -> float:
+        return from_minor_units(self.amount_minor)
+
+    @amount.inplace.setter
+    def _amount_setter(self, value: float) -> None:
+        self.amount_minor = to_minor_units(value)
+
+    @amount.inplace.expression
+    @classmethod
+    def _amount_expression(cls):
+        return cast(cls.amount_minor, Float) / MINOR_UNITS_PER_UNIT
+
+
+# Columns the transaction list returns; the list index INCLUDEs them for index-only scans
+TRANSACTION_LIST_COLUMNS = [
+    "id", "amount_minor", "created_at", "updated_at", "category_id", "type", "is_duplicate",
+    "currency", "description",
+]
+
+
+class Transaction(MinorUnitAmountMixin, Base):
     __tablename__ = "transactions"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
-    category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("categories.id"), index=True, nullable=True)
-    amount: Mapped[float] = mapped_column(Float, nullable=False)
-    type: Mapped[TransactionType] = mapped_column(SAEnum(TransactionType), nullable=False)
+    __table_args__ = (
+        Index("ix_transactions_user_id_fingerprint", "user_id", "fingerprint"),
+        # Serves the transaction list: one user's rows, newest first, without heap fetches
+        Index(
+            "ix_transactions_user_id_transaction_date", "user_id", "transaction_date",
+            postgresql_include=TRANSACTION_LIST_COLUMNS,
+        ),
+    )
+
+    # Columns are ordered widest-aligned first so rows carry no alignment padding
+    id: Mapped[int] = mapped_column(BigIntegerId, primary_key=True)
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
     transaction_date: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
-    description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # Lookups by user alone are served by the composite indexes above
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("categories.id"), index=True, nullable=True)
+    type: Mapped[TransactionType] = mapped_column(SAEnum(TransactionType), nullable=False)
+    is_duplicate: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    currency: Mapped[str] = mapped_column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     user: Mapped["User"] = relationship("User", back_populates="transactions")
     category: Mapped[Optional["Category"]] = relationship("Category", back_populates="transactions")
 
     def __repr__(self):
-        return f"Transaction(id={self.id}, amount={self.amount}, description={self.description})"
\ No newline at end of file
+        return f"Transaction(id={self.id}, amount={self.amount}, description={self.description})"
+
+
+class ArchivedTransaction(MinorUnitAmountMixin, Base):
+    """
+    Transaction moved out of the hot table by the archiver.
+
+    Has the columns of Transaction (keeping its ID) so the two tables can be read
+    together with UNION ALL, and only the indexes those reads and duplicate
+    detection need. Read-only.
+    """
+    __tablename__ = "transactions_archive"
+
+    __table_args__ = (
+        Index("ix_transactions_archive_user_id_transaction_date", "user_id", "transaction_date"),
+        Index("ix_transactions_archive_user_id_fingerprint", "user_id", "fingerprint"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    transaction_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("categories.id"), nullable=True)
+    type: Mapped[TransactionType] = mapped_column(SAEnum(TransactionType), nullable=False)
+    is_duplicate: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    currency: Mapped[str] = mapped_column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    def __repr__(self):
+        return f"ArchivedTransaction(id={self.id}, amount={self.amount}, description={self.description})"
+
+
+class ArchiveManifest(Base):
+    """Per-user summary of the archive: reads before `archived_before` must include it."""
+    __tablename__ = "archive_manifest"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Every hot transaction before this moment had been archived when it was set
+    archived_before: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    first_transaction_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_transaction_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"ArchiveManifest(user_id={self.user_id}, archived_before={self.archived_before}, row_count={self.row_count})"
+
+
+class TransactionChange(Base):
+    """Entry in a user's transaction change feed; deletes are kept as tombstones."""
+    __tablename__ = "transaction_changes"
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "seq", name="uix_transaction_change_user_seq"),
+    )
+
+    id: Mapped[int] = mapped_column(BigIntegerId, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Not a foreign key: tombstones outlive the transaction they refer to
+    transaction_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    operation: Mapped[ChangeOperation] = mapped_column(SAEnum(ChangeOperation), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"TransactionChange(user_id={self.user_id}, seq={self.seq}, operation={self.operation})"
+
+
+class Job(Base):
+    """Background job (import, export, rebuild) persisted so it survives restarts."""
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Jobs live in the default database, which may not hold the user's row
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user_directory.id"), index=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[JobStatus] = mapped_column(SAEnum(JobStatus), nullable=False, index=True, default=JobStatus.QUEUED)
+    params: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    result_location: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"Job(id={self.id}, kind={self.kind}, status={self.status})"
+
+
+class RecurringTransaction(Base):
+    """Schedule from which the scheduler materializes transactions (rent, salary, subscriptions)."""
+    __tablename__ = "recurring_transactions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
+    category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("categories.id"), nullable=True)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    type: Mapped[TransactionType] = mapped_column(SAEnum(TransactionType), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    frequency: Mapped[RecurrenceFrequency] = mapped_column(SAEnum(RecurrenceFrequency), nullable=False)
+    interval: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    start_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Number of occurrences materialized so far; the next one has this index
+    occurrence_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # None once the schedule has ended
+    next_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, server_default=true())
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    user: Mapped["User"] = relationship("User")
+    category: Mapped[Optional["Category"]] = relationship("Category")
+
+    def __repr__(self):
+        return f"RecurringTransaction(id={self.id}, amount={self.amount}, frequency={self.frequency})"
+
+
+class FxRate(Base):
+    """Exchange rate of a currency on a date, in units of the currency per DEFAULT_CURRENCY."""
+    __tablename__ = "fx_rates"
+
+    __table_args__ = (
+        UniqueConstraint("currency", "rate_date", name="uix_fx_rate_currency_date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    rate_date: Mapped[date] = mapped_column(Date, nullable=False)
+    rate: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"FxRate(currency={self.currency}, rate_date={self.rate_date}, rate={self.rate})"
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Lowercase a description and collapse punctuation and whitespace runs to single spaces."""
+    if not description:
+        return ""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", description.lower()).split())
+
+
+def compute_fingerprint(
+    user_id: int,
+    transaction_date: datetime,
+    amount: float,
+    type: TransactionType,
+    description: Optional[str],
+    currency: str = DEFAULT_CURRENCY,
+) -> str:
+    """
+    Compute the duplicate-detection fingerprint of a transaction.
+
+    Two transactions share a fingerprint when they belong to the same user, fall on
+    the same (UTC) calendar day, have the same type, currency and amount to the
+    cent, and have the same normalized description. The currency is only part of
+    the digest when it is not DEFAULT_CURRENCY, so fingerprints computed before
+    currencies existed stay valid.
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    if transaction_date.tzinfo is not None:
+        transaction_date = transaction_date.astimezone(timezone.utc)
+    parts = [
+        str(user_id),
+        transaction_date.date().isoformat(),
+        TransactionType(type).value,
+        f"{amount:.2f}",
+        normalize_description(description),
+    ]
+    if currency != DEFAULT_CURRENCY:
+        parts.append(currency)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+@event.listens_for(Transaction, "before_insert")
+@event.listens_for(Transaction, "before_update")
+def _set_fingerprint(mapper, connection, target: Transaction) -> None:
+    """Keep the fingerprint in sync with the fields it is derived from."""
+    if target.transaction_date is None:
+        target.transaction_date = datetime.now(timezone.utc)
+    target.fingerprint = compute_fingerprint(
+        target.user_id, target.transaction_date, target.amount, target.type, target.description,
+        target.currency or DEFAULT_CURRENCY,
+    )
@@ -0,0 +1,62 @@
+"""
+Query builders for the transaction read paths, shared by the API, the
+dashboard and the query plan tests.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, Select
+from sqlalchemy.orm import aliased, load_only
+
+from .models import Transaction, TransactionType, TRANSACTION_LIST_COLUMNS
+from .archive import reads_archive, union_with_archive
+
+
+def build_transactions_query(
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    category_id: Optional[int] = None,
+    archive_cutoff: Optional[datetime] = None,
+) -> Select:
+    """
+    Build the transaction list query (also used by the dashboard and the query plan tests).
+
+    Served by the (user_id, transaction_date) index, newest first. Only the
+    columns the response needs are loaded, and the index INCLUDEs them, so the
+    hot table is read with an index-only scan. When the date range reaches before
+    the user's archive cutoff, the archive is read as well: each table contributes
+    at most skip + limit rows off its own date index.
+    """
+    def list_columns(model) -> list:
+        return [model.user_id, model.transaction_date] + [getattr(model, name) for name in TRANSACTION_LIST_COLUMNS]
+
+    def build(model) -> Select:
+        # Build query - filter by current user
+        query = select(model).where(model.user_id == user_id)
+
+        # Apply filters
+        if start_date:
+            query = query.where(model.transaction_date >= start_date)
+        if end_date:
+            query = query.where(model.transaction_date <= end_date)
+        if transaction_type:
+            query = query.where(model.type == transaction_type)
+        if category_id:
+            query = query.where(model.category_id == category_id)
+        return query.order_by(model.transaction_date.desc())
+
+    if not reads_archive(archive_cutoff, start_date):
+        # Order by transaction date (newest first) and apply pagination
+        return build(Transaction).options(load_only(*list_columns(Transaction))).offset(skip).limit(limit)
+
+    rows = aliased(Transaction, union_with_archive(
+        lambda model: build(model).with_only_columns(*list_columns(model)).limit(skip + limit)
+    ))
+    return (
+        select(rows).options(load_only(*list_columns(rows)))
+        .order_by(rows.transaction_date.desc()).offset(skip).limit(limit)
+    )
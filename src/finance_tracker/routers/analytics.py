@@ -0,0 +1,160 @@
+from typing import List, Optional
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import User
+from ..schemas import RollingSeriesResponse, CategoryTrendsResponse, ForecastResponse, AnomalyResponse, CURRENCY_PATTERN
+from ..auth import get_current_user, get_user_db
+from .. import analytics
+
+router = APIRouter(
+    prefix="/api/analytics",
+    tags=["analytics"]
+)
+
+
+def today() -> int:
+    return analytics.epoch_day(datetime.now(timezone.utc))
+
+
+ReportCurrency = Query(
+    None, pattern=CURRENCY_PATTERN, description="Convert amounts to this currency before aggregating"
+)
+
+
+async def load_columns(db: AsyncSession, user_id: int, report_currency: Optional[str]) -> analytics.TransactionColumns:
+    columns = await analytics.load_columns(db, user_id)
+    return columns.in_currency(report_currency)
+
+
+@router.get("/rolling", response_model=RollingSeriesResponse)
+async def get_rolling_averages(
+    days: int = Query(90, ge=1, le=3660, description="Number of days to return"),
+    windows: List[int] = Query([7, 30], description="Rolling window sizes in days"),
+    report_currency: Optional[str] = ReportCurrency,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get daily income, expense and net totals with rolling averages.
+
+    - **days**: Number of days up to today to return
+    - **windows**: Rolling window sizes (repeat the parameter for several)
+    - **report_currency**: Convert each amount at its date's exchange rate first
+    """
+    if any(window < 1 or window > 365 for window in windows):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Windows must be between 1 and 365 days"
+        )
+
+    as_of_day = today()
+    key = (current_user.id, "rolling", as_of_day, days, tuple(sorted(set(windows))), report_currency)
+    cached = analytics.results_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cache_version = analytics.results_cache.version
+    columns = await load_columns(db, current_user.id, report_currency)
+    result = analytics.rolling_series(columns, as_of_day, days, sorted(set(windows)))
+    result["currency"] = report_currency
+    analytics.results_cache.set(key, result, current_user.id, version=cache_version)
+    return result
+
+
+@router.get("/trends", response_model=CategoryTrendsResponse)
+async def get_category_trends(
+    months: int = Query(12, ge=1, le=120, description="Number of months to return"),
+    report_currency: Optional[str] = ReportCurrency,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get monthly spend per category with the trend (slope) of each series.
+
+    - **months**: Number of months up to and including the current one
+    - **report_currency**: Convert each amount at its date's exchange rate first
+    """
+    as_of_day = today()
+    key = (current_user.id, "trends", as_of_day, months, report_currency)
+    cached = analytics.results_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cache_version = analytics.results_cache.version
+    columns = await load_columns(db, current_user.id, report_currency)
+    result = analytics.category_trends(columns, as_of_day, months)
+    result["currency"] = report_currency
+    analytics.results_cache.set(key, result, current_user.id, version=cache_version)
+    return result
+
+
+@router.get("/forecast", response_model=ForecastResponse)
+async def get_forecast(
+    lookback_days: int = Query(90, ge=7, le=730, description="Days of history used for daily averages"),
+    report_currency: Optional[str] = ReportCurrency,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Forecast this month's closing income, expense and net cash flow.
+
+    - **lookback_days**: Trailing window used for the average daily income and expense
+    - **report_currency**: Convert each amount at its date's exchange rate first
+    """
+    as_of_day = today()
+    key = (current_user.id, "forecast", as_of_day, lookback_days, report_currency)
+    cached = analytics.results_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cache_version = analytics.results_cache.version
+    columns = await load_columns(db, current_user.id, report_currency)
+    result = analytics.month_end_forecast(columns, as_of_day, lookback_days)
+    result["currency"] = report_currency
+    analytics.results_cache.set(key, result, current_user.id, version=cache_version)
+    return result
+
+
+@router.get("/anomalies", response_model=List[AnomalyResponse])
+async def get_anomalies(
+    days: int = Query(90, ge=1, le=3660, description="Only report transactions from the last N days"),
+    threshold: float = Query(3.5, gt=0, description="Robust z-score above which an expense is flagged"),
+    min_samples: int = Query(5, ge=2, description="Minimum expenses in a category before flagging"),
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of anomalies to return"),
+    report_currency: Optional[str] = ReportCurrency,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get expenses that are unusually large for their category, most unusual first.
+
+    Without a report_currency, amounts in different currencies are compared as
+    stored.
+    """
+    as_of_day = today()
+    key = (current_user.id, "anomalies", as_of_day, days, threshold, min_samples, limit, report_currency)
+    cached = analytics.results_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cache_version = analytics.results_cache.version
+    columns = await load_columns(db, current_user.id, report_currency)
+    flagged = analytics.detect_anomalies(columns, as_of_day - days + 1, threshold, min_samples)
+
+    positions = flagged["positions"][:limit]
+    result = [
+        {
+            "transaction_id": int(columns.ids[position]),
+            "transaction_date": datetime.fromtimestamp(columns.timestamps[position], timezone.utc),
+            "amount": float(columns.amounts[position]),
+            "currency": report_currency or columns.currency_of(position),
+            "category_id": int(columns.category_ids[position]) if columns.category_ids[position] >= 0 else None,
+            "score": float(score),
+        }
+        for position, score in zip(positions, flagged["scores"][:limit])
+    ]
+    analytics.results_cache.set(key, result, current_user.id, version=cache_version)
+    return result
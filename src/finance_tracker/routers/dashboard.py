@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from ..models import User
+from ..schemas import DashboardResponse
+from ..auth import get_current_user
+from ..dashboard import dashboard_snapshots
+
+router = APIRouter(
+    prefix="/api/dashboard",
+    tags=["dashboard"]
+)
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(current_user: User = Depends(get_current_user)):
+    """
+    Get the dashboard: recent transactions, month-to-date totals and the month's
+    top expense categories in one precomputed snapshot.
+
+    After the user's data changes, the previous snapshot is returned with `stale`
+    set while a fresh one is computed in the background; reload to pick it up.
+    """
+    snapshot, stale = await dashboard_snapshots.get(current_user.id)
+    return {**snapshot, "stale": stale}
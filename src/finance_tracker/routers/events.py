@@ -0,0 +1,99 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import User
+from ..auth import get_current_user, get_user_db
+from ..events import event_hub, format_sse, StreamLimitExceeded, RESYNC_EVENT
+
+router = APIRouter(
+    prefix="/api/events",
+    tags=["events"]
+)
+
+# Client reconnect delay sent in the stream (milliseconds)
+RECONNECT_DELAY_MS = 3000
+
+
+@router.get("")
+async def stream_events(
+    last_event_id: Optional[int] = Header(None, description="Last change sequence number the client received"),
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream the current user's change events as Server-Sent Events.
+
+    Event types:
+    - **ready**: sent once on connect with the current change sequence number
+    - **transactions**: transactions were inserted, updated or deleted; the event
+      ID is the change feed sequence number
+    - **resync**: events were dropped (slow consumer or missed while disconnected);
+      fetch GET /api/transactions/changes from the last applied sequence number
+
+    Comment lines are sent as heartbeats. Streams are closed after a fixed lifetime
+    and clients reconnect with the `Last-Event-ID` header.
+    """
+    # Subscribe before reading the sequence number, so a change committed in
+    # between is queued rather than lost
+    try:
+        subscription = event_hub.subscribe(current_user.id)
+    except StreamLimitExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open event streams",
+            headers={"Retry-After": str(RECONNECT_DELAY_MS // 1000)},
+        )
+
+    try:
+        seq_result = await db.execute(select(User.change_seq).where(User.id == current_user.id))
+        current_seq = seq_result.scalar_one()
+    except BaseException:
+        event_hub.unsubscribe(subscription)
+        raise
+    # Return the connection to the pool instead of holding it for the whole stream
+    await db.close()
+
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + event_hub.stream_lifetime_seconds
+
+        try:
+            yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+            if last_event_id is not None and last_event_id < current_seq:
+                yield format_sse(RESYNC_EVENT["event"], RESYNC_EVENT["data"])
+            yield format_sse("ready", {"seq": current_seq}, current_seq)
+
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=min(event_hub.heartbeat_seconds, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                seq = message["data"].get("seq")
+                if seq is not None and seq <= current_seq:
+                    continue  # Already covered by the ready event
+                yield format_sse(message["event"], message["data"], seq)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also release the slot if the stream body was never iterated
+        background=BackgroundTask(event_hub.unsubscribe, subscription),
+    )
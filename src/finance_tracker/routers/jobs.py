@@ -0,0 +1,174 @@
+import os
+import shutil
+import uuid
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+
+from ..database import get_db
+from ..models import Job, JobStatus, DuplicatePolicy, User
+from ..schemas import JobCreate, JobResponse
+from ..auth import get_current_user
+from ..jobs import job_runner
+from ..job_handlers import upload_path  # Also registers the job kinds
+from ..archive import job_archive_months
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"]
+)
+
+# Kinds that need an uploaded file and are submitted through their own endpoint
+UPLOAD_KINDS = {"import"}
+
+
+async def get_user_job(job_id: int, db: AsyncSession, current_user: User) -> Job:
+    """Fetch a job belonging to the current user or raise 404."""
+    query = select(Job).where(and_(Job.id == job_id, Job.user_id == current_user.id))
+    result = await db.execute(query)
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_data: JobCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Submit a background job.
+
+    - **kind**: export, rebuild_fingerprints or archive (use /api/jobs/import for imports)
+    - **params**: Kind-specific parameters (export accepts `report_currency`;
+      archive accepts `months`, at least ARCHIVE_AFTER_MONTHS)
+    """
+    if job_data.kind in UPLOAD_KINDS or job_data.kind not in job_runner.handlers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported job kind: {job_data.kind}"
+        )
+
+    if job_data.kind == "archive":
+        try:
+            job_archive_months(job_data.params.get("months"))
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return await job_runner.submit(db, current_user.id, job_data.kind, job_data.params)
+
+
+@router.post("/import", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_import_job(
+    file: UploadFile = File(..., description="CSV with transaction_date, amount, type, description, category_id"),
+    on_duplicate: DuplicatePolicy = Query(DuplicatePolicy.SKIP, description="How to handle duplicate transactions"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload a CSV file and import it in the background.
+
+    Poll GET /api/jobs/{job_id} for progress; the job result holds the created,
+    merged, skipped and flagged counts and any rejected lines.
+    """
+    upload = f"{uuid.uuid4().hex}.csv"
+    path = upload_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def save_upload() -> None:
+        with open(path, "wb") as f:
+            shutil.copyfileobj(file.file, f)
+
+    await run_in_threadpool(save_upload)
+
+    return await job_runner.submit(
+        db, current_user.id, "import", {"upload": upload, "on_duplicate": on_duplicate.value}
+    )
+
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of records to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List the current user's jobs, newest first.
+    """
+    query = (
+        select(Job)
+        .where(Job.user_id == current_user.id)
+        .order_by(Job.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the status and progress of a job.
+    """
+    return await get_user_job(job_id, db, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel a queued or running job.
+
+    Running jobs are stopped within one heartbeat interval; poll the job to see
+    the final status.
+    """
+    job = await get_user_job(job_id, db, current_user)
+
+    if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is already {job.status.value}"
+        )
+
+    return await job_runner.cancel(db, job)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download the file produced by a finished job (e.g. an export); the job's
+    `result_url` points here.
+    """
+    job = await get_user_job(job_id, db, current_user)
+
+    if job.status != JobStatus.SUCCEEDED or not job.result_location or not os.path.exists(job.result_location):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job has no result file"
+        )
+
+    return FileResponse(job.result_location, filename=os.path.basename(job.result_location))
@@ -0,0 +1,154 @@
+from typing import List
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+
+from ..models import RecurringTransaction, User
+from ..schemas import RecurringTransactionCreate, RecurringTransactionUpdate, RecurringTransactionResponse
+from ..auth import get_current_user, get_user_db
+from ..ingest import validate_categories, validate_currencies
+from ..scheduler import schedule_next, skip_to
+
+router = APIRouter(
+    prefix="/api/recurring",
+    tags=["recurring transactions"]
+)
+
+
+async def get_user_recurring(recurring_id: int, db: AsyncSession, current_user: User) -> RecurringTransaction:
+    """Fetch a recurring transaction belonging to the current user or raise 404."""
+    query = select(RecurringTransaction).where(
+        and_(RecurringTransaction.id == recurring_id, RecurringTransaction.user_id == current_user.id)
+    )
+    result = await db.execute(query)
+    recurring = result.scalar_one_or_none()
+
+    if not recurring:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recurring transaction not found"
+        )
+
+    return recurring
+
+
+@router.get("", response_model=List[RecurringTransactionResponse])
+async def get_recurring_transactions(
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List the current user's recurring transactions.
+    """
+    query = (
+        select(RecurringTransaction)
+        .where(RecurringTransaction.user_id == current_user.id)
+        .order_by(RecurringTransaction.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get("/{recurring_id}", response_model=RecurringTransactionResponse)
+async def get_recurring_transaction(
+    recurring_id: int,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a specific recurring transaction by ID.
+    """
+    return await get_user_recurring(recurring_id, db, current_user)
+
+
+@router.post("", response_model=RecurringTransactionResponse, status_code=status.HTTP_201_CREATED)
+async def create_recurring_transaction(
+    recurring_data: RecurringTransactionCreate,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create a recurring transaction.
+
+    - **frequency**: daily, weekly, monthly or yearly
+    - **interval**: Repeat every N periods (e.g. 2 with weekly = fortnightly)
+    - **start_date**: Date of the first occurrence; past occurrences are created
+      on the scheduler's next run
+    - **end_date**: Optional date after which no occurrences are created
+    """
+    await validate_categories(db, current_user.id, {recurring_data.category_id})
+    await validate_currencies({recurring_data.currency})
+
+    if recurring_data.end_date is not None and recurring_data.end_date < recurring_data.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must not be before start date"
+        )
+
+    recurring = RecurringTransaction(**recurring_data.model_dump(), occurrence_count=0, user_id=current_user.id)
+    schedule_next(recurring)
+
+    db.add(recurring)
+    await db.commit()
+    await db.refresh(recurring)
+
+    return recurring
+
+
+@router.put("/{recurring_id}", response_model=RecurringTransactionResponse)
+async def update_recurring_transaction(
+    recurring_id: int,
+    recurring_data: RecurringTransactionUpdate,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Update a recurring transaction.
+
+    Changes apply to future occurrences only. Resuming a paused schedule skips
+    the occurrences that fell due while it was paused.
+    """
+    recurring = await get_user_recurring(recurring_id, db, current_user)
+
+    if recurring_data.category_id is not None:
+        await validate_categories(db, current_user.id, {recurring_data.category_id})
+    await validate_currencies({recurring_data.currency})
+
+    update_data = recurring_data.model_dump(exclude_unset=True)
+    resuming = update_data.get("is_active") is True and not recurring.is_active
+
+    for field, value in update_data.items():
+        setattr(recurring, field, value)
+
+    if "end_date" in update_data:
+        schedule_next(recurring)
+    if resuming:
+        skip_to(recurring, datetime.now(timezone.utc))
+
+    await db.commit()
+    await db.refresh(recurring)
+
+    return recurring
+
+
+@router.delete("/{recurring_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recurring_transaction(
+    recurring_id: int,
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delete a recurring transaction. Transactions already created are kept.
+    """
+    recurring = await get_user_recurring(recurring_id, db, current_user)
+
+    await db.delete(recurring)
+    await db.commit()
+
+    return None
@@ -1,13 +1,26 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from datetime import datetime, timezone
+from sqlalchemy import select, and_, func
+from sqlalchemy.orm import aliased
+from datetime import datetime
 
-from ..database import get_db
-from ..models import Transaction, Category, TransactionType, User
-from ..schemas import TransactionCreate, TransactionUpdate, TransactionResponse
-from ..auth import get_current_user
+from ..models import (
+    Transaction, Category, TransactionType, DuplicatePolicy, TransactionChange, ChangeOperation, User,
+)
+from ..schemas import (
+    TransactionCreate, TransactionUpdate, TransactionResponse,
+    TransactionImport, TransactionImportResponse, DuplicateCluster,
+    TransactionChangesResponse, CURRENCY_PATTERN,
+)
+from ..auth import get_current_user, get_user_db
+from ..ingest import ingest_transactions, validate_currencies
+from ..cache import invalidation_bus
+from ..change_feed import record_changes
+from ..events import event_hub, change_event
+from ..fx import fx_rates
+from ..archive import archived_before, get_archived, union_with_archive, transaction_columns
+from ..queries import build_transactions_query
 
 router = APIRouter(
     prefix="/api/transactions",
@@ -15,6 +28,19 @@ router = APIRouter(
 )
 
 
+async def raise_not_found_or_archived(db: AsyncSession, user_id: int, transaction_id: int) -> None:
+    """Reject a write to a transaction missing from the hot table: 409 if archived, else 404."""
+    if await get_archived(db, user_id, [transaction_id]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Transaction is archived and cannot be changed"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Transaction not found"
+    )
+
+
 @router.get("", response_model=List[TransactionResponse])
 async def get_transactions(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
@@ -23,7 +49,8 @@ async def get_transactions(
     end_date: Optional[datetime] = Query(None, description="Filter transactions until this date"),
     transaction_type: Optional[TransactionType] = Query(None, description="Filter by transaction type"),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
-    db: AsyncSession = Depends(get_db),
+    report_currency: Optional[str] = Query(None, pattern=CURRENCY_PATTERN, description="Also return amounts in this currency"),
+    db: AsyncSession = Depends(get_user_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -35,38 +62,166 @@ async def get_transactions(
     - **end_date**: Filter transactions until this date (ISO format)
     - **transaction_type**: Filter by type (income or expense)
     - **category_id**: Filter by category ID
+    - **report_currency**: Set `report_amount` to each amount converted to this
+      currency at the exchange rate of the transaction date
+
+    Archived transactions are included when the date range reaches back to them.
     """
-    # Build query - filter by current user
-    query = select(Transaction).where(Transaction.user_id == current_user.id)
-    
-    # Apply filters
-    if start_date:
-        query = query.where(Transaction.transaction_date >= start_date)
-    if end_date:
-        query = query.where(Transaction.transaction_date <= end_date)
-    if transaction_type:
-        query = query.where(Transaction.type == transaction_type)
-    if category_id:
-        query = query.where(Transaction.category_id == category_id)
-    
-    # Order by transaction date (newest first) and apply pagination
-    query = query.order_by(Transaction.transaction_date.desc()).offset(skip).limit(limit)
+    query = build_transactions_query(
+        current_user.id, skip, limit, start_date, end_date, transaction_type, category_id,
+        archive_cutoff=await archived_before(db, current_user.id),
+    )
     
     # Execute query
     result = await db.execute(query)
     transactions = result.scalars().all()
-    
-    return transactions
+
+    if report_currency is None:
+        return transactions
+
+    # Convert the whole page at once
+    await fx_rates.ensure_loaded()
+    report_amounts = fx_rates.convert_values(
+        [t.amount for t in transactions],
+        [t.currency for t in transactions],
+        [t.transaction_date for t in transactions],
+        report_currency,
+    )
+    responses = [TransactionResponse.model_validate(t) for t in transactions]
+    for response, report_amount in zip(responses, report_amounts.tolist()):
+        response.report_amount = report_amount
+    return responses
+
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+async def get_duplicate_clusters(
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of clusters to return"),
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List clusters of suspected duplicate transactions, archived ones included.
+
+    Transactions are grouped by their fingerprint using the (user_id, fingerprint)
+    index instead of a self-join on the transactions table. Users with archived
+    transactions have both tables read with UNION ALL, each off its own index.
+    """
+    source = Transaction
+    if await archived_before(db, current_user.id) is not None:
+        source = aliased(Transaction, union_with_archive(
+            lambda model: select(*transaction_columns(model)).where(model.user_id == current_user.id)
+        ))
+
+    cluster_query = (
+        select(source.fingerprint, func.count().label("count"))
+        .where(source.user_id == current_user.id)
+        .group_by(source.fingerprint)
+        .having(func.count() > 1)
+        .order_by(func.max(source.transaction_date).desc())
+        .limit(limit)
+    )
+    cluster_result = await db.execute(cluster_query)
+    clusters = cluster_result.all()
+
+    if not clusters:
+        return []
+
+    query = (
+        select(source)
+        .where(and_(
+            source.user_id == current_user.id,
+            source.fingerprint.in_([cluster.fingerprint for cluster in clusters])
+        ))
+        .order_by(source.id)
+    )
+    result = await db.execute(query)
+
+    members = {cluster.fingerprint: [] for cluster in clusters}
+    for transaction in result.scalars().all():
+        members[transaction.fingerprint].append(transaction)
+
+    return [
+        {"fingerprint": cluster.fingerprint, "count": cluster.count, "transactions": members[cluster.fingerprint]}
+        for cluster in clusters
+    ]
+
+
+@router.get("/changes", response_model=TransactionChangesResponse)
+async def get_transaction_changes(
+    since: int = Query(0, ge=0, description="Return changes after this sequence number"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of changes to return"),
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the transactions inserted, updated or deleted since a sequence number.
+
+    Clients keep the last `next_since` they received and pass it back as `since`
+    to sync incrementally; start with `since=0` for a full copy. Within a page only
+    the latest change per transaction is returned. Deletes are returned as
+    tombstones without a transaction body.
+
+    - **since**: Last sequence number the client has applied
+    - **limit**: Maximum number of changes to read
+    """
+    query = (
+        select(TransactionChange)
+        .where(and_(TransactionChange.user_id == current_user.id, TransactionChange.seq > since))
+        .order_by(TransactionChange.seq)
+        .limit(limit + 1)
+    )
+    result = await db.execute(query)
+    changes = result.scalars().all()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Collapse to the latest change per transaction
+    latest = {}
+    for change in changes:
+        latest.pop(change.transaction_id, None)
+        latest[change.transaction_id] = change
+
+    live_ids = [tid for tid, change in latest.items() if change.operation != ChangeOperation.DELETE]
+    transactions = {}
+    if live_ids:
+        transaction_query = select(Transaction).where(
+            and_(Transaction.user_id == current_user.id, Transaction.id.in_(live_ids))
+        )
+        transaction_result = await db.execute(transaction_query)
+        transactions = {t.id: t for t in transaction_result.scalars().all()}
+        # Transactions archived since the change was recorded
+        missing = [tid for tid in live_ids if tid not in transactions]
+        transactions.update((t.id, t) for t in await get_archived(db, current_user.id, missing))
+
+    entries = []
+    for transaction_id, change in latest.items():
+        if change.operation == ChangeOperation.DELETE:
+            entries.append({"seq": change.seq, "operation": change.operation, "transaction_id": transaction_id})
+        elif transaction_id in transactions:
+            entries.append({
+                "seq": change.seq,
+                "operation": change.operation,
+                "transaction_id": transaction_id,
+                "transaction": transactions[transaction_id],
+            })
+        # Otherwise it was deleted later; its tombstone is in a later page
+
+    return {
+        "changes": entries,
+        "next_since": changes[-1].seq if changes else since,
+        "has_more": has_more,
+    }
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get a specific transaction by ID.
+    Get a specific transaction by ID, including archived ones.
     """
     query = select(Transaction).where(
         and_(Transaction.id == transaction_id, Transaction.user_id == current_user.id)
@@ -74,6 +229,10 @@ async def get_transaction(
     
     result = await db.execute(query)
     transaction = result.scalar_one_or_none()
+
+    if not transaction:
+        archived = await get_archived(db, current_user.id, [transaction_id])
+        transaction = archived[0] if archived else None
     
     if not transaction:
         raise HTTPException(
@@ -87,55 +246,95 @@ async def get_transaction(
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     transaction_data: TransactionCreate,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    on_duplicate: DuplicatePolicy = Query(DuplicatePolicy.ALLOW, description="How to handle a duplicate transaction"),
+    db: AsyncSession = Depends(get_user_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Create a new transaction.
     
     - **amount**: Transaction amount (must be greater than 0)
+    - **currency**: ISO 4217 currency code (defaults to USD)
     - **type**: Transaction type (income or expense)
     - **transaction_date**: Date of the transaction (defaults to now if not provided)
     - **description**: Optional description
     - **category_id**: Optional category ID
+    - **on_duplicate**: allow, skip, flag or merge when a transaction with the same
+      date, type, amount and description already exists. Skip and merge return the
+      existing transaction with status 200; an archived one is returned unchanged.
     """
-    # Validate category if provided (must belong to current user)
-    if transaction_data.category_id:
-        category_query = select(Category).where(
-            and_(Category.id == transaction_data.category_id, Category.user_id == current_user.id)
+    result = await ingest_transactions(db, current_user.id, [transaction_data], on_duplicate)
+    event = None
+    if result.created or result.merged:
+        event = change_event(
+            result.last_seq,
+            inserted=[t.id for t in result.created],
+            updated=[t.id for t in result.merged],
         )
-        
-        category_result = await db.execute(category_query)
-        category = category_result.scalar_one_or_none()
-        
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found or does not belong to you"
-            )
-    
-    # Create transaction for current user
-    new_transaction = Transaction(
-        amount=transaction_data.amount,
-        type=transaction_data.type,
-        description=transaction_data.description,
-        category_id=transaction_data.category_id,
-        transaction_date=transaction_data.transaction_date or datetime.now(timezone.utc),
-        user_id=current_user.id
-    )
-    
-    db.add(new_transaction)
+        await invalidation_bus.publish(db, current_user.id, "transactions", event)
     await db.commit()
-    await db.refresh(new_transaction)
+
+    if event is not None:
+        event_hub.publish(current_user.id, "transactions", event)
+
+    if result.created:
+        transaction = result.created[0]
+    else:
+        transaction = (result.merged or result.skipped)[0]
+        response.status_code = status.HTTP_200_OK
+
+    await db.refresh(transaction)
     
-    return new_transaction
+    return transaction
+
+
+@router.post("/import", response_model=TransactionImportResponse)
+async def import_transactions(
+    import_data: TransactionImport,
+    on_duplicate: DuplicatePolicy = Query(DuplicatePolicy.SKIP, description="How to handle duplicate transactions"),
+    db: AsyncSession = Depends(get_user_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import a batch of transactions, e.g. from a bank statement.
+
+    Duplicates are detected with a single indexed lookup for the whole batch, so
+    re-importing overlapping statements is cheap.
+
+    - **transactions**: Transactions to import
+    - **on_duplicate**: allow, skip (default), flag or merge
+    """
+    result = await ingest_transactions(db, current_user.id, import_data.transactions, on_duplicate)
+    event = None
+    if result.created or result.merged:
+        event = change_event(
+            result.last_seq,
+            inserted=[t.id for t in result.created],
+            updated=[t.id for t in result.merged],
+        )
+        await invalidation_bus.publish(db, current_user.id, "transactions", event)
+    await db.commit()
+
+    if event is not None:
+        event_hub.publish(current_user.id, "transactions", event)
+
+    for transaction in result.created + result.merged:
+        await db.refresh(transaction)
+
+    return {
+        "created": result.created,
+        "merged": result.merged,
+        "skipped": len(result.skipped),
+        "flagged": result.flagged,
+    }
 
 
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 async def update_transaction(
     transaction_id: int,
     transaction_data: TransactionUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -152,10 +351,7 @@ async def update_transaction(
     transaction = result.scalar_one_or_none()
     
     if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
+        await raise_not_found_or_archived(db, current_user.id, transaction_id)
     
     # Validate category if being updated (must belong to current user)
     if transaction_data.category_id is not None:
@@ -171,14 +367,21 @@ async def update_transaction(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Category not found or does not belong to you"
             )
+
+    await validate_currencies({transaction_data.currency})
     
     # Update fields (only provided fields)
     update_data = transaction_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(transaction, field, value)
     
+    seq = await record_changes(db, current_user.id, [transaction.id], ChangeOperation.UPDATE)
+    event = change_event(seq, updated=[transaction.id])
+    await invalidation_bus.publish(db, current_user.id, "transactions", event)
     await db.commit()
     await db.refresh(transaction)
+
+    event_hub.publish(current_user.id, "transactions", event)
     
     return transaction
 
@@ -186,7 +389,7 @@ async def update_transaction(
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_transaction(
     transaction_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -201,12 +404,14 @@ async def delete_transaction(
     transaction = result.scalar_one_or_none()
     
     if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
+        await raise_not_found_or_archived(db, current_user.id, transaction_id)
     
     await db.delete(transaction)
+    seq = await record_changes(db, current_user.id, [transaction_id], ChangeOperation.DELETE)
+    event = change_event(seq, deleted=[transaction_id])
+    await invalidation_bus.publish(db, current_user.id, "transactions", event)
     await db.commit()
+
+    event_hub.publish(current_user.id, "transactions", event)
     
     return None
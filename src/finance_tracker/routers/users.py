@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, Select
 
-from ..models import User
+from ..models import User, UserDirectory
 from ..schemas import UserCreate, UserResponse, Token
 from ..database import get_db
 from ..auth import get_password_hash, verify_password, create_access_token, get_current_user
+from ..cache import invalidation_bus
+from ..shards import shard_router
 
 router = APIRouter(
     prefix="/auth",
@@ -14,14 +17,28 @@ router = APIRouter(
 )
 
 
+def build_login_query(identifier: str) -> Select:
+    """
+    Build the directory lookup by username or email at login (served by
+    ix_user_directory_username and ix_user_directory_email).
+    """
+    return select(UserDirectory).where(
+        (UserDirectory.username == identifier) | (UserDirectory.email == identifier)
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
+
+    The user is first added to the directory on the default database, which
+    allocates the ID and keeps usernames and emails unique across shards, then
+    created on the shard chosen for that ID.
     
     Args:
         user_data: User registration data
-        db: Database session
+        db: Session on the default database
         
     Returns:
         Created user object
@@ -30,7 +47,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         HTTPException: If email or username already exists
     """
     # Check if email already exists
-    email_query = select(User).where(User.email == user_data.email)
+    email_query = select(UserDirectory).where(UserDirectory.email == user_data.email)
     email_result = await db.execute(email_query)
     existing_email = email_result.scalar_one_or_none()
 
@@ -41,7 +58,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
     
     # Check if username already exists
-    username_query = select(User).where(User.username == user_data.username)
+    username_query = select(UserDirectory).where(UserDirectory.username == user_data.username)
     username_result = await db.execute(username_query)
     existing_username = username_result.scalar_one_or_none()
 
@@ -54,16 +71,39 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Hash the password
     hashed_password = get_password_hash(user_data.password)
 
-    # Create the user
-    new_user = User(
-        email=user_data.email,
-        password=hashed_password,
-        username=user_data.username
-    )
+    # Reserve the username and email; the unique indexes settle concurrent registrations
+    entry = UserDirectory(email=user_data.email, username=user_data.username)
+    db.add(entry)
+    try:
+        await db.flush()
+        entry.shard = shard_router.shard_for_new_user(entry.id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        )
 
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    # Create the user on its shard
+    try:
+        async with shard_router.session(entry.shard) as shard_db:
+            new_user = User(
+                id=entry.id,
+                email=user_data.email,
+                password=hashed_password,
+                username=user_data.username
+            )
+            shard_db.add(new_user)
+            await shard_db.flush()
+            await invalidation_bus.publish(shard_db, new_user.id, "user")
+            await shard_db.commit()
+            await shard_db.refresh(new_user)
+    except Exception:
+        # Release the username and email again
+        await db.execute(delete(UserDirectory).where(UserDirectory.id == entry.id))
+        await db.commit()
+        raise
 
     return new_user
 
@@ -81,7 +121,7 @@ async def login(
     
     Args:
         form_data: OAuth2 password form (username/email and password)
-        db: Database session
+        db: Session on the default database
         
     Returns:
         JWT access token
@@ -89,12 +129,16 @@ async def login(
     Raises:
         HTTPException: If credentials are invalid
     """
-    # Try to find user by username or email
-    user_query = select(User).where(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    )
+    # Try to find user by username or email in the directory, then on its shard
+    user_query = build_login_query(form_data.username)
     user_result = await db.execute(user_query)
-    user = user_result.scalar_one_or_none()
+    entry = user_result.scalar_one_or_none()
+
+    user = None
+    if entry is not None:
+        shard_router.remember(entry.id, entry.shard)
+        async with shard_router.session(entry.shard) as shard_db:
+            user = await shard_db.get(User, entry.id)
 
     # Invalid credentials exception
     invalid_credentials_exception = HTTPException(
@@ -0,0 +1,206 @@
+import asyncio
+import calendar
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, insert, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import (
+    Transaction, RecurringTransaction, RecurrenceFrequency, ChangeOperation, compute_fingerprint, to_minor_units,
+)
+from .change_feed import record_changes
+from .cache import invalidation_bus
+from .events import event_hub, change_event
+from .shards import shard_router
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RECURRING_POLL_SECONDS = float(os.getenv("RECURRING_POLL_SECONDS", "60"))
+RECURRING_INSERT_BATCH_SIZE = int(os.getenv("RECURRING_INSERT_BATCH_SIZE", "1000"))
+# Upper bound on occurrences materialized in one database transaction
+RECURRING_MAX_ROWS_PER_RUN = int(os.getenv("RECURRING_MAX_ROWS_PER_RUN", "50000"))
+
+# Key of the Postgres advisory lock serializing materialization across workers
+ADVISORY_LOCK_KEY = 0x66745F726563  # "ft_rec"
+
+
+def _aware(moment: datetime) -> datetime:
+    """Treat naive datetimes (SQLite returns them) as UTC, so they compare with aware ones."""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Add calendar months, clamping the day to the length of the target month."""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def occurrence_date(rule: RecurringTransaction, index: int) -> datetime:
+    """
+    Date of the index-th occurrence (0-based) of a recurring transaction.
+
+    Occurrences are always computed from the start date, so a monthly rule starting
+    on the 31st falls on the last day of shorter months without drifting.
+    """
+    step = index * rule.interval
+    if rule.frequency == RecurrenceFrequency.DAILY:
+        return rule.start_date + timedelta(days=step)
+    if rule.frequency == RecurrenceFrequency.WEEKLY:
+        return rule.start_date + timedelta(weeks=step)
+    if rule.frequency == RecurrenceFrequency.MONTHLY:
+        return add_months(rule.start_date, step)
+    return add_months(rule.start_date, 12 * step)
+
+
+def schedule_next(rule: RecurringTransaction) -> None:
+    """Set next_run_at from occurrence_count, or None once past the end date."""
+    next_date = occurrence_date(rule, rule.occurrence_count)
+    if rule.end_date is not None and _aware(next_date) > _aware(rule.end_date):
+        rule.next_run_at = None
+    else:
+        rule.next_run_at = next_date
+
+
+def skip_to(rule: RecurringTransaction, moment: datetime) -> None:
+    """Skip (without materializing) every occurrence before the given moment."""
+    while rule.next_run_at is not None and _aware(rule.next_run_at) < _aware(moment):
+        rule.occurrence_count += 1
+        schedule_next(rule)
+
+
+async def _acquire_lock(db: AsyncSession) -> bool:
+    """Take the transaction-scoped advisory lock; other databases run unlocked."""
+    if db.bind.dialect.name != "postgresql":
+        return True
+    result = await db.execute(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY)))
+    return bool(result.scalar())
+
+
+async def materialize_due(now: Optional[datetime] = None, shard: int = 0) -> int:
+    """
+    Insert every due occurrence of every active recurring transaction on a shard.
+
+    Runs in one database transaction under an advisory lock, so concurrent
+    workers never insert the same occurrence twice: the loser of the lock skips
+    the run. Occurrences are inserted with multi-row INSERT statements of
+    RECURRING_INSERT_BATCH_SIZE rows, and a backlog after downtime is caught up
+    in the same way.
+
+    Returns:
+        Number of transactions inserted (capped at RECURRING_MAX_ROWS_PER_RUN)
+    """
+    now = now or datetime.now(timezone.utc)
+    events: Dict[int, dict] = {}
+
+    async with shard_router.session(shard) as db:
+        if not await _acquire_lock(db):
+            return 0
+        if db.bind.dialect.name == "sqlite":
+            # SQLite shards return naive (UTC) datetimes
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+
+        query = (
+            select(RecurringTransaction)
+            .where(and_(
+                RecurringTransaction.is_active.is_(True),
+                RecurringTransaction.next_run_at <= now,
+            ))
+            .order_by(RecurringTransaction.next_run_at)
+            .with_for_update(skip_locked=True)
+        )
+        rules = (await db.execute(query)).scalars().all()
+
+        rows: List[dict] = []
+        for rule in rules:
+            while (
+                rule.next_run_at is not None
+                and rule.next_run_at <= now
+                and len(rows) < RECURRING_MAX_ROWS_PER_RUN
+            ):
+                rows.append({
+                    "user_id": rule.user_id,
+                    "category_id": rule.category_id,
+                    "amount_minor": to_minor_units(rule.amount),
+                    "currency": rule.currency,
+                    "type": rule.type,
+                    "description": rule.description,
+                    "transaction_date": rule.next_run_at,
+                    "fingerprint": compute_fingerprint(
+                        rule.user_id, rule.next_run_at, rule.amount, rule.type, rule.description, rule.currency
+                    ),
+                })
+                rule.occurrence_count += 1
+                schedule_next(rule)
+
+        if not rows:
+            return 0
+
+        inserted: Dict[int, List[int]] = {}
+        for start in range(0, len(rows), RECURRING_INSERT_BATCH_SIZE):
+            result = await db.execute(
+                insert(Transaction).returning(Transaction.id, Transaction.user_id),
+                rows[start:start + RECURRING_INSERT_BATCH_SIZE],
+            )
+            for transaction_id, user_id in result.all():
+                inserted.setdefault(user_id, []).append(transaction_id)
+
+        for user_id, transaction_ids in inserted.items():
+            seq = await record_changes(db, user_id, transaction_ids, ChangeOperation.INSERT)
+            events[user_id] = change_event(seq, inserted=transaction_ids)
+            await invalidation_bus.publish(db, user_id, "transactions", events[user_id])
+
+        # Flushes the rules' new occurrence_count/next_run_at with the inserts
+        await db.commit()
+
+    for user_id, event in events.items():
+        event_hub.publish(user_id, "transactions", event)
+
+    return len(rows)
+
+
+class RecurringScheduler:
+    """Background task that periodically materializes due recurring transactions."""
+
+    def __init__(self, poll_seconds: float = RECURRING_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                for shard in range(len(shard_router)):
+                    # Keep going while runs hit the cap, i.e. while catching up a backlog
+                    while await materialize_due(shard=shard) >= RECURRING_MAX_ROWS_PER_RUN:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Recurring transaction materialization failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+recurring_scheduler = RecurringScheduler()
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, computed_field
 from datetime import datetime
-from typing import Optional, Dict
-from .models import TransactionType
+from typing import Optional, Dict, List, Any
+from .models import TransactionType, ChangeOperation, JobStatus, RecurrenceFrequency, DEFAULT_CURRENCY
 
 
 # ============================================================================
@@ -81,9 +81,13 @@ class CategoryResponse(CategoryBase):
 # TRANSACTION SCHEMAS
 # ============================================================================
 
+CURRENCY_PATTERN = r"^[A-Z]{3}$"
+
+
 class TransactionBase(BaseModel):
     """Base transaction schema with common fields"""
     amount: float = Field(..., gt=0, description="Transaction amount (must be greater than 0)")
+    currency: str = Field(DEFAULT_CURRENCY, pattern=CURRENCY_PATTERN, description="ISO 4217 currency code")
     type: TransactionType = Field(..., description="Transaction type (income or expense)")
     description: Optional[str] = Field(None, max_length=500, description="Transaction description")
     category_id: Optional[int] = Field(None, description="Category ID (optional)")
@@ -103,6 +107,7 @@ class TransactionCreate(TransactionBase):
 class TransactionUpdate(BaseModel):
     """Schema for updating a transaction (all fields optional)"""
     amount: Optional[float] = Field(None, gt=0, description="Transaction amount")
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN, description="ISO 4217 currency code")
     type: Optional[TransactionType] = Field(None, description="Transaction type")
     transaction_date: Optional[datetime] = Field(None, description="Transaction date")
     description: Optional[str] = Field(None, max_length=500, description="Transaction description")
@@ -114,15 +119,245 @@ class TransactionResponse(BaseModel):
     id: int
     user_id: int
     amount: float
+    currency: str
+    report_amount: Optional[float] = None  # Amount in the requested report_currency
     type: TransactionType
     transaction_date: datetime  # Always present in response
     description: Optional[str]
     category_id: Optional[int]
     category: Optional[CategoryResponse] = None  # Nested category data
+    is_duplicate: bool = False
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionImport(BaseModel):
+    """Batch of transactions to import (e.g. one bank statement)"""
+    transactions: List[TransactionCreate] = Field(
+        ..., min_length=1, max_length=5000, description="Transactions to import"
+    )
+
+
+class TransactionImportResponse(BaseModel):
+    """Outcome of a batch import"""
+    created: List[TransactionResponse]
+    merged: List[TransactionResponse]
+    skipped: int
+    flagged: int
+
+
+class DuplicateCluster(BaseModel):
+    """Group of transactions sharing the same duplicate fingerprint"""
+    fingerprint: str
+    count: int
+    transactions: List[TransactionResponse]
+
+
+class TransactionChangeEntry(BaseModel):
+    """Single change in a user's change feed"""
+    seq: int
+    operation: ChangeOperation
+    transaction_id: int
+    transaction: Optional[TransactionResponse] = None  # Omitted for deletes
+
+
+class TransactionChangesResponse(BaseModel):
+    """Page of the change feed"""
+    changes: List[TransactionChangeEntry]
+    next_since: int = Field(..., description="Pass as `since` to fetch the next page")
+    has_more: bool
+
+
+# ============================================================================
+# RECURRING TRANSACTION SCHEMAS
+# ============================================================================
+
+class RecurringTransactionBase(BaseModel):
+    """Base recurring transaction schema with common fields"""
+    amount: float = Field(..., gt=0, description="Amount of each occurrence (must be greater than 0)")
+    currency: str = Field(DEFAULT_CURRENCY, pattern=CURRENCY_PATTERN, description="ISO 4217 currency code")
+    type: TransactionType = Field(..., description="Transaction type (income or expense)")
+    description: Optional[str] = Field(None, max_length=500, description="Description copied to each occurrence")
+    category_id: Optional[int] = Field(None, description="Category ID (optional)")
+    end_date: Optional[datetime] = Field(None, description="No occurrences after this date (optional)")
+
+
+class RecurringTransactionCreate(RecurringTransactionBase):
+    """Recurring transaction creation schema"""
+    frequency: RecurrenceFrequency = Field(..., description="daily, weekly, monthly or yearly")
+    interval: int = Field(1, ge=1, le=365, description="Repeat every N periods")
+    start_date: datetime = Field(..., description="Date of the first occurrence")
+
+
+class RecurringTransactionUpdate(BaseModel):
+    """Schema for updating a recurring transaction (all fields optional; the schedule itself is fixed)"""
+    amount: Optional[float] = Field(None, gt=0, description="Amount of each occurrence")
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN, description="ISO 4217 currency code")
+    type: Optional[TransactionType] = Field(None, description="Transaction type")
+    description: Optional[str] = Field(None, max_length=500, description="Description")
+    category_id: Optional[int] = Field(None, description="Category ID")
+    end_date: Optional[datetime] = Field(None, description="No occurrences after this date")
+    is_active: Optional[bool] = Field(None, description="Pause or resume the schedule")
+
+
+class RecurringTransactionResponse(RecurringTransactionBase):
+    """Recurring transaction response schema"""
+    id: int
+    user_id: int
+    frequency: RecurrenceFrequency
+    interval: int
+    start_date: datetime
+    occurrence_count: int
+    next_run_at: Optional[datetime]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================================================
+# JOB SCHEMAS
+# ============================================================================
+
+class JobCreate(BaseModel):
+    """Job submission schema"""
+    kind: str = Field(..., description="Job kind (e.g. export, rebuild_fingerprints)")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Kind-specific parameters")
+
+
+class JobResponse(BaseModel):
+    """Job status response schema"""
+    id: int
+    kind: str
+    status: JobStatus
+    params: Dict[str, Any]
+    progress: float
+    result: Optional[Dict[str, Any]] = None
+    # Server-side path of the result file; only its download URL is returned
+    result_location: Optional[str] = Field(None, exclude=True)
+    error: Optional[str] = None
+    cancel_requested: bool
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def result_url(self) -> Optional[str]:
+        """Where to download the job's result file, if it produced one."""
+        if self.result_location is None:
+            return None
+        return f"/api/jobs/{self.id}/result"
+
+
+# ============================================================================
+# ANALYTICS SCHEMAS
+# ============================================================================
+
+class RollingAverages(BaseModel):
+    """Rolling averages for one window size"""
+    expense: List[float]
+    net: List[float]
+
+
+class RollingSeriesResponse(BaseModel):
+    """Daily totals with rolling averages, oldest day first"""
+    dates: List[str]
+    income: List[float]
+    expense: List[float]
+    net: List[float]
+    rolling: Dict[str, RollingAverages] = Field(..., description="Keyed by window size in days")
+    currency: Optional[str] = Field(None, description="Reporting currency, or None when amounts are summed as stored")
+
+
+class CategoryTrend(BaseModel):
+    """Monthly expense series of one category"""
+    category_id: Optional[int] = Field(None, description="None for uncategorized transactions")
+    monthly_expense: List[float]
+    total: float
+    slope: float = Field(..., description="Least-squares change in spend per month")
+
+
+class CategoryTrendsResponse(BaseModel):
+    """Category spend trends, oldest month first"""
+    months: List[str]
+    categories: List[CategoryTrend]
+    currency: Optional[str] = Field(None, description="Reporting currency, or None when amounts are summed as stored")
+
+
+class ForecastComponent(BaseModel):
+    """Forecast of income or expense"""
+    month_to_date: float
+    scheduled: float = Field(..., description="Already entered for the rest of the month")
+    daily_average: float
+    projected: float
+
+
+class ForecastResponse(BaseModel):
+    """Month-end cash-flow forecast"""
+    month: str
+    as_of: str
+    days_remaining: int
+    income: ForecastComponent
+    expense: ForecastComponent
+    net_projected: float
+    currency: Optional[str] = Field(None, description="Reporting currency, or None when amounts are summed as stored")
+
+
+class AnomalyResponse(BaseModel):
+    """Transaction flagged as unusual for its category"""
+    transaction_id: int
+    transaction_date: datetime
+    amount: float
+    currency: Optional[str] = Field(..., description="Currency of the amount (the reporting currency if one was requested)")
+    category_id: Optional[int]
+    score: float = Field(..., description="Robust z-score within the category")
+
+
+# ============================================================================
+# DASHBOARD SCHEMAS
+# ============================================================================
+
+class DashboardTransaction(BaseModel):
+    """Recent transaction shown on the dashboard"""
+    id: int
+    transaction_date: datetime
+    type: TransactionType
+    amount: float
+    currency: str
+    description: Optional[str]
+    category_id: Optional[int]
+
 
-    
\ No newline at end of file
+class MonthToDate(BaseModel):
+    """Totals of the current month so far in one currency"""
+    currency: str
+    income: float
+    expense: float
+    net: float
+    transactions: int
+
+
+class TopCategory(BaseModel):
+    """Expense category ranked by this month's spend in one currency"""
+    category_id: Optional[int] = Field(None, description="None for uncategorized transactions")
+    name: Optional[str]
+    currency: str
+    expense: float
+    transactions: int
+
+
+class DashboardResponse(BaseModel):
+    """Precomputed dashboard snapshot"""
+    month: str
+    computed_at: datetime
+    stale: bool = Field(..., description="The user's data changed since computed_at; a fresh snapshot is being computed")
+    recent_transactions: List[DashboardTransaction]
+    month_to_date: List[MonthToDate] = Field(..., description="One entry per currency used this month")
+    top_categories: List[TopCategory] = Field(..., description="The top categories of each currency")
@@ -0,0 +1,289 @@
+"""
+Horizontal sharding of user data.
+
+Each user's rows (the user itself, categories, transactions, the change feed
+and recurring transactions) live on one of the SHARD_DATABASE_URLS databases.
+The default database (DATABASE_URL) holds the user directory, which allocates
+user IDs, keeps usernames and emails unique across shards and records each
+user's shard, along with the global tables (jobs, FX rates).
+
+Create the tables on every database of a fresh deployment with:
+    poetry run python -m src.finance_tracker.shards init
+
+Move a user to another shard (while the user is idle) with:
+    poetry run python -m src.finance_tracker.shards rebalance --user-id 42 --to-shard 1
+"""
+import argparse
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Sequence
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import (
+    DATABASE_URL, SHARD_DATABASE_URLS, engine, async_session, make_engine, make_sessionmaker,
+)
+from .models import (
+    Base, UserDirectory, User, Category, Transaction, TransactionChange, RecurringTransaction,
+    ArchivedTransaction, ArchiveManifest, ChangeOperation,
+)
+from .cache import TTLCache, invalidation_bus
+from .change_feed import record_changes
+from .events import event_hub, change_event
+
+logger = logging.getLogger(__name__)
+
+# Tables holding per-user data, in the order rows can be inserted
+SHARD_TABLES = [
+    User, Category, Transaction, ArchivedTransaction, ArchiveManifest, TransactionChange, RecurringTransaction,
+]
+
+REBALANCE_BATCH_SIZE = 5000
+
+
+class UserNotFound(Exception):
+    """The user is not in the user directory."""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        super().__init__(f"User {user_id} is not in the user directory")
+
+
+class ShardRouter:
+    """
+    Maps user IDs to the database holding their data.
+
+    Shard numbers are indexes into the configured URLs. A user's shard is read
+    from the user directory and cached until the user entity is invalidated,
+    which the rebalance tool does after moving a user.
+    """
+
+    def __init__(self, urls: Sequence[str] = SHARD_DATABASE_URLS):
+        self.urls = list(urls)
+        # Reuse the default engine (and its pool) when it doubles as a shard
+        self.engines = [engine if url == DATABASE_URL else make_engine(url) for url in self.urls]
+        self.sessionmakers = [make_sessionmaker(shard_engine) for shard_engine in self.engines]
+        self._shards = TTLCache(entities=["user"])
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def shard_for_new_user(self, user_id: int) -> int:
+        """Shard a newly registered user is placed on."""
+        return user_id % len(self.urls)
+
+    def remember(self, user_id: int, shard: int) -> None:
+        """Cache a user's shard read from the directory elsewhere (e.g. at login)."""
+        self._shards.set(user_id, shard, user_id)
+
+    async def shard_of(self, user_id: int) -> int:
+        """
+        Shard holding a user's data.
+
+        Raises:
+            UserNotFound: If the user is not in the directory
+        """
+        if len(self.urls) == 1:
+            return 0
+
+        cached = self._shards.get(user_id)
+        if cached is not None:
+            return cached
+
+        cache_version = self._shards.version
+        async with async_session() as db:
+            result = await db.execute(select(UserDirectory.shard).where(UserDirectory.id == user_id))
+            shard = result.scalar_one_or_none()
+        if shard is None:
+            raise UserNotFound(user_id)
+
+        self._shards.set(user_id, shard, user_id, version=cache_version)
+        return shard
+
+    @asynccontextmanager
+    async def session(self, shard: int) -> AsyncIterator[AsyncSession]:
+        """Open a session on a shard."""
+        if not 0 <= shard < len(self.sessionmakers):
+            raise ValueError(f"Shard {shard} is not configured (SHARD_DATABASE_URLS has {len(self.urls)})")
+        async with self.sessionmakers[shard]() as db:
+            yield db
+
+    @asynccontextmanager
+    async def user_session(self, user_id: int) -> AsyncIterator[AsyncSession]:
+        """Open a session on the shard holding a user's data."""
+        async with self.session(await self.shard_of(user_id)) as db:
+            yield db
+
+    async def dispose(self) -> None:
+        """Close the connection pools of the shards other than the default database."""
+        for shard_engine in self.engines:
+            if shard_engine is not engine:
+                await shard_engine.dispose()
+
+
+shard_router = ShardRouter()
+
+
+async def create_tables() -> None:
+    """Create every table on the default database and the user data tables on each shard."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    shard_tables = [model.__table__ for model in SHARD_TABLES]
+    for shard_engine in shard_router.engines:
+        if shard_engine is engine:
+            continue
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=shard_tables)
+
+
+async def _copy_rows(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    """Insert rows in batches and return their new IDs, in the order of `rows`."""
+    new_ids: List[int] = []
+    for start in range(0, len(rows), REBALANCE_BATCH_SIZE):
+        result = await db.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + REBALANCE_BATCH_SIZE],
+        )
+        new_ids.extend(result.scalars().all())
+    return new_ids
+
+
+def _row_dicts(rows, exclude: Sequence[str] = ("id",)) -> List[dict]:
+    return [{key: value for key, value in row._mapping.items() if key not in exclude} for row in rows]
+
+
+async def _delete_user_data(db: AsyncSession, user_id: int) -> None:
+    """Delete every row of a user from one shard, children first."""
+    for model in reversed(SHARD_TABLES):
+        column = model.id if model is User else model.user_id
+        await db.execute(delete(model).where(column == user_id))
+
+
+async def rebalance_user(user_id: int, to_shard: int) -> Dict[str, int]:
+    """
+    Move a user's data to another shard.
+
+    Rows are copied to the target shard under new IDs (IDs are only unique per
+    shard), the directory is switched over, then the source rows are deleted.
+    The change feed history is copied too, followed by a tombstone for every old
+    transaction ID and an insert for every new one, so syncing clients replace
+    their copy. Writes by the user during the move may be lost, so run this while
+    the user is idle. Archived transactions are moved back into the hot table of
+    the target shard; the next archive run archives them again.
+
+    Returns:
+        Number of rows moved per table
+    """
+    async with async_session() as directory_db:
+        entry = await directory_db.get(UserDirectory, user_id)
+    if entry is None:
+        raise UserNotFound(user_id)
+    from_shard = entry.shard
+    if from_shard == to_shard:
+        return {}
+
+    async with shard_router.session(from_shard) as source, shard_router.session(to_shard) as target:
+        user = (await source.execute(
+            select(User.__table__).where(User.id == user_id).with_for_update()
+        )).one()
+        categories = (await source.execute(
+            select(Category.__table__).where(Category.user_id == user_id).order_by(Category.id)
+        )).all()
+        transactions = (await source.execute(
+            select(Transaction.__table__).where(Transaction.user_id == user_id).order_by(Transaction.id)
+        )).all()
+        transactions += (await source.execute(
+            select(ArchivedTransaction.__table__)
+            .where(ArchivedTransaction.user_id == user_id)
+            .order_by(ArchivedTransaction.id)
+        )).all()
+        changes = (await source.execute(
+            select(TransactionChange.__table__)
+            .where(TransactionChange.user_id == user_id)
+            .order_by(TransactionChange.seq)
+        )).all()
+        rules = (await source.execute(
+            select(RecurringTransaction.__table__)
+            .where(RecurringTransaction.user_id == user_id)
+            .order_by(RecurringTransaction.id)
+        )).all()
+
+        # Leftovers of an interrupted earlier attempt
+        await _delete_user_data(target, user_id)
+
+        # The user keeps its ID: it was allocated by the directory
+        await target.execute(insert(User), _row_dicts([user], exclude=()))
+
+        category_ids = dict(zip(
+            [row.id for row in categories],
+            await _copy_rows(target, Category, _row_dicts(categories)),
+        ))
+
+        def remap(rows) -> List[dict]:
+            dicts = _row_dicts(rows)
+            for row in dicts:
+                if row["category_id"] is not None:
+                    row["category_id"] = category_ids[row["category_id"]]
+            return dicts
+
+        new_transaction_ids = await _copy_rows(target, Transaction, remap(transactions))
+        await _copy_rows(target, RecurringTransaction, remap(rules))
+        await _copy_rows(target, TransactionChange, _row_dicts(changes))
+
+        old_transaction_ids = [row.id for row in transactions]
+        await record_changes(target, user_id, old_transaction_ids, ChangeOperation.DELETE)
+        seq = await record_changes(target, user_id, new_transaction_ids, ChangeOperation.INSERT)
+        await target.commit()
+
+        async with async_session() as directory_db:
+            await directory_db.execute(
+                update(UserDirectory).where(UserDirectory.id == user_id).values(shard=to_shard)
+            )
+            event = change_event(seq, inserted=new_transaction_ids, deleted=old_transaction_ids)
+            await invalidation_bus.publish(directory_db, user_id, "user")
+            await invalidation_bus.publish(directory_db, user_id, "transactions", event)
+            await directory_db.commit()
+        event_hub.publish(user_id, "transactions", event)
+
+        await _delete_user_data(source, user_id)
+        await source.commit()
+
+    return {
+        "categories": len(categories),
+        "transactions": len(transactions),
+        "transaction_changes": len(changes),
+        "recurring_transactions": len(rules),
+    }
+
+
+async def _run(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "init":
+            await create_tables()
+            print(f"Created tables on the default database and {len(shard_router)} shard(s)")
+        else:
+            moved = await rebalance_user(args.user_id, args.to_shard)
+            if not moved:
+                print(f"User {args.user_id} is already on shard {args.to_shard}")
+            else:
+                print(f"Moved user {args.user_id} to shard {args.to_shard}: "
+                      + ", ".join(f"{count} {table}" for table, count in moved.items()))
+    finally:
+        await shard_router.dispose()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the databases user data is sharded across.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init", help="Create the tables on the default database and every shard")
+    rebalance = commands.add_parser("rebalance", help="Move a user's data to another shard")
+    rebalance.add_argument("--user-id", type=int, required=True)
+    rebalance.add_argument("--to-shard", type=int, required=True, help="Index into SHARD_DATABASE_URLS")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Test configuration.
+
+The application reads its configuration from the environment at import time, so
+point it at throwaway SQLite files (a default database and two shards) before
+any test module imports it. The query plan tests use PLAN_TEST_DATABASE_URL
+instead and do not touch these.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="finance-tracker-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{TEST_DIR}/default.db",
+    "SHARD_DATABASE_URLS": ",".join(
+        f"sqlite+aiosqlite:///{TEST_DIR}/shard{shard}.db" for shard in range(2)
+    ),
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "CACHE_LISTENER_ENABLED": "false",
+    "JOB_STORAGE_DIR": os.path.join(TEST_DIR, "jobs"),
+    "RECURRING_POLL_SECONDS": "3600",
+    "JOB_POLL_SECONDS": "3600",
+})
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client of the application, with the tables created on every database."""
+    from fastapi.testclient import TestClient
+    from src.finance_tracker.app import app
+    from src.finance_tracker.shards import create_tables, shard_router
+
+    async def setup():
+        await create_tables()
+        # Pooled connections are bound to this loop, not the client's
+        await shard_router.dispose()
+
+    asyncio.run(setup())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register(client):
+    """Return a function registering a new user and returning (user ID, auth headers)."""
+    def register_user():
+        username = "user" + uuid.uuid4().hex[:12]
+        response = client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "password123",
+        })
+        assert response.status_code == 201, response.text
+        user_id = response.json()["id"]
+
+        response = client.post("/auth/login", data={"username": username, "password": "password123"})
+        assert response.status_code == 200, response.text
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register_user
@@ -0,0 +1,117 @@
+"""Tests for the vectorized analytics on hand-built columns (no database needed)."""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.finance_tracker.analytics import (
+    TransactionColumns, SECONDS_PER_DAY, columns_cache, results_cache, epoch_day, rolling_series,
+    category_trends, month_end_forecast, detect_anomalies,
+)
+from src.finance_tracker.cache import invalidation_bus
+
+AS_OF_DAY = epoch_day(datetime(2026, 3, 15, tzinfo=timezone.utc))
+INCOME, EXPENSE = True, False
+
+
+def day_of(year: int, month: int, day: int) -> int:
+    return epoch_day(datetime(year, month, day, tzinfo=timezone.utc))
+
+
+def make_columns(entries) -> TransactionColumns:
+    """Columns from (day, amount, is_income, category_id or None) entries, all in USD."""
+    rows = [
+        (position + 1, day * SECONDS_PER_DAY + 3600, round(amount * 100), is_income,
+         -1 if category_id is None else category_id, 0)
+        for position, (day, amount, is_income, category_id) in enumerate(entries)
+    ]
+    return TransactionColumns.from_rows(rows, ("USD",))
+
+
+def test_rolling_series_includes_history_for_the_first_windows():
+    columns = make_columns([
+        (AS_OF_DAY - 2, 10, EXPENSE, 1),
+        (AS_OF_DAY - 1, 100, INCOME, None),
+        (AS_OF_DAY, 20, EXPENSE, 1),
+        (AS_OF_DAY - 3, 1000, INCOME, None),  # Only seen through the windows
+    ])
+
+    series = rolling_series(columns, AS_OF_DAY, days=3, windows=[2])
+
+    assert series["dates"] == ["2026-03-13", "2026-03-14", "2026-03-15"]
+    assert series["income"] == [0, 100, 0]
+    assert series["expense"] == [10, 0, 20]
+    assert series["net"] == [-10, 100, -20]
+    assert series["rolling"]["2"]["expense"] == [5, 5, 10]
+    assert series["rolling"]["2"]["net"] == [495, 45, 40]
+
+
+def test_category_trends_totals_expenses_per_month_with_slopes():
+    columns = make_columns([
+        (day_of(2026, 1, 5), 10, EXPENSE, 1),
+        (day_of(2026, 2, 5), 20, EXPENSE, 1),
+        (day_of(2026, 3, 5), 30, EXPENSE, 1),
+        (day_of(2026, 2, 28), 5, EXPENSE, None),
+        (day_of(2026, 3, 1), 500, INCOME, 1),     # Income is ignored
+        (day_of(2025, 12, 31), 70, EXPENSE, 1),   # Before the first month
+        (day_of(2026, 3, 16), 90, EXPENSE, 1),    # After the as-of day
+    ])
+
+    trends = category_trends(columns, AS_OF_DAY, months=3)
+
+    assert trends["months"] == ["2026-01", "2026-02", "2026-03"]
+    uncategorized, category = trends["categories"]
+    assert uncategorized == {"category_id": None, "monthly_expense": [0, 5, 0], "total": 5, "slope": 0}
+    assert category["category_id"] == 1
+    assert category["monthly_expense"] == [10, 20, 30]
+    assert category["total"] == 60
+    assert category["slope"] == pytest.approx(10)
+
+
+def test_month_end_forecast_projects_the_trailing_daily_average():
+    columns = make_columns([
+        (day_of(2026, 3, 1), 50, EXPENSE, None),   # Month to date, before the lookback
+        (day_of(2026, 3, 10), 30, EXPENSE, None),
+        (day_of(2026, 3, 14), 100, INCOME, None),
+        (day_of(2026, 3, 20), 7, EXPENSE, None),   # Already scheduled
+        (day_of(2026, 2, 28), 40, EXPENSE, None),  # Last month
+    ])
+
+    forecast = month_end_forecast(columns, AS_OF_DAY, lookback_days=10)
+
+    assert forecast["month"] == "2026-03"
+    assert forecast["as_of"] == "2026-03-15"
+    assert forecast["days_remaining"] == 16
+    assert forecast["expense"] == {"month_to_date": 80, "scheduled": 7, "daily_average": 3, "projected": 135}
+    assert forecast["income"] == {"month_to_date": 100, "scheduled": 0, "daily_average": 10, "projected": 260}
+    assert forecast["net_projected"] == 125
+
+
+def test_detect_anomalies_scores_within_each_category():
+    entries = [(AS_OF_DAY - 20, amount, EXPENSE, 1) for amount in (10, 11, 12, 10, 11)]
+    entries += [
+        (AS_OF_DAY, 100, EXPENSE, 1),
+        (AS_OF_DAY - 30, 90, EXPENSE, 1),         # Before since_day
+        (AS_OF_DAY, 5000, INCOME, 1),             # Income is never flagged
+        (AS_OF_DAY, 5, EXPENSE, 2),
+        (AS_OF_DAY, 500, EXPENSE, 2),             # Too few samples in its category
+    ]
+    # No spread at all: scored against the mean absolute deviation instead
+    entries += [(AS_OF_DAY - 20, 5, EXPENSE, 3)] * 5 + [(AS_OF_DAY, 50, EXPENSE, 3)]
+    columns = make_columns(entries)
+
+    anomalies = detect_anomalies(columns, since_day=AS_OF_DAY - 10, threshold=3.5, min_samples=5)
+
+    assert anomalies["positions"].tolist() == [5, len(entries) - 1]
+    np.testing.assert_allclose(anomalies["scores"], [0.6745 * 89, 0.7979 * 45 / 7.5])
+
+
+def test_caches_are_evicted_when_rates_are_loaded():
+    columns_cache.set(1, "columns", user_id=1)
+    results_cache.set(("rolling", 1), "result", user_id=1)
+
+    # What the rate loader publishes, once committed
+    invalidation_bus.evict(None, "fx_rates")
+
+    assert columns_cache.get(1) is None
+    assert results_cache.get(("rolling", 1)) is None
@@ -0,0 +1,97 @@
+"""Tests for reads and writes reaching archived transactions, through the test client."""
+from datetime import datetime, timezone
+
+import pytest
+
+from src.finance_tracker.archive import archive_user
+from src.finance_tracker.shards import shard_router
+
+CUTOFF = datetime(2021, 1, 1, tzinfo=timezone.utc)
+OLD_RENT = {"amount": 700, "type": "expense", "description": "Rent", "transaction_date": "2020-06-01T00:00:00Z"}
+
+
+@pytest.fixture
+def archived_user(client, register):
+    """A user whose transactions dated before CUTOFF are archived; returns (headers, old ID, recent ID)."""
+    user_id, headers = register()
+    old = client.post("/api/transactions", headers=headers, json=OLD_RENT)
+    recent = client.post("/api/transactions", headers=headers, json={
+        "amount": 50, "type": "income", "transaction_date": "2026-01-01T00:00:00Z",
+    })
+    assert old.status_code == recent.status_code == 201
+
+    async def archive():
+        async with shard_router.user_session(user_id) as db:
+            archived = await archive_user(db, user_id, CUTOFF)
+            await db.commit()
+        return archived
+
+    assert client.portal.call(archive) == 1
+    return headers, old.json()["id"], recent.json()["id"]
+
+
+def test_reimported_archived_transactions_are_duplicates(client, archived_user):
+    headers, old_id, _ = archived_user
+
+    for policy in ("skip", "merge"):
+        response = client.post("/api/transactions", headers=headers, params={"on_duplicate": policy}, json=OLD_RENT)
+        assert response.status_code == 200, (policy, response.text)
+        assert response.json()["id"] == old_id
+
+    imported = client.post("/api/transactions/import", headers=headers, json={"transactions": [
+        OLD_RENT, {**OLD_RENT, "amount": 710},
+    ]}).json()
+    assert (len(imported["created"]), imported["skipped"]) == (1, 1)
+
+    flagged = client.post("/api/transactions", headers=headers, params={"on_duplicate": "flag"}, json=OLD_RENT)
+    assert flagged.status_code == 201, flagged.text
+    assert flagged.json()["is_duplicate"] is True
+
+    clusters = client.get("/api/transactions/duplicates", headers=headers).json()
+    assert [(cluster["count"], [t["id"] for t in cluster["transactions"]]) for cluster in clusters] == [
+        (2, [old_id, flagged.json()["id"]]),
+    ]
+
+
+def test_list_reads_the_archive_when_dates_reach_back(client, archived_user):
+    headers, old_id, recent_id = archived_user
+
+    listed = client.get("/api/transactions", headers=headers)
+    since_2020 = client.get("/api/transactions", headers=headers, params={"start_date": "2020-01-01T00:00:00Z"})
+    since_2025 = client.get("/api/transactions", headers=headers, params={"start_date": "2025-01-01T00:00:00Z"})
+
+    assert listed.status_code == 200, listed.text
+    assert [transaction["id"] for transaction in listed.json()] == [recent_id, old_id]
+    assert listed.json()[1]["amount"] == 700
+    assert [transaction["id"] for transaction in since_2020.json()] == [recent_id, old_id]
+    assert [transaction["id"] for transaction in since_2025.json()] == [recent_id]
+    assert [t["id"] for t in client.get("/api/transactions", headers=headers, params={"skip": 1}).json()] == [old_id]
+
+
+def test_get_falls_back_to_the_archive(client, archived_user):
+    headers, old_id, _ = archived_user
+
+    response = client.get(f"/api/transactions/{old_id}", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert (response.json()["id"], response.json()["description"]) == (old_id, "Rent")
+    assert client.get("/api/transactions/999999999", headers=headers).status_code == 404
+
+
+def test_archived_transactions_cannot_be_changed(client, register, archived_user):
+    headers, old_id, recent_id = archived_user
+
+    updated = client.put(f"/api/transactions/{old_id}", headers=headers, json={"amount": 1})
+    deleted = client.delete(f"/api/transactions/{old_id}", headers=headers)
+
+    assert updated.status_code == 409, updated.text
+    assert deleted.status_code == 409, deleted.text
+    assert client.get(f"/api/transactions/{old_id}", headers=headers).json()["amount"] == 700
+    assert client.put("/api/transactions/999999999", headers=headers, json={"amount": 1}).status_code == 404
+    assert client.delete("/api/transactions/999999999", headers=headers).status_code == 404
+    assert client.put(f"/api/transactions/{recent_id}", headers=headers, json={"amount": 1}).status_code == 200
+
+    # Another user's archived transaction stays hidden
+    _, other_headers = register()
+    assert client.get(f"/api/transactions/{old_id}", headers=other_headers).status_code == 404
+    assert client.delete(f"/api/transactions/{old_id}", headers=other_headers).status_code == 404
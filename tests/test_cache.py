@@ -0,0 +1,162 @@
+"""Tests for the per-process caches and the invalidation bus (no Postgres needed)."""
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.finance_tracker.cache import InvalidationBus, TTLCache, SnapshotCache
+
+
+def make_cache() -> TTLCache:
+    # No DSNs: the bus is reliable and only evicts locally
+    return TTLCache(entities=["transactions"], bus=InvalidationBus([]))
+
+
+async def _publish_then(finish: str) -> list:
+    """Cache a value, publish a change and record whether it is cached before and after `finish`."""
+    cache = make_cache()
+    engine = create_async_engine("sqlite+aiosqlite://")
+    seen = []
+    async with async_sessionmaker(engine)() as db:
+        await db.execute(text("SELECT 1"))
+        cache.set("key", "old", user_id=1)
+        await cache.bus.publish(db, 1, "transactions")
+        seen.append(cache.get("key"))
+        await getattr(db, finish)()
+        seen.append(cache.get("key"))
+    await engine.dispose()
+    return seen
+
+
+def test_publish_evicts_on_commit():
+    assert asyncio.run(_publish_then("commit")) == ["old", None]
+
+
+def test_publish_does_not_evict_on_rollback():
+    assert asyncio.run(_publish_then("rollback")) == ["old", "old"]
+
+
+def test_value_loaded_before_commit_is_not_cached_under_new_version():
+    async def scenario():
+        cache = make_cache()
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with async_sessionmaker(engine)() as db:
+            await db.execute(text("SELECT 1"))
+            await cache.bus.publish(db, 1, "transactions")
+            # A concurrent read loads pre-commit data between publish and commit
+            version = cache.version
+            await db.commit()
+            cache.set("key", "pre-commit", user_id=1, version=version)
+        await engine.dispose()
+        return cache.get("key")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(entities=[], maxsize=2, bus=InvalidationBus([]))
+    cache.set("a", 1, user_id=1)
+    cache.set("b", 2, user_id=1)
+    cache.get("a")
+    cache.set("c", 3, user_id=2)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+class CountingCompute:
+    """Snapshot computation returning ("snapshot", n) on its n-th call, once released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, user_id: int):
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        return "snapshot", call
+
+
+def make_snapshots(compute, **kwargs) -> SnapshotCache:
+    return SnapshotCache(entities=["transactions"], compute=compute, bus=InvalidationBus([]), **kwargs)
+
+
+def test_snapshot_cache_shares_one_computation_between_concurrent_reads():
+    async def scenario():
+        compute = CountingCompute()
+        snapshots = make_snapshots(compute)
+        reads = [asyncio.create_task(snapshots.get(1)) for _ in range(5)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*reads), compute.calls
+
+    results, calls = asyncio.run(scenario())
+
+    assert calls == 1
+    assert results == [(("snapshot", 1), False)] * 5
+
+
+def test_snapshot_cache_serves_stale_while_revalidating():
+    async def scenario():
+        compute = CountingCompute()
+        compute.release.set()
+        snapshots = make_snapshots(compute)
+        seen = [await snapshots.get(1)]
+
+        compute.release.clear()
+        snapshots.bus.evict(1, "transactions")
+        seen.append(await snapshots.get(1))  # Returns at once while recomputing
+        seen.append(await snapshots.get(1))  # Still the same computation
+        compute.release.set()
+        await snapshots.refresh(1)
+        seen.append(await snapshots.get(1))
+        return seen, compute.calls
+
+    seen, calls = asyncio.run(scenario())
+
+    assert seen == [
+        (("snapshot", 1), False),
+        (("snapshot", 1), True),
+        (("snapshot", 1), True),
+        (("snapshot", 2), False),
+    ]
+    assert calls == 2
+
+
+def test_snapshot_computed_across_a_change_is_stored_stale():
+    async def scenario():
+        compute = CountingCompute()
+        snapshots = make_snapshots(compute)
+        first = asyncio.create_task(snapshots.get(1))
+        await asyncio.sleep(0)
+        # The change may have been committed after the computation read the data
+        snapshots.bus.evict(1, "transactions")
+        compute.release.set()
+        seen = [await first, await snapshots.get(1)]
+        await snapshots.refresh(1)
+        seen.append(await snapshots.get(1))
+        return seen
+
+    assert asyncio.run(scenario()) == [
+        (("snapshot", 1), False),
+        (("snapshot", 1), True),
+        (("snapshot", 2), False),
+    ]
+
+
+def test_snapshot_cache_expires_and_evicts_least_recently_read():
+    async def scenario():
+        compute = CountingCompute()
+        compute.release.set()
+        snapshots = make_snapshots(compute, maxsize=2, ttl=0)
+        for user_id in (1, 2, 1, 3):
+            await snapshots.get(user_id)
+            # Let the refresh of an expired snapshot finish
+            for task in list(snapshots._inflight.values()):
+                await task
+        return set(snapshots._entries), compute.calls
+
+    # User 1 was read twice and expired (ttl=0) in between; user 2 was evicted
+    assert asyncio.run(scenario()) == ({1, 3}, 4)
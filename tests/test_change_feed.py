@@ -0,0 +1,105 @@
+"""Tests for the transaction change feed, through the test client."""
+from datetime import datetime, timezone
+
+from src.finance_tracker.archive import archive_user
+from src.finance_tracker.shards import shard_router
+
+
+def get_changes(client, headers, since=0, limit=500) -> dict:
+    response = client.get("/api/transactions/changes", headers=headers, params={"since": since, "limit": limit})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def summarize(page: dict) -> list:
+    """(seq, operation, transaction ID, amount or None for tombstones) of each entry of a page."""
+    return [
+        (change["seq"], change["operation"], change["transaction_id"],
+         change["transaction"]["amount"] if change.get("transaction") else None)
+        for change in page["changes"]
+    ]
+
+
+def make_history(client, headers) -> tuple:
+    """Create A and B, update B, delete A, create C; returns the IDs of A, B and C."""
+    first = client.post("/api/transactions", headers=headers, json={"amount": 10, "type": "expense"}).json()["id"]
+    second = client.post("/api/transactions", headers=headers, json={"amount": 20, "type": "expense"}).json()["id"]
+    assert client.put(f"/api/transactions/{second}", headers=headers, json={"amount": 25}).status_code == 200
+    # Deleting the newest row would let SQLite hand its ID out again
+    assert client.delete(f"/api/transactions/{first}", headers=headers).status_code == 204
+    third = client.post("/api/transactions", headers=headers, json={"amount": 30, "type": "income"}).json()["id"]
+    return first, second, third
+
+
+def test_changes_collapse_to_the_latest_per_transaction(client, register):
+    _, headers = register()
+    assert get_changes(client, headers) == {"changes": [], "next_since": 0, "has_more": False}
+    first, second, third = make_history(client, headers)
+
+    page = get_changes(client, headers)
+
+    assert summarize(page) == [
+        (3, "update", second, 25),
+        (4, "delete", first, None),
+        (5, "insert", third, 30),
+    ]
+    assert page["next_since"] == 5
+    assert page["has_more"] is False
+    assert get_changes(client, headers, since=5) == {"changes": [], "next_since": 5, "has_more": False}
+
+
+def test_changes_are_paged_by_sequence_number(client, register):
+    _, headers = register()
+    first, second, third = make_history(client, headers)
+
+    pages = []
+    since, has_more = 0, True
+    while has_more:
+        page = get_changes(client, headers, since=since, limit=2)
+        pages.append((summarize(page), page["next_since"], page["has_more"]))
+        since, has_more = page["next_since"], page["has_more"]
+
+    assert pages == [
+        # A was deleted later: its insert is dropped, its tombstone follows
+        ([(2, "insert", second, 25)], 2, True),
+        ([(3, "update", second, 25), (4, "delete", first, None)], 4, True),
+        ([(5, "insert", third, 30)], 5, False),
+    ]
+
+
+def test_change_sequence_increases_with_every_write(client, register):
+    _, headers = register()
+    make_history(client, headers)
+
+    seqs = []
+    since = 0
+    for _ in range(5):
+        page = get_changes(client, headers, since=since, limit=1)
+        since = page["next_since"]
+        seqs.append(since)
+
+    assert seqs == [1, 2, 3, 4, 5]
+    # Another user's writes have a sequence of their own
+    _, other_headers = register()
+    client.post("/api/transactions", headers=other_headers, json={"amount": 1, "type": "income"})
+    assert summarize(get_changes(client, other_headers))[0][0] == 1
+    assert get_changes(client, headers, since=5)["changes"] == []
+
+
+def test_changes_to_archived_transactions_are_read_from_the_archive(client, register):
+    user_id, headers = register()
+    old = client.post("/api/transactions", headers=headers, json={
+        "amount": 40, "type": "expense", "transaction_date": "2020-01-01T00:00:00Z",
+    }).json()["id"]
+
+    async def archive():
+        async with shard_router.user_session(user_id) as db:
+            await archive_user(db, user_id, datetime(2021, 1, 1, tzinfo=timezone.utc))
+            await db.commit()
+
+    client.portal.call(archive)
+
+    page = get_changes(client, headers)
+
+    assert summarize(page) == [(1, "insert", old, 40)]
+    assert page["changes"][0]["transaction"]["transaction_date"].startswith("2020-01-01")
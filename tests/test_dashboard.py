@@ -0,0 +1,46 @@
+"""Tests for the dashboard snapshot, through the test client."""
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from src.finance_tracker.models import Category, Transaction, TransactionType, to_minor_units
+from src.finance_tracker.shards import shard_router
+
+
+def test_dashboard_keeps_currencies_apart(client, register):
+    user_id, headers = register()
+
+    async def seed():
+        # Inserted directly: EUR has no exchange rates loaded in the tests
+        now = datetime.now(timezone.utc)
+        async with shard_router.user_session(user_id) as db:
+            category_id = (await db.execute(
+                insert(Category).values(name="Rent", user_id=user_id).returning(Category.id)
+            )).scalar_one()
+            await db.execute(insert(Transaction), [
+                {"user_id": user_id, "amount_minor": to_minor_units(amount), "currency": currency, "type": kind,
+                 "category_id": category, "transaction_date": now, "fingerprint": f"{index:064d}"}
+                for index, (amount, currency, kind, category) in enumerate([
+                    (1000, "USD", TransactionType.INCOME, None),
+                    (300, "USD", TransactionType.EXPENSE, category_id),
+                    (20, "USD", TransactionType.EXPENSE, None),
+                    (800, "EUR", TransactionType.EXPENSE, category_id),
+                ])
+            ])
+            await db.commit()
+
+    client.portal.call(seed)
+
+    response = client.get("/api/dashboard", headers=headers)
+
+    assert response.status_code == 200, response.text
+    dashboard = response.json()
+    assert dashboard["stale"] is False
+    assert len(dashboard["recent_transactions"]) == 4
+    assert dashboard["month_to_date"] == [
+        {"currency": "EUR", "income": 0, "expense": 800, "net": -800, "transactions": 1},
+        {"currency": "USD", "income": 1000, "expense": 320, "net": 680, "transactions": 3},
+    ]
+    assert [(category["currency"], category["name"], category["expense"]) for category in dashboard["top_categories"]] == [
+        ("EUR", "Rent", 800), ("USD", "Rent", 300), ("USD", None, 20),
+    ]
@@ -0,0 +1,113 @@
+"""Tests for the Server-Sent Events stream, through the test client alone."""
+import pytest
+
+from src.finance_tracker.events import event_hub, Subscription, RESYNC_EVENT
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    # The test client reads the whole body, so streams must end on their own
+    monkeypatch.setattr(event_hub, "stream_lifetime_seconds", 0.3)
+    monkeypatch.setattr(event_hub, "heartbeat_seconds", 0.1)
+
+
+def events_of(body: str) -> list:
+    """Event names and comments of a stream body, in order."""
+    names = []
+    for message in body.split("\n\n"):
+        for line in message.splitlines():
+            if line.startswith("event: "):
+                names.append(line[len("event: "):])
+            elif line.startswith(":"):
+                names.append(line)
+    return names
+
+
+def deliver_on_subscribe(monkeypatch, make_events):
+    """Deliver events to each new subscription as if published before the stream is read."""
+    subscribe = event_hub.subscribe
+
+    def subscribe_and_deliver(user_id):
+        subscription = subscribe(user_id)
+        for event in make_events():
+            subscription.deliver(event)
+        return subscription
+
+    monkeypatch.setattr(event_hub, "subscribe", subscribe_and_deliver)
+
+
+def test_stream_sends_ready_then_heartbeats(client, register, short_streams):
+    _, headers = register()
+
+    response = client.get("/api/events", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: ")
+    assert "id: 0\nevent: ready\ndata: {\"seq\": 0}" in response.text
+    names = events_of(response.text)
+    assert names[0] == "ready"
+    assert ": heartbeat" in names[1:]
+    assert event_hub.stream_count == 0
+
+
+def test_stale_last_event_id_gets_resync_before_ready(client, register, short_streams):
+    _, headers = register()
+    created = client.post("/api/transactions", headers=headers, json={"amount": 12.5, "type": "expense"})
+    assert created.status_code == 201, created.text
+
+    stale = client.get("/api/events", headers={**headers, "Last-Event-ID": "0"})
+    current = client.get("/api/events", headers={**headers, "Last-Event-ID": "1"})
+
+    assert events_of(stale.text)[:2] == ["resync", "ready"]
+    assert "resync" not in events_of(current.text)
+
+
+def test_queue_overflow_turns_into_resync(client, register, short_streams, monkeypatch):
+    _, headers = register()
+    monkeypatch.setattr(event_hub, "queue_size", 2)
+    deliver_on_subscribe(monkeypatch, lambda: [
+        {"event": "transactions", "data": {"seq": seq}} for seq in range(1, 4)
+    ])
+
+    response = client.get("/api/events", headers=headers)
+
+    names = events_of(response.text)
+    assert names[:2] == ["ready", "resync"]
+    assert "transactions" not in names
+
+
+def test_events_queued_before_ready_are_not_repeated(client, register, short_streams, monkeypatch):
+    _, headers = register()
+    # Subscribed before the sequence number (0) is read: the first event is
+    # already covered by the ready event, the second is not
+    deliver_on_subscribe(monkeypatch, lambda: [
+        {"event": "transactions", "data": {"seq": 0}},
+        {"event": "transactions", "data": {"seq": 1}},
+    ])
+
+    response = client.get("/api/events", headers=headers)
+
+    assert events_of(response.text)[:2] == ["ready", "transactions"]
+    assert "id: 1\nevent: transactions" in response.text
+    assert response.text.count("event: transactions") == 1
+
+
+def test_stream_cap_returns_503(client, register, monkeypatch):
+    _, headers = register()
+    monkeypatch.setattr(event_hub, "max_streams", 0)
+
+    response = client.get("/api/events", headers=headers)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+
+def test_full_subscription_queue_is_replaced_by_resync():
+    subscription = Subscription(user_id=1, queue_size=2)
+    for seq in range(3):
+        subscription.deliver({"event": "transactions", "data": {"seq": seq}})
+
+    assert subscription.dropped == 2
+    assert subscription.queue.qsize() == 1
+    assert subscription.queue.get_nowait() is RESYNC_EVENT
@@ -0,0 +1,134 @@
+"""Tests for reading exchange rate files and converting amounts (no database needed)."""
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.finance_tracker.cache import InvalidationBus
+from src.finance_tracker.fx import FxRateCache, FxRateMissing, epoch_days, read_rate_file
+
+# The ECB reference rate history layout: units of each currency per EUR
+ECB_WIDE = """Date,USD,JPY,GBP,
+2026-01-02,1.0345,162.5,0.8301,
+2026-01-01,1.0350,N/A,0.8310,
+"""
+
+
+def write(tmp_path, content: str) -> str:
+    path = tmp_path / "rates.csv"
+    path.write_text(content)
+    return str(path)
+
+
+def test_wide_file_is_converted_to_rates_per_default_currency(tmp_path):
+    rows, skipped = read_rate_file(write(tmp_path, ECB_WIDE), base="EUR")
+
+    rates = {(row["currency"], row["rate_date"]): row["rate"] for row in rows}
+    assert skipped == 0
+    assert "USD" not in {currency for currency, _ in rates}
+    assert rates["EUR", date(2026, 1, 2)] == pytest.approx(1 / 1.0345)
+    assert rates["GBP", date(2026, 1, 2)] == pytest.approx(0.8301 / 1.0345)
+    assert rates["JPY", date(2026, 1, 2)] == pytest.approx(162.5 / 1.0345)
+    assert ("JPY", date(2026, 1, 1)) not in rates
+
+
+def test_file_quoting_the_assumed_base_is_rejected(tmp_path):
+    # Without the base, the file's USD column would be overwritten with 1.0
+    with pytest.raises(ValueError, match="not per USD"):
+        read_rate_file(write(tmp_path, ECB_WIDE))
+
+
+def test_long_file_with_dates_lacking_a_default_currency_quote(tmp_path):
+    path = write(tmp_path, "date,currency,rate\n2026-01-01,USD,1.1\n2026-01-01,GBP,0.88\n2026-01-02,GBP,0.87\n")
+
+    rows, skipped = read_rate_file(path, base="EUR")
+
+    assert skipped == 1
+    assert sorted((row["currency"], row["rate"]) for row in rows) == [
+        ("EUR", pytest.approx(1 / 1.1)), ("GBP", pytest.approx(0.8)),
+    ]
+
+
+def day_of(year: int, month: int, day: int) -> int:
+    return int(np.datetime64(date(year, month, day), "D").astype(np.int64))
+
+
+def make_cache(rates) -> FxRateCache:
+    """A loaded cache from {currency: [(date, rate per USD), ...]}."""
+    cache = FxRateCache(bus=InvalidationBus([]))
+    cache._rates = {
+        currency: (np.array([day_of(*day) for day, _ in history], dtype=np.int64),
+                   np.array([rate for _, rate in history]))
+        for currency, history in rates.items()
+    }
+    cache._loaded_at = time.monotonic()
+    return cache
+
+
+RATES = {
+    "EUR": [((2026, 1, 1), 0.9), ((2026, 1, 3), 0.8)],
+    "GBP": [((2026, 1, 2), 0.75)],
+}
+
+
+@pytest.fixture
+def new_york_time(monkeypatch):
+    """Run in a local time zone behind UTC, where naive UTC datetimes would shift a day back."""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_epoch_days_takes_naive_datetimes_as_utc(new_york_time):
+    moments = [datetime(2026, 1, 3, 0, 30), datetime(2026, 1, 3, 0, 30, tzinfo=timezone.utc), datetime(1969, 12, 31, 23)]
+
+    assert epoch_days(moments).tolist() == [day_of(2026, 1, 3), day_of(2026, 1, 3), -1]
+
+
+def test_convert_dense_days_with_a_factor_table(monkeypatch):
+    cache = make_cache(RATES)
+    monkeypatch.setattr(cache, "rates", lambda *args: pytest.fail("per-currency fallback used"))
+    days = np.array([day_of(2026, 1, day) for day in (1, 2, 3, 4)] * 2)
+    codes = np.array([0] * 4 + [1] * 4)
+    amounts = np.arange(1.0, 9.0)
+
+    converted = cache.convert(amounts, codes, ["USD", "EUR"], days, "EUR")
+
+    # USD at the EUR rate of each day (the latest on or before it); EUR unchanged
+    np.testing.assert_allclose(converted, [0.9, 1.8, 2.4, 3.2, 5, 6, 7, 8])
+    assert cache.convert(amounts, codes, ["USD", "EUR"], days, "USD")[4] == pytest.approx(5 / 0.9)
+
+
+def test_convert_sparse_days_per_currency():
+    cache = make_cache(RATES)
+    days = np.array([day_of(2026, 1, 2), day_of(2026, 6, 1), day_of(2026, 12, 31)])
+
+    converted = cache.convert(np.array([10.0, 20.0, 30.0]), np.array([0, 1, 2]), ["GBP", "EUR", "USD"], days, "EUR")
+
+    np.testing.assert_allclose(converted, [10 * 0.9 / 0.75, 20, 30 * 0.8])
+    assert cache.convert_values(
+        [10.0, 20.0], ["GBP", "USD"], [datetime(2026, 1, 2), datetime(2026, 7, 1)], "EUR"
+    ).tolist() == pytest.approx([10 * 0.9 / 0.75, 20 * 0.8])
+
+
+def test_convert_reports_the_missing_rate():
+    cache = make_cache(RATES)
+    dense_days = np.array([day_of(2026, 1, 1)] * 4)
+
+    # GBP is only known from January 2nd, in both paths
+    for days in (dense_days, np.array([day_of(2026, 1, 1), day_of(2026, 9, 1)])):
+        codes = np.zeros(len(days), dtype=np.int64)
+        with pytest.raises(FxRateMissing) as missing:
+            cache.convert(np.ones(len(days)), codes, ["GBP"], days, "USD")
+        assert (missing.value.currency, missing.value.day) == ("GBP", day_of(2026, 1, 1))
+
+    with pytest.raises(FxRateMissing) as missing:
+        cache.convert(np.ones(4), np.zeros(4, dtype=np.int64), ["USD"], dense_days, "CHF")
+    assert (missing.value.currency, missing.value.day) == ("CHF", None)
+
+    with pytest.raises(FxRateMissing) as missing:
+        cache.convert(np.ones(2), np.array([0, -1]), ["USD"], dense_days[:2], "EUR")
+    assert missing.value.currency is None
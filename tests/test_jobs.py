@@ -0,0 +1,266 @@
+"""Tests for the background job runner and the import job, on the test client's event loop."""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update, insert, func
+
+from src.finance_tracker import jobs, job_handlers
+from src.finance_tracker.analytics import columns_cache
+from src.finance_tracker.archive import ARCHIVE_AFTER_MONTHS, archive_cutoff
+from src.finance_tracker.database import async_session
+from src.finance_tracker.jobs import JobRunner
+from src.finance_tracker.job_handlers import (
+    import_transactions_job, rebuild_fingerprints_job, parse_transactions_csv, upload_path,
+)
+from src.finance_tracker.ingest import ingest_transactions
+from src.finance_tracker.models import (
+    Job, JobStatus, Transaction, ArchivedTransaction, TransactionType, DuplicatePolicy, compute_fingerprint,
+    to_minor_units,
+)
+from src.finance_tracker.schemas import TransactionCreate
+from src.finance_tracker.shards import shard_router
+
+
+@pytest.fixture
+def runner(client):
+    """A runner of its own (no workers started), so the application's runner never claims its jobs."""
+    test_runner = JobRunner(concurrency=1, process_pool_size=1)
+    yield test_runner
+    client.portal.call(test_runner.stop)
+
+
+async def submit(runner: JobRunner, kind: str, user_id: int = 1, params=None) -> int:
+    async with async_session() as db:
+        job = await runner.submit(db, user_id, kind, params or {})
+    return job.id
+
+
+async def get_job(job_id: int) -> Job:
+    async with async_session() as db:
+        return await db.get(Job, job_id)
+
+
+async def set_job(job_id: int, **values) -> None:
+    async with async_session() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def wait_forever(context) -> None:
+    await asyncio.Event().wait()
+
+
+def test_claim_moves_a_queued_job_to_running_once(client, runner):
+    runner.register("wait")(wait_forever)
+
+    async def scenario():
+        first = await submit(runner, "wait")
+        second = await submit(runner, "wait")
+        claimed = await runner._claim(second)
+        return first, second, claimed, await runner._claim(second), await get_job(first)
+
+    first, second, claimed, claimed_again, unclaimed = client.portal.call(scenario)
+
+    assert claimed.id == second
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.heartbeat_at is not None
+    assert claimed_again is None
+    assert unclaimed.status == JobStatus.QUEUED
+
+
+def test_stale_running_jobs_are_requeued(client, runner):
+    runner.register("wait")(wait_forever)
+
+    async def scenario():
+        stale = await submit(runner, "wait")
+        fresh = await submit(runner, "wait")
+        now = datetime.now(timezone.utc)
+        await set_job(stale, status=JobStatus.RUNNING, heartbeat_at=now - timedelta(seconds=jobs.JOB_STALE_SECONDS + 60))
+        await set_job(fresh, status=JobStatus.RUNNING, heartbeat_at=now)
+        await runner._requeue_stale()
+        return (await get_job(stale)).status, (await get_job(fresh)).status
+
+    assert client.portal.call(scenario) == (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+def test_heartbeat_stops_a_job_cancelled_from_another_process(client, runner, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    runner.register("wait")(wait_forever)
+
+    async def scenario():
+        job = await runner._claim(await submit(runner, "wait"))
+        started_heartbeat = job.heartbeat_at
+        running = asyncio.create_task(runner._run(job))
+        await asyncio.sleep(0.2)
+        beating = await get_job(job.id)
+        # Another process only sets the flag
+        await set_job(job.id, cancel_requested=True)
+        await asyncio.wait_for(running, timeout=5)
+        return started_heartbeat, beating, await get_job(job.id)
+
+    started_heartbeat, beating, finished = client.portal.call(scenario)
+
+    assert beating.status == JobStatus.RUNNING
+    assert beating.heartbeat_at > started_heartbeat
+    assert finished.status == JobStatus.CANCELLED
+    assert finished.finished_at is not None
+
+
+def test_cancel_queued_and_running_jobs(client, runner):
+    runner.register("wait")(wait_forever)
+
+    async def scenario():
+        queued = await submit(runner, "wait")
+        job = await runner._claim(await submit(runner, "wait"))
+        running = asyncio.create_task(runner._run(job))
+        await asyncio.sleep(0.05)
+        async with async_session() as db:
+            cancelled_queued = await runner.cancel(db, await db.get(Job, queued))
+            flagged = await runner.cancel(db, await db.get(Job, job.id))
+        await asyncio.wait_for(running, timeout=5)
+        return cancelled_queued, flagged, await get_job(job.id)
+
+    cancelled_queued, flagged, cancelled_running = client.portal.call(scenario)
+
+    assert cancelled_queued.status == JobStatus.CANCELLED
+    assert flagged.cancel_requested
+    assert cancelled_running.status == JobStatus.CANCELLED
+
+
+def write_upload(name: str, amounts) -> str:
+    path = upload_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("transaction_date,amount,type,description\n")
+        for index, amount in enumerate(amounts):
+            f.write(f"2026-01-{index + 1:02d},{amount},expense,row {index}\n")
+    return path
+
+
+async def count_transactions(user_id: int) -> int:
+    async with shard_router.user_session(user_id) as db:
+        return (await db.execute(
+            select(func.count()).select_from(Transaction).where(Transaction.user_id == user_id)
+        )).scalar_one()
+
+
+def test_requeued_import_resumes_without_duplicating_rows(client, runner, register, monkeypatch):
+    monkeypatch.setattr(job_handlers, "IMPORT_BATCH_SIZE", 2)
+    runner.register("import")(import_transactions_job)
+    user_id, _ = register()
+    path = write_upload(f"resume-{user_id}.csv", [10, 20, 30, 40, 50])
+
+    async def scenario():
+        job_id = await submit(runner, "import", user_id, {"upload": os.path.basename(path), "on_duplicate": "allow"})
+        # A first run committed two batches but was interrupted before
+        # recording the second one
+        rows, _ = parse_transactions_csv(path)
+        async with shard_router.user_session(user_id) as db:
+            await ingest_transactions(
+                db, user_id, [TransactionCreate.model_construct(**row) for row in rows[:4]], DuplicatePolicy.ALLOW
+            )
+            await db.commit()
+        await set_job(job_id, result={"created": 2, "merged": 0, "skipped": 0, "flagged": 0, "rows_done": 2})
+
+        await runner._run(await runner._claim(job_id))
+        return await get_job(job_id), await count_transactions(user_id)
+
+    job, transactions = client.portal.call(scenario)
+
+    assert job.status == JobStatus.SUCCEEDED, job.error
+    assert transactions == 5
+    assert job.result["rows_done"] == 5
+    assert job.result["created"] == 3
+    assert job.result["skipped"] == 2
+    assert not os.path.exists(path)
+
+
+def test_failed_import_removes_the_upload(client, runner, register):
+    runner.register("import")(import_transactions_job)
+    user_id, _ = register()
+    path = write_upload(f"failed-{user_id}.csv", [10])
+
+    async def scenario():
+        job_id = await submit(runner, "import", user_id, {"upload": os.path.basename(path), "on_duplicate": "bogus"})
+        await runner._run(await runner._claim(job_id))
+        return await get_job(job_id)
+
+    assert client.portal.call(scenario).status == JobStatus.FAILED
+    assert not os.path.exists(path)
+
+
+def test_rebuild_fingerprints_covers_the_archive_and_drops_cached_reads(client, runner, register, monkeypatch):
+    monkeypatch.setattr(job_handlers, "REBUILD_BATCH_SIZE", 2)
+    runner.register("rebuild_fingerprints")(rebuild_fingerprints_job)
+    user_id, _ = register()
+    day = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    async def scenario():
+        async with shard_router.user_session(user_id) as db:
+            await db.execute(insert(Transaction), [
+                {"user_id": user_id, "amount_minor": to_minor_units(amount), "type": TransactionType.EXPENSE,
+                 "transaction_date": day, "fingerprint": "stale"}
+                for amount in (1, 2, 3)
+            ])
+            await db.execute(insert(ArchivedTransaction).values(
+                id=10 ** 9 + user_id, user_id=user_id, amount_minor=to_minor_units(4), type=TransactionType.EXPENSE,
+                transaction_date=day, created_at=day, updated_at=day, fingerprint="stale",
+            ))
+            await db.commit()
+        columns_cache.set(user_id, "columns", user_id=user_id)
+
+        job_id = await submit(runner, "rebuild_fingerprints", user_id)
+        await runner._run(await runner._claim(job_id))
+
+        async with shard_router.user_session(user_id) as db:
+            fingerprints = {}
+            for model in (Transaction, ArchivedTransaction):
+                result = await db.execute(select(model.amount, model.fingerprint).where(model.user_id == user_id))
+                fingerprints.update(result.all())
+        return await get_job(job_id), fingerprints
+
+    job, fingerprints = client.portal.call(scenario)
+
+    assert job.status == JobStatus.SUCCEEDED, job.error
+    assert job.result == {"rows": 4}
+    assert fingerprints == {
+        amount: compute_fingerprint(user_id, day, amount, TransactionType.EXPENSE, None) for amount in (1, 2, 3, 4)
+    }
+    assert columns_cache.get(user_id) is None
+
+
+def test_job_response_hides_server_paths(client, register):
+    _, headers = register()
+
+    submitted = client.post("/api/jobs", headers=headers, json={"kind": "export"}).json()
+    job = submitted
+    for _ in range(100):
+        job = client.get(f"/api/jobs/{submitted['id']}", headers=headers).json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "succeeded", job
+    assert "result_location" not in job
+    assert job["result_url"] == f"/api/jobs/{job['id']}/result"
+    download = client.get(job["result_url"], headers=headers)
+    assert download.status_code == 200
+    assert download.text.startswith("id,transaction_date")
+
+
+def test_archive_jobs_keep_at_least_the_configured_months(client, register):
+    _, headers = register()
+
+    for months in (-1, 0, ARCHIVE_AFTER_MONTHS - 1, "36", True):
+        response = client.post("/api/jobs", headers=headers, json={"kind": "archive", "params": {"months": months}})
+        assert response.status_code == 400, (months, response.text)
+
+    response = client.post("/api/jobs", headers=headers, json={
+        "kind": "archive", "params": {"months": ARCHIVE_AFTER_MONTHS + 12},
+    })
+    assert response.status_code == 202, response.text
+    with pytest.raises(ValueError):
+        archive_cutoff(0)
@@ -0,0 +1,88 @@
+"""Tests for recurring transaction schedules on SQLite shards, which return naive datetimes."""
+from datetime import datetime, timedelta, timezone
+
+from src.finance_tracker import scheduler
+from src.finance_tracker.models import RecurringTransaction, RecurrenceFrequency
+from src.finance_tracker.scheduler import materialize_due, schedule_next, skip_to
+from src.finance_tracker.shards import shard_router
+
+
+def make_rule(start_date: datetime, end_date=None) -> RecurringTransaction:
+    rule = RecurringTransaction(
+        frequency=RecurrenceFrequency.MONTHLY, interval=1, start_date=start_date, end_date=end_date,
+        occurrence_count=0,
+    )
+    schedule_next(rule)
+    return rule
+
+
+def test_skip_to_compares_naive_and_aware_datetimes():
+    rule = make_rule(datetime(2026, 1, 31))
+
+    skip_to(rule, datetime(2026, 4, 15, tzinfo=timezone.utc))
+
+    assert rule.occurrence_count == 3
+    assert rule.next_run_at == datetime(2026, 4, 30)
+
+
+def test_schedule_next_compares_naive_and_aware_end_dates():
+    rule = make_rule(datetime(2026, 1, 31), end_date=datetime(2026, 2, 1, tzinfo=timezone.utc))
+
+    rule.occurrence_count = 1
+    schedule_next(rule)
+
+    assert rule.next_run_at is None
+
+
+def test_pause_resume_and_end_date_updates(client, register):
+    _, headers = register()
+    start = datetime.now(timezone.utc) - timedelta(days=70)
+    created = client.post("/api/recurring", headers=headers, json={
+        "amount": 9.99, "type": "expense", "description": "subscription",
+        "frequency": "monthly", "start_date": start.isoformat(),
+    })
+    assert created.status_code == 201, created.text
+    url = f"/api/recurring/{created.json()['id']}"
+
+    paused = client.put(url, headers=headers, json={"is_active": False})
+    resumed = client.put(url, headers=headers, json={"is_active": True})
+    ended = client.put(url, headers=headers, json={"end_date": (start + timedelta(days=1)).isoformat()})
+
+    assert paused.status_code == 200, paused.text
+    assert resumed.status_code == 200, resumed.text
+    # The occurrences that fell due while paused are skipped
+    next_run_at = datetime.fromisoformat(resumed.json()["next_run_at"])
+    assert next_run_at.replace(tzinfo=next_run_at.tzinfo or timezone.utc) >= datetime.now(timezone.utc)
+    assert ended.status_code == 200, ended.text
+    assert ended.json()["next_run_at"] is None
+
+
+def test_materialize_due_catches_up_missed_occurrences(client, register, monkeypatch):
+    monkeypatch.setattr(scheduler, "RECURRING_INSERT_BATCH_SIZE", 2)
+    user_id, headers = register()
+    created = client.post("/api/recurring", headers=headers, json={
+        "amount": 3.5, "type": "expense", "description": "coffee",
+        "frequency": "daily", "start_date": "2026-01-01T08:00:00Z",
+    })
+    assert created.status_code == 201, created.text
+    url = f"/api/recurring/{created.json()['id']}"
+    shard = client.portal.call(shard_router.shard_of, user_id)
+
+    # Rules of other tests' users fall due much later than this
+    inserted = client.portal.call(materialize_due, datetime(2026, 1, 5, 12, tzinfo=timezone.utc), shard)
+
+    transactions = client.get("/api/transactions", headers=headers).json()
+    assert inserted >= 5
+    assert sorted(transaction["transaction_date"][:16] for transaction in transactions) == [
+        f"2026-01-0{day}T08:00" for day in range(1, 6)
+    ]
+    assert {(transaction["amount"], transaction["description"]) for transaction in transactions} == {(3.5, "coffee")}
+    rule = client.get(url, headers=headers).json()
+    assert rule["occurrence_count"] == 5
+    assert rule["next_run_at"].startswith("2026-01-06T08:00")
+
+    # Nothing is due again until the next occurrence
+    client.portal.call(materialize_due, datetime(2026, 1, 5, 12, tzinfo=timezone.utc), shard)
+    assert len(client.get("/api/transactions", headers=headers).json()) == 5
+    changes = client.get("/api/transactions/changes", headers=headers).json()
+    assert [change["operation"] for change in changes["changes"]] == ["insert"] * 5
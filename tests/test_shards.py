@@ -0,0 +1,140 @@
+"""Tests for sharded user data, on a default SQLite database and two SQLite shards."""
+from sqlalchemy import select, insert, func
+
+from src.finance_tracker.database import async_session
+from src.finance_tracker.models import (
+    User, UserDirectory, Category, Transaction, TransactionChange, TransactionType, ChangeOperation, to_minor_units,
+)
+from src.finance_tracker.shards import shard_router, rebalance_user
+
+
+def register_on_each_shard(register) -> dict:
+    """Register users until there is one on each shard; returns shard -> (user ID, headers)."""
+    users = {}
+    while len(users) < len(shard_router):
+        user_id, headers = register()
+        users.setdefault(shard_router.shard_for_new_user(user_id), (user_id, headers))
+    return users
+
+
+async def directory_entry(user_id: int):
+    async with async_session() as db:
+        return await db.get(UserDirectory, user_id)
+
+
+async def transaction_ids(shard: int, user_id: int) -> set:
+    async with shard_router.session(shard) as db:
+        return set((await db.execute(select(Transaction.id).where(Transaction.user_id == user_id))).scalars().all())
+
+
+async def count_on_shard(shard: int, model, user_id: int) -> int:
+    column = model.id if model is User else model.user_id
+    async with shard_router.session(shard) as db:
+        return (await db.execute(select(func.count()).select_from(model).where(column == user_id))).scalar_one()
+
+
+def test_registration_writes_the_directory_then_the_users_shard(client, register):
+    for shard, (user_id, _) in register_on_each_shard(register).items():
+        entry = client.portal.call(directory_entry, user_id)
+
+        assert entry.shard == shard
+        assert client.portal.call(count_on_shard, shard, User, user_id) == 1
+        assert client.portal.call(count_on_shard, 1 - shard, User, user_id) == 0
+
+
+def test_duplicate_registration_is_rejected_across_shards(client, register):
+    user_id, _ = register()
+    entry = client.portal.call(directory_entry, user_id)
+
+    response = client.post("/auth/register", json={
+        "username": entry.username, "email": "other-" + entry.email, "password": "password123",
+    })
+
+    assert response.status_code == 400
+
+    async def directory_size():
+        async with async_session() as db:
+            return (await db.execute(
+                select(func.count()).select_from(UserDirectory).where(UserDirectory.username == entry.username)
+            )).scalar_one()
+
+    assert client.portal.call(directory_size) == 1
+
+
+def test_requests_are_routed_to_the_users_shard(client, register):
+    users = register_on_each_shard(register)
+    for shard, (user_id, headers) in users.items():
+        created = client.post("/api/transactions", headers=headers, json={
+            "amount": 10 + shard, "type": "expense", "description": f"on shard {shard}",
+        })
+        assert created.status_code == 201, created.text
+
+    for shard, (user_id, headers) in users.items():
+        listed = client.get("/api/transactions", headers=headers).json()
+
+        assert [transaction["description"] for transaction in listed] == [f"on shard {shard}"]
+        assert client.portal.call(count_on_shard, shard, Transaction, user_id) == 1
+        assert client.portal.call(count_on_shard, 1 - shard, Transaction, user_id) == 0
+
+
+def test_rebalance_moves_a_user_to_another_shard(client, register):
+    user_id, headers = register()
+    from_shard = shard_router.shard_for_new_user(user_id)
+    to_shard = 1 - from_shard
+    created = client.post("/api/transactions", headers=headers, json={"amount": 5, "type": "income"})
+    assert created.status_code == 201, created.text
+
+    async def add_categorized_transaction():
+        async with shard_router.session(from_shard) as db:
+            category_id = (await db.execute(
+                insert(Category).values(name="Rent", user_id=user_id).returning(Category.id)
+            )).scalar_one()
+            await db.execute(insert(Transaction).values(
+                user_id=user_id, category_id=category_id, amount_minor=to_minor_units(900),
+                type=TransactionType.EXPENSE, fingerprint="f" * 64,
+            ))
+            await db.commit()
+
+    client.portal.call(add_categorized_transaction)
+    old_ids = client.portal.call(transaction_ids, from_shard, user_id)
+
+    moved = client.portal.call(rebalance_user, user_id, to_shard)
+
+    assert moved == {"categories": 1, "transactions": 2, "transaction_changes": 1, "recurring_transactions": 0}
+    assert client.portal.call(directory_entry, user_id).shard == to_shard
+    for model in (User, Category, Transaction):
+        assert client.portal.call(count_on_shard, from_shard, model, user_id) == 0
+        assert client.portal.call(count_on_shard, to_shard, model, user_id) == 1 + (model is Transaction)
+
+    async def categories_of_transactions():
+        async with shard_router.session(to_shard) as db:
+            return set((await db.execute(
+                select(Category.name)
+                .join(Transaction, Transaction.category_id == Category.id)
+                .where(Transaction.user_id == user_id)
+            )).scalars().all())
+
+    assert client.portal.call(categories_of_transactions) == {"Rent"}
+
+    # Requests follow the user (uncategorized only: listing does not load categories)
+    listed = client.get("/api/transactions", headers=headers, params={"transaction_type": "income"}).json()
+    assert [(transaction["amount"], transaction["currency"]) for transaction in listed] == [(5, "USD")]
+
+    # Syncing clients are told to replace their copies
+    async def feed_after_move():
+        async with shard_router.session(to_shard) as db:
+            return (await db.execute(
+                select(TransactionChange.operation, TransactionChange.transaction_id)
+                .where(TransactionChange.user_id == user_id)
+                .order_by(TransactionChange.seq)
+            )).all()
+
+    new_ids = client.portal.call(transaction_ids, to_shard, user_id)
+    feed = client.portal.call(feed_after_move)
+    assert feed[0] == (ChangeOperation.INSERT, created.json()["id"])  # The history, copied
+    assert sorted(feed[1:]) == sorted(
+        [(ChangeOperation.DELETE, old_id) for old_id in old_ids]
+        + [(ChangeOperation.INSERT, new_id) for new_id in new_ids]
+    )
+
+    assert client.portal.call(rebalance_user, user_id, to_shard) == {}
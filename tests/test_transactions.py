@@ -0,0 +1,109 @@
+"""Tests for duplicate detection on the transaction endpoints, through the test client."""
+from datetime import datetime, timedelta, timezone
+
+from src.finance_tracker.models import TransactionType, compute_fingerprint
+
+COFFEE = {"amount": 4.5, "type": "expense", "description": "Coffee Shop", "transaction_date": "2026-01-02T09:00:00Z"}
+
+
+def test_fingerprint_normalizes_descriptions_dates_and_currencies():
+    day = datetime(2026, 1, 2, 4, 30, tzinfo=timezone.utc)
+    fingerprint = compute_fingerprint(1, day, 4.5, TransactionType.EXPENSE, "Coffee Shop")
+
+    assert compute_fingerprint(1, day, 4.5, TransactionType.EXPENSE, "  coffee   SHOP ") == fingerprint
+    assert compute_fingerprint(1, day, 4.5, TransactionType.EXPENSE, "coffee-shop!") == fingerprint
+    # The same instant seen from New York, where it is still the day before
+    new_york = day.astimezone(timezone(timedelta(hours=-5)))
+    assert new_york.day == 1
+    assert compute_fingerprint(1, new_york, 4.5, TransactionType.EXPENSE, "Coffee Shop") == fingerprint
+    assert compute_fingerprint(1, day, 4.5, TransactionType.EXPENSE, "Coffee Shop", "USD") == fingerprint
+
+    assert compute_fingerprint(1, day, 4.5, TransactionType.EXPENSE, "Coffee Shop", "EUR") != fingerprint
+    assert compute_fingerprint(1, day, 4.5, TransactionType.INCOME, "Coffee Shop") != fingerprint
+    assert compute_fingerprint(1, day, 4.51, TransactionType.EXPENSE, "Coffee Shop") != fingerprint
+    assert compute_fingerprint(2, day, 4.5, TransactionType.EXPENSE, "Coffee Shop") != fingerprint
+    assert compute_fingerprint(1, day + timedelta(days=1), 4.5, TransactionType.EXPENSE, "Coffee Shop") != fingerprint
+
+
+def test_create_applies_the_duplicate_policy(client, register):
+    _, headers = register()
+    created = client.post("/api/transactions", headers=headers, json=COFFEE)
+    assert created.status_code == 201, created.text
+    original = created.json()
+    repeat = {**COFFEE, "description": "coffee  shop"}
+
+    for policy in ("skip", "merge"):
+        response = client.post("/api/transactions", headers=headers, params={"on_duplicate": policy}, json=repeat)
+        assert response.status_code == 200, (policy, response.text)
+        assert response.json()["id"] == original["id"]
+        assert response.json()["description"] == "Coffee Shop"
+
+    flagged = client.post("/api/transactions", headers=headers, params={"on_duplicate": "flag"}, json=repeat)
+    assert flagged.status_code == 201, flagged.text
+    assert flagged.json()["is_duplicate"] is True
+
+    allowed = client.post("/api/transactions", headers=headers, json=repeat)
+    assert allowed.status_code == 201, allowed.text
+    assert allowed.json()["is_duplicate"] is False
+
+    other = client.post("/api/transactions", headers=headers, params={"on_duplicate": "skip"}, json={**COFFEE, "amount": 5})
+    assert other.status_code == 201, other.text
+
+    listed = client.get("/api/transactions", headers=headers).json()
+    assert sorted(transaction["id"] for transaction in listed) == sorted(
+        [original["id"], flagged.json()["id"], allowed.json()["id"], other.json()["id"]]
+    )
+
+
+def test_import_reports_totals(client, register):
+    _, headers = register()
+    existing = client.post("/api/transactions", headers=headers, json=COFFEE).json()
+    rent = {"amount": 900, "type": "expense", "description": "Rent", "transaction_date": "2026-01-01T00:00:00Z"}
+    salary = {"amount": 3000, "type": "income", "description": "Salary", "transaction_date": "2026-01-01T00:00:00Z"}
+    batch = {"transactions": [COFFEE, rent, salary, {**rent, "description": "RENT"}]}
+
+    skipped = client.post("/api/transactions/import", headers=headers, json=batch)
+
+    assert skipped.status_code == 200, skipped.text
+    result = skipped.json()
+    assert [transaction["description"] for transaction in result["created"]] == ["Rent", "Salary"]
+    assert result["merged"] == []
+    assert (result["skipped"], result["flagged"]) == (2, 0)
+
+    flagged = client.post("/api/transactions/import", headers=headers, params={"on_duplicate": "flag"}, json=batch)
+
+    result = flagged.json()
+    assert len(result["created"]) == 4
+    assert all(transaction["is_duplicate"] for transaction in result["created"])
+    assert (result["skipped"], result["flagged"]) == (0, 4)
+
+    merged = client.post("/api/transactions/import", headers=headers, params={"on_duplicate": "merge"}, json=batch)
+
+    result = merged.json()
+    assert result["created"] == []
+    assert [transaction["id"] for transaction in result["merged"]][0] == existing["id"]
+    assert len(result["merged"]) == 3
+    assert (result["skipped"], result["flagged"]) == (0, 0)
+
+
+def test_duplicates_are_listed_in_clusters(client, register):
+    _, headers = register()
+    assert client.get("/api/transactions/duplicates", headers=headers).json() == []
+
+    first = client.post("/api/transactions", headers=headers, json=COFFEE).json()
+    second = client.post("/api/transactions", headers=headers, json={**COFFEE, "description": "COFFEE SHOP"}).json()
+    client.post("/api/transactions", headers=headers, json={**COFFEE, "amount": 5})
+    rent = {"amount": 900, "type": "expense", "description": "Rent", "transaction_date": "2026-02-01T00:00:00Z"}
+    rents = [client.post("/api/transactions", headers=headers, json=rent).json() for _ in range(3)]
+
+    clusters = client.get("/api/transactions/duplicates", headers=headers).json()
+
+    # Most recent first
+    assert [(cluster["count"], [t["id"] for t in cluster["transactions"]]) for cluster in clusters] == [
+        (3, [rent["id"] for rent in rents]),
+        (2, [first["id"], second["id"]]),
+    ]
+    assert clusters[1]["fingerprint"] == compute_fingerprint(
+        first["user_id"], datetime(2026, 1, 2, tzinfo=timezone.utc), 4.5, TransactionType.EXPENSE, "coffee shop"
+    )
+    assert len(client.get("/api/transactions/duplicates", headers=headers, params={"limit": 1}).json()) == 1